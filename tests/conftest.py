@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Shared configuration of the test suite.
+"""
+
+import os
+import numpy as np
+import pytest
+
+# Nessun dispositivo audio durante i test: pygame usa il driver fittizio
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from voice_recognizer.benchmarks.pipeline_benchmark import FakeGeminiServer, LatencyModel
+from voice_recognizer.config.api_settings import GEMINI_API_SETTINGS
+from voice_recognizer.config.settings import KEYWORD_SETTINGS, RECOGNITION_SETTINGS, TTS_SETTINGS, TRACING_SETTINGS
+
+@pytest.fixture(autouse=True)
+def hermetic_settings(tmp_path, monkeypatch):
+    """
+    Keep the services built by the tests away from the user's files and from the network.
+
+    Caches, profiles, wake word templates and traces live in the test's
+    temporary directory, and no connection is opened in advance: without a
+    key the default GeminiService sends nothing, even if GEMINI_API_KEY is set.
+    """
+    monkeypatch.setitem(TTS_SETTINGS["cache"], "disk_dir", str(tmp_path / "tts"))
+    monkeypatch.setitem(RECOGNITION_SETTINGS["calibration_profiles"], "path", str(tmp_path / "calibration_profiles.json"))
+    monkeypatch.setitem(KEYWORD_SETTINGS["local_detection"], "templates_dir", str(tmp_path / "wake_word"))
+    monkeypatch.setitem(TRACING_SETTINGS, "jsonl_path", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setitem(GEMINI_API_SETTINGS, "api_key", None)
+    monkeypatch.setitem(GEMINI_API_SETTINGS, "warm_up", False)
+
+@pytest.fixture
+def gemini_server():
+    """
+    Local server answering like the Gemini API (SSE included), without latency.
+    """
+    rng = np.random.default_rng(0)
+    server = FakeGeminiServer(LatencyModel("0", rng), LatencyModel("0", rng))
+    yield server
+    server.close()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the hedged ASR backend.
+"""
+
+import time
+import speech_recognition as sr
+from voice_recognizer.services.asr_service import ASRBackend, HedgedASRBackend
+
+HEDGING = {"percentile": 95, "initial_delay": 0.5, "min_delay": 0.1, "min_samples": 20}
+
+# Trascrizione che fa fallire la richiesta
+FAIL = object()
+
+class _ScriptedBackend(ASRBackend):
+    """
+    Backend answering with a fixed transcript after a fixed delay.
+
+    A transcript of None means no speech; FAIL makes the request fail.
+    """
+
+    def __init__(self, name, text, delay):
+        super().__init__("it-IT")
+        self.name = name
+        self.text = text
+        self.delay = delay
+
+    def _recognize(self, audio):
+        time.sleep(self.delay)
+        if self.text is FAIL:
+            raise sr.RequestError("connection refused")
+        if self.text is None:
+            raise sr.UnknownValueError()
+        return self.text
+
+AUDIO = sr.AudioData(b"\0\0" * 1600, 16000, 2)
+
+def test_fast_primary_is_not_hedged():
+    backend = HedgedASRBackend(_ScriptedBackend("a", "ciao", 0.0), _ScriptedBackend("b", "altro", 0.0), HEDGING)
+
+    assert backend.transcribe(AUDIO) == "ciao"
+    assert backend.hedged == 0
+    assert backend.secondary.calls == 0
+
+def test_slow_primary_is_raced_by_the_secondary():
+    backend = HedgedASRBackend(_ScriptedBackend("a", "ciao", 2.0), _ScriptedBackend("b", "altro", 0.0), HEDGING)
+
+    assert backend.transcribe(AUDIO) == "altro"
+    assert backend.wins["secondary"] == 1
+
+def test_primary_without_speech_is_not_hedged():
+    backend = HedgedASRBackend(_ScriptedBackend("a", None, 0.0), _ScriptedBackend("b", "altro", 0.0), HEDGING)
+
+    assert backend.transcribe(AUDIO) is None
+    assert backend.hedged == 0
+    assert backend.secondary.calls == 0
+    assert backend.failures == 0
+
+def test_failed_primary_starts_the_secondary_at_once():
+    backend = HedgedASRBackend(_ScriptedBackend("a", FAIL, 0.0), _ScriptedBackend("b", "altro", 0.0), HEDGING)
+
+    start = time.perf_counter()
+    assert backend.transcribe(AUDIO) == "altro"
+
+    # Nessuna attesa della scadenza di hedging
+    assert time.perf_counter() - start < HEDGING["initial_delay"]
+    assert backend.hedged == 1
+
+def test_secondary_without_speech_wins_after_a_failure():
+    backend = HedgedASRBackend(_ScriptedBackend("a", FAIL, 0.0), _ScriptedBackend("b", None, 0.0), HEDGING)
+
+    assert backend.recognize(AUDIO) == ("", False)
+    assert backend.wins["secondary"] == 1
+
+def test_no_transcript_when_both_fail():
+    backend = HedgedASRBackend(_ScriptedBackend("a", FAIL, 0.0), _ScriptedBackend("b", FAIL, 0.0), HEDGING)
+
+    assert backend.recognize(AUDIO) == ("", True)
+    assert backend.primary.calls == 1
+    assert backend.secondary.calls == 1
+    assert backend.failures == 1
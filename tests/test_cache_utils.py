@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the in-memory and on-disk caches.
+"""
+
+import os
+import time
+from voice_recognizer.utils.cache_utils import LRUCache, DiskCache
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    # Leggere "a" la rende la più recente: esce "b"
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+def test_lru_put_of_an_existing_key_replaces_without_evicting():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+
+    assert len(cache) == 2
+    assert cache.get("a") == 10
+    assert cache.evictions == 0
+
+def test_disk_cache_evicts_to_stay_under_the_byte_cap(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"
+
+    cache.put("c", b"123")
+
+    assert cache.get("b") is None
+    assert not os.path.exists(tmp_path / "b.bin")
+    assert cache.stats()["bytes"] == 8
+    assert cache.evictions == 1
+
+def test_disk_cache_skips_entries_larger_than_the_cap(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=4)
+    cache.put("big", b"12345")
+
+    assert cache.get("big") is None
+    assert os.listdir(tmp_path) == []
+
+def test_disk_index_is_reloaded_in_access_order(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100, suffix=".mp3")
+    cache.put("old", b"aaaa")
+    cache.put("new", b"bbbb")
+
+    # Gli istanti di accesso sono i tempi di modifica dei file
+    now = time.time()
+    os.utime(tmp_path / "old.mp3", (now - 60, now - 60))
+    os.utime(tmp_path / "new.mp3", (now - 30, now - 30))
+    (tmp_path / "other.txt").write_bytes(b"ignored")
+
+    reloaded = DiskCache(str(tmp_path), max_bytes=10, suffix=".mp3")
+    assert reloaded.stats()["entries"] == 2
+    assert reloaded.stats()["bytes"] == 8
+
+    # Dopo il riavvio esce per prima la voce usata meno di recente
+    reloaded.put("third", b"cccc")
+    assert reloaded.get("old") is None
+    assert reloaded.get("new") == b"bbbb"
+    assert reloaded.get("third") == b"cccc"
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the local command grammar.
+"""
+
+import pytest
+from voice_recognizer.config.settings import COMMAND_SETTINGS
+from voice_recognizer.services.command_service import CommandService
+
+@pytest.fixture
+def service():
+    return CommandService(COMMAND_SETTINGS)
+
+@pytest.mark.parametrize("text, command", [
+    ("Stop", "stop"),
+    ("Sofi, basta!", "stop"),
+    ("stai zitta", "stop"),
+    ("Puoi ripetere?", "repeat"),
+    ("ripeti per favore", "repeat"),
+    ("parla più forte", "louder"),
+    ("Abbassa il volume.", "quieter"),
+    ("volume giù", "quieter"),
+    ("lascia perdere", "cancel"),
+])
+def test_commands_match_after_normalization(service, text, command):
+    assert service.match(text) == command
+
+@pytest.mark.parametrize("text", [
+    "basta con la pasta, cosa cucino stasera?",
+    "ripeti la tabellina del sette",
+    "quanto è forte il vento oggi",
+    "volume",
+    "",
+])
+def test_longer_utterances_are_not_commands(service, text):
+    assert service.match(text) is None
+
+def test_handle_runs_the_registered_handler(service):
+    calls = []
+    service.register("stop", lambda: calls.append("stop"))
+
+    assert service.handle("fermati")
+    assert not service.handle("che ore sono")
+    assert calls == ["stop"]
+    assert service.stats()["matched"] == 1
+
+def test_command_without_handler_is_not_handled(service):
+    assert service.match("annulla") == "cancel"
+    assert not service.handle("annulla")
+
+def test_failing_handler_still_counts_as_handled(service):
+    def fail():
+        raise RuntimeError("guasto")
+    service.register("louder", fail)
+
+    assert service.handle("alza la voce")
+
+def test_disabled_service_matches_nothing():
+    service = CommandService(dict(COMMAND_SETTINGS, enabled=False))
+
+    assert service.match("stop") is None
+
+def test_invalid_grammar_is_rejected():
+    with pytest.raises(ValueError):
+        CommandService({"enabled": True, "commands": {"stop": ["(stop"]}})
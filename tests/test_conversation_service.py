@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the byte-budgeted conversation history.
+"""
+
+import json
+from voice_recognizer.services.conversation_service import ConversationStore
+
+SETTINGS = {"enabled": True, "max_bytes": 400, "summary_max_chars": 200, "summary_line_chars": 40}
+
+def _body(store, text):
+    body, version = store.build_body(text)
+    return json.loads(body.decode("utf-8")), version
+
+def _turn(index):
+    return f"domanda {index}", f"Risposta {index}. Seconda frase della risposta {index}."
+
+def test_body_contains_the_history_in_order():
+    store = ConversationStore(SETTINGS)
+    store.add_turn(*_turn(1))
+    store.add_turn(*_turn(2))
+
+    body, version = _body(store, "domanda 3")
+
+    assert [content["role"] for content in body["contents"]] == ["user", "model", "user", "model", "user"]
+    assert [content["parts"][0]["text"] for content in body["contents"]][::2] == ["domanda 1", "domanda 2", "domanda 3"]
+    assert "systemInstruction" not in body
+    assert version == 2
+
+def test_oldest_turns_are_evicted_to_stay_under_the_budget():
+    store = ConversationStore(SETTINGS)
+    for index in range(10):
+        store.add_turn(*_turn(index))
+
+    stats = store.stats()
+    assert stats["history_bytes"] <= SETTINGS["max_bytes"]
+    assert stats["turns"] + stats["evicted"] == 10
+
+    # Restano i turni più recenti
+    body, _ = _body(store, "ancora")
+    assert body["contents"][-2]["parts"][0]["text"] == "Risposta 9. Seconda frase della risposta 9."
+
+def test_evicted_turns_are_folded_into_the_summary():
+    store = ConversationStore(SETTINGS)
+    for index in range(10):
+        store.add_turn(*_turn(index))
+
+    body, _ = _body(store, "ancora")
+    summary = body["systemInstruction"]["parts"][0]["text"]
+
+    # Il riassunto tiene la domanda e la prima frase della risposta, entro il suo limite
+    assert "- Utente: domanda 0 / Sofi: Risposta 0." not in summary
+    assert f"- Utente: domanda {store.evicted - 1} / Sofi: Risposta {store.evicted - 1}." in summary
+    assert "Seconda frase" not in summary
+    assert store.stats()["summary_chars"] <= SETTINGS["summary_max_chars"]
+
+def test_a_single_turn_over_budget_is_kept():
+    store = ConversationStore(SETTINGS)
+    store.add_turn("domanda lunga", "parola " * 100)
+
+    assert store.stats()["turns"] == 1
+    assert store.stats()["evicted"] == 0
+
+def test_disabled_history_sends_only_the_current_message():
+    store = ConversationStore(dict(SETTINGS, enabled=False))
+    store.add_turn(*_turn(1))
+
+    body, version = _body(store, "ciao")
+
+    assert body == {"contents": [{"role": "user", "parts": [{"text": "ciao"}]}]}
+    assert version == 0
+
+def test_clear_forgets_history_and_summary():
+    store = ConversationStore(SETTINGS)
+    for index in range(10):
+        store.add_turn(*_turn(index))
+    version = store.version
+
+    store.clear()
+
+    body, new_version = _body(store, "ciao")
+    assert len(body["contents"]) == 1
+    assert "systemInstruction" not in body
+    assert new_version == version + 1
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the pauses that RecognitionService feeds to the end-of-turn detector.
+"""
+
+import pytest
+from voice_recognizer.config.settings import RECOGNITION_SETTINGS
+from voice_recognizer.services.recognition_service import RecognitionService
+
+@pytest.fixture
+def service(monkeypatch):
+    """
+    Recognition service that records the observed pauses instead of sending turns.
+    """
+    monkeypatch.setitem(RECOGNITION_SETTINGS["calibration_profiles"], "enabled", False)
+    monkeypatch.setitem(RECOGNITION_SETTINGS["end_of_turn"], "adaptive", True)
+    recognition_service = RecognitionService()
+
+    # Nessun timer né richiesta: conta solo quando arrivano le frasi
+    monkeypatch.setattr(recognition_service, "_schedule_buffer_send", lambda: None)
+    monkeypatch.setattr(recognition_service, "_dispatch_turn", lambda text, trace=None: None)
+
+    recognition_service.observed_gaps = []
+    monkeypatch.setattr(recognition_service.end_of_turn, "observe_gap", recognition_service.observed_gaps.append)
+    return recognition_service
+
+@pytest.fixture
+def clock(service, monkeypatch):
+    """
+    Controllable scheduler clock, in seconds.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(service.scheduler, "now", lambda: now[0])
+    return now
+
+def test_pauses_within_a_turn_are_observed(service, clock):
+    service._add_to_buffer("che tempo fa")
+    clock[0] += 1.5
+    service._add_to_buffer("domani a Roma")
+
+    assert service.observed_gaps == [pytest.approx(1.5)]
+
+def test_pause_between_turns_is_not_observed(service, clock):
+    service._add_to_buffer("che tempo fa")
+    service._send_buffer_to_api()
+
+    # Il turno successivo arriva dopo la risposta, entro max_gap
+    clock[0] += 5.0
+    service._add_to_buffer("e a Milano")
+
+    assert service.observed_gaps == []
+
+def test_pause_after_a_cancelled_turn_is_not_observed(service, clock):
+    service._add_to_buffer("metti la sveglia")
+    service._command_cancel()
+
+    clock[0] += 2.0
+    service._add_to_buffer("accendi la luce")
+
+    assert service.observed_gaps == []
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for replaying recordings through the pipeline faster than real time.
+"""
+
+import argparse
+import numpy as np
+import pytest
+from voice_recognizer.benchmarks import pipeline_benchmark
+from voice_recognizer.config.settings import KEYWORD_SETTINGS, RECOGNITION_SETTINGS, TTS_SETTINGS, TRACING_SETTINGS
+from voice_recognizer.utils import tracing_utils
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    """
+    Synthetic session of two turns, with the settings changed by the benchmark restored afterwards.
+    """
+    monkeypatch.setitem(KEYWORD_SETTINGS, "enabled", KEYWORD_SETTINGS["enabled"])
+    monkeypatch.setitem(TTS_SETTINGS["cache"], "enabled", TTS_SETTINGS["cache"]["enabled"])
+    for key in ("enabled", "jsonl_path", "http_port", "recent_spans"):
+        monkeypatch.setitem(TRACING_SETTINGS, key, TRACING_SETTINGS[key])
+
+    # Un tracer nuovo per ogni esecuzione: le statistiche contano solo i suoi turni
+    monkeypatch.setattr(tracing_utils, "_tracer", None)
+    monkeypatch.setitem(RECOGNITION_SETTINGS["calibration_profiles"], "enabled", False)
+
+    # Coda minuscola che scarta le frasi vecchie: la riproduzione da file deve bloccare invece
+    monkeypatch.setitem(RECOGNITION_SETTINGS, "audio_queue_size", 1)
+    monkeypatch.setitem(RECOGNITION_SETTINGS, "audio_queue_policy", "drop_oldest")
+
+    samples, phrases = pipeline_benchmark.synthetic_session(np.random.default_rng(1), 2)
+    path = str(tmp_path / "session.wav")
+    pipeline_benchmark.write_wav(path, samples, pipeline_benchmark.SYNTHETIC_RATE)
+    return path, phrases
+
+def _args(speed):
+    return argparse.Namespace(
+        speed=speed, seed=0, asr_latency="0.3:0.2", gemini_ttfb="0.3:0.2",
+        gemini_fragment_delay="0.05:0.2", tts_latency="0.1:0.2", trace_file=None
+    )
+
+def test_unpaced_replay_transcribes_every_phrase(session):
+    path, phrases = session
+
+    result = pipeline_benchmark.run_benchmark(path, _args(0))
+
+    assert result["audio_queue"]["dropped"] == 0
+    assert len(result["spans"]["asr"]) == phrases
+    assert result["turns"] is None
+
+def test_fast_replay_keeps_the_turns_of_the_recording(session):
+    path, phrases = session
+
+    result = pipeline_benchmark.run_benchmark(path, _args(8))
+
+    # Scadenze e risposte nel tempo della registrazione: gli stessi turni del tempo reale
+    assert result["turns"] == 2
+    assert len(result["spans"]["asr"]) == phrases
+    assert min(result["spans"]["turn_wait"]) >= 0.9 * 1000 * RECOGNITION_SETTINGS["end_of_turn"]["min_delay"]
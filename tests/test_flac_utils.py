@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Round-trip tests of the in-process FLAC encoder against the reference decoder.
+"""
+
+import numpy as np
+import pytest
+import speech_recognition as sr
+from voice_recognizer.benchmarks.flac_benchmark import decode_flac, run_benchmark, synthetic_phrase
+from voice_recognizer.utils.audio_utils import float_to_pcm16
+from voice_recognizer.utils.flac_utils import FlacEncoder, FlacAudioData
+
+try:
+    sr.get_flac_converter()
+except OSError:
+    pytest.skip("flac binary not available", allow_module_level=True)
+
+def _signals():
+    """Signals that exercise every kind of subframe."""
+    rng = np.random.default_rng(0)
+    return {
+        "voice": float_to_pcm16(synthetic_phrase(rng, 1.3, 16000)),
+        "noise": rng.integers(-32768, 32768, 9000).astype(np.int16),  # Verbatim
+        "silence": np.zeros(5000, dtype=np.int16),  # Costante
+        "extremes": np.tile(np.array([32767, -32768], dtype=np.int16), 3000),
+        "mixed": np.concatenate((
+            np.zeros(4096, dtype=np.int16),
+            rng.integers(-32768, 32768, 4096).astype(np.int16),
+            (np.sin(np.arange(4099) / 3.0) * 30000).astype(np.int16),  # Ultimo blocco di 3 campioni
+        )),
+        "single": np.array([-32768], dtype=np.int16),
+    }
+
+@pytest.mark.parametrize("block_size", [4096, 1152, 16])
+def test_reference_decoder_reads_back_the_samples(block_size):
+    encoder = FlacEncoder(block_size)
+    for name, samples in _signals().items():
+        assert np.array_equal(decode_flac(encoder.encode(samples, 16000)), samples), name
+
+def test_frame_numbers_above_127_use_the_long_coding():
+    samples = float_to_pcm16(synthetic_phrase(np.random.default_rng(1), 0.5, 16000))
+
+    # 500 frame da 16 campioni: i numeri oltre 127 occupano due byte
+    assert np.array_equal(decode_flac(FlacEncoder(16).encode(samples, 16000)), samples)
+
+def test_audio_data_is_downsampled_before_encoding():
+    samples = float_to_pcm16(synthetic_phrase(np.random.default_rng(2), 1.0, 44100))
+    audio = FlacAudioData(sr.AudioData(samples.tobytes(), 44100, 2), FlacEncoder(), 16000)
+
+    decoded = decode_flac(audio.get_flac_data())
+    assert audio.sample_rate == 16000
+    assert np.array_equal(decoded, np.frombuffer(audio.frame_data, dtype="<i2"))
+
+def test_benchmark_reports_both_encoders():
+    signal = synthetic_phrase(np.random.default_rng(3), 0.5, 16000)
+
+    result, = run_benchmark([("synthetic", signal, 16000)], repeat=1)
+
+    assert result["round_trip"]
+    assert result["in_process_ms"] > 0 and result["binary_ms"] > 0
+    # La predizione comprime quanto il binario, con un margine per le scelte diverse
+    assert result["in_process_bytes"] < 1.2 * result["binary_bytes"]
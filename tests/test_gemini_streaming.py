@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the SSE streaming of Gemini responses.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from voice_recognizer.services.gemini_service import GeminiService
+
+FRAGMENTS = ["Ciao, ", "come posso ", "aiutarti?"]
+
+class _CannedResponse:
+    """
+    Response whose body is a fixed list of lines, like iter_lines() returns them.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def iter_lines(self, chunk_size=None):
+        return iter(self.lines)
+
+class _SSEHandler(BaseHTTPRequestHandler):
+    """
+    Streams FRAGMENTS as SSE events, split across chunks in the middle of a line.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = "".join(
+            "data: " + json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}) + "\r\n\r\n"
+            for text in FRAGMENTS
+        ).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(body), 7):
+            chunk = body[start:start + 7]
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def sse_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SSEHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+def test_sse_events_from_a_chunked_stream(sse_url):
+    service = GeminiService.__new__(GeminiService)
+    response = requests.post(sse_url, data=b"{}", stream=True, timeout=5)
+    with response:
+        events = list(service._iter_sse_events(response))
+
+    assert [service._extract_text(event) for event in events] == FRAGMENTS
+
+def test_sse_multiline_data_and_unterminated_last_event():
+    lines = [
+        b": commento ignorato",
+        b'data: {"candidates": [{"content":',
+        b'data:  {"parts": [{"text": "Ciao "}]}}]}',
+        b"",
+        b'data: {"candidates": [{"content": {"parts": [{"text": "mondo"}]}}]}',
+    ]
+    service = GeminiService.__new__(GeminiService)
+
+    events = list(service._iter_sse_events(_CannedResponse(lines)))
+
+    assert [service._extract_text(event) for event in events] == ["Ciao ", "mondo"]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the latency spans recorded by Gemini requests.
+"""
+
+import numpy as np
+import pytest
+from voice_recognizer.benchmarks.pipeline_benchmark import FakeTTSService, LatencyModel
+from voice_recognizer.config.settings import TTS_SETTINGS, TRACING_SETTINGS
+from voice_recognizer.services.gemini_service import GeminiService
+from voice_recognizer.utils.tracing_utils import Tracer
+
+@pytest.fixture
+def service(gemini_server, monkeypatch):
+    monkeypatch.setitem(TTS_SETTINGS["cache"], "enabled", False)
+    settings = gemini_server.settings()
+    settings.update(warm_up=False, stream=True)
+
+    # Audio brevissimo: la consegna non attende secondi di riproduzione
+    tts_service = FakeTTSService(LatencyModel("0", np.random.default_rng(0)), chars_per_second=10000.0)
+    gemini_service = GeminiService(settings=settings, tts_service=tts_service)
+    yield gemini_service
+    gemini_service.http.close()
+
+@pytest.fixture
+def trace():
+    tracer = Tracer(dict(TRACING_SETTINGS, enabled=True, jsonl_path=None, http_port=None))
+    return tracer.start_trace()
+
+def _spans(trace, name):
+    return [span for span in trace.spans if span[0] == name]
+
+def test_only_the_delivered_response_is_traced(service, trace):
+    # Richiesta speculativa completata e poi scartata
+    speculative = service.prepare("prima", trace)
+    list(speculative.iter_fragments())
+    speculative.cancel()
+
+    delivered = service.prepare("seconda", trace)
+    assert service.deliver(delivered) is not None
+
+    assert len(_spans(trace, "gemini_total")) == 1
+    assert len(_spans(trace, "gemini_ttfb")) == 1
+    assert _spans(trace, "gemini_total")[0][1] == delivered.started_at
+
+def test_spans_use_integer_nanoseconds(service, trace):
+    pending = service.prepare("ciao", trace)
+    service.deliver(pending)
+
+    (_, ttfb_start, ttfb_end, _), = _spans(trace, "gemini_ttfb")
+    (_, total_start, total_end, _), = _spans(trace, "gemini_total")
+    assert all(isinstance(value, int) for value in (ttfb_start, ttfb_end, total_start, total_end))
+    assert total_start == ttfb_start <= ttfb_end <= total_end
+    assert pending.time_to_first_fragment() == pytest.approx((ttfb_end - ttfb_start) / 1e9)
+
+def test_response_not_delivered_leaves_no_spans(service, trace):
+    pending = service.prepare("ciao", trace)
+    list(pending.iter_fragments())
+
+    assert trace.spans == []
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the retries and the circuit breaker of HTTPClient.
+"""
+
+import threading
+import time
+import numpy as np
+import pytest
+import requests
+from voice_recognizer.benchmarks.pipeline_benchmark import LatencyModel
+from voice_recognizer.utils.http_utils import HTTPClient, CircuitOpenError
+
+@pytest.fixture
+def client(gemini_server):
+    settings = gemini_server.settings()
+    settings.update(max_retries=2, backoff_base=0.01, backoff_max=0.05,
+                    circuit_failure_threshold=2, circuit_reset_timeout=0.0)
+    http_client = HTTPClient(settings, name="Test")
+    yield http_client
+    http_client.close()
+
+def _post(client, gemini_server):
+    return client.post(gemini_server.url + ":generateContent", data=b"{}")
+
+def test_transient_statuses_are_retried(client, gemini_server):
+    gemini_server.statuses = [503, 429]
+
+    response = _post(client, gemini_server)
+
+    assert response.status_code == 200
+    assert gemini_server.requests == 3
+    assert client.stats()["retries"] == 2
+    assert client.stats()["circuit"] == "closed"
+
+def test_retries_are_bounded(client, gemini_server):
+    gemini_server.statuses = [503] * 5
+
+    response = _post(client, gemini_server)
+
+    assert response.status_code == 503
+    assert gemini_server.requests == client.max_retries + 1
+    assert client.stats()["failures"] == 1
+
+def test_breaker_opens_and_closes_after_a_successful_trial(client, gemini_server):
+    client.breaker.reset_timeout = 60.0
+    gemini_server.statuses = [503] * 6
+    _post(client, gemini_server)
+    _post(client, gemini_server)
+    assert client.breaker.state == "open"
+
+    # Circuito aperto: la richiesta fallisce senza contattare il server
+    requests_before = gemini_server.requests
+    with pytest.raises(CircuitOpenError):
+        _post(client, gemini_server)
+    assert gemini_server.requests == requests_before
+
+    # Dopo il timeout passa una richiesta di prova, che chiude il circuito
+    client.breaker.reset_timeout = 0.0
+    assert _post(client, gemini_server).status_code == 200
+    assert client.breaker.state == "closed"
+
+def test_failed_trial_with_a_non_transient_error_reopens_the_breaker(client, gemini_server, monkeypatch):
+    client.breaker.state = "open"
+
+    def _redirect_loop(url, **kwargs):
+        raise requests.exceptions.TooManyRedirects("loop")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(client.session, "post", _redirect_loop)
+        with pytest.raises(requests.exceptions.TooManyRedirects):
+            _post(client, gemini_server)
+
+    # La prova fallita riapre il circuito invece di lasciarlo bloccato in half-open
+    assert client.breaker.state == "open"
+    assert _post(client, gemini_server).status_code == 200
+    assert client.breaker.state == "closed"
+
+def test_sequential_requests_reuse_the_connection(client, gemini_server):
+    for _ in range(3):
+        _post(client, gemini_server).close()
+
+    assert client.stats()["new_connections"] == 1
+    assert client.stats()["reused_connections"] == 2
+
+def test_concurrent_connection_does_not_count_as_new_for_other_requests(client, gemini_server):
+    _post(client, gemini_server).close()
+
+    # Il primo thread riusa la connessione aperta; il secondo, partito mentre è occupata, ne apre un'altra
+    gemini_server.ttfb = LatencyModel("0.3", np.random.default_rng(0))
+    threads = [threading.Thread(target=lambda: _post(client, gemini_server).close()) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.1)
+    for thread in threads:
+        thread.join()
+
+    assert client.stats()["new_connections"] == 2
+    assert client.stats()["reused_connections"] == 1
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the queues shared between worker threads.
+"""
+
+import threading
+import time
+import pytest
+from voice_recognizer.utils.queue_utils import ReorderBuffer, BoundedQueue
+from voice_recognizer.utils.scheduler_utils import TimerScheduler
+
+@pytest.fixture
+def scheduler():
+    timer_scheduler = TimerScheduler("TestScheduler")
+    yield timer_scheduler
+    timer_scheduler.stop()
+
+def test_results_are_released_in_sequence_order():
+    delivered = []
+    buffer = ReorderBuffer(delivered.append)
+
+    buffer.submit(2, "c")
+    buffer.submit(1, "b")
+    assert delivered == []
+    assert buffer.pending_count() == 2
+
+    buffer.submit(0, "a")
+    assert delivered == ["a", "b", "c"]
+    assert buffer.pending_count() == 0
+
+def test_skipped_sequence_releases_the_next_results():
+    delivered = []
+    buffer = ReorderBuffer(delivered.append, first_sequence=5)
+
+    buffer.submit(6, "b")
+    buffer.skip(5)
+
+    assert delivered == ["b"]
+
+def test_concurrent_submits_keep_the_order():
+    delivered = []
+    buffer = ReorderBuffer(delivered.append)
+    sequences = list(range(200))[::-1]
+
+    threads = [threading.Thread(target=buffer.submit, args=(sequence, sequence)) for sequence in sequences]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert delivered == list(range(200))
+
+def test_missing_result_is_skipped_after_the_gap_timeout(scheduler):
+    delivered = []
+    released = threading.Event()
+    buffer = ReorderBuffer(
+        lambda item: (delivered.append(item), released.set()),
+        gap_timeout=0.05,
+        scheduler=scheduler
+    )
+
+    # La sequenza 0 non arriva mai: la 1 e la 2 aspettano solo fino alla scadenza
+    buffer.submit(2, "c")
+    buffer.submit(1, "b")
+    assert delivered == []
+
+    assert released.wait(2)
+    assert delivered == ["b", "c"]
+    assert buffer.skipped_gaps == 1
+
+    # Il risultato arrivato in ritardo viene scartato, l'ordine resta valido
+    buffer.submit(0, "a")
+    buffer.submit(3, "d")
+    assert delivered == ["b", "c", "d"]
+    assert buffer.late == 1
+
+def test_gap_filled_in_time_is_not_skipped(scheduler):
+    delivered = []
+    buffer = ReorderBuffer(delivered.append, gap_timeout=0.05, scheduler=scheduler)
+
+    buffer.submit(1, "b")
+    buffer.submit(0, "a")
+    time.sleep(0.1)
+
+    assert delivered == ["a", "b"]
+    assert buffer.skipped_gaps == 0
+
+def _filled(policy, **kwargs):
+    """
+    Build a queue of size 2 already holding "a" and "b".
+    """
+    queue = BoundedQueue(2, policy=policy, **kwargs)
+    queue.put("a")
+    queue.put("b")
+    return queue
+
+def _drain(queue):
+    items = []
+    while queue.qsize():
+        items.append(queue.get())
+        queue.task_done()
+    return items
+
+def test_invalid_policies_are_rejected():
+    with pytest.raises(ValueError):
+        BoundedQueue(2, policy="lifo")
+    with pytest.raises(ValueError):
+        BoundedQueue(2, policy="merge")
+
+def test_block_policy_waits_for_a_free_slot():
+    queue = _filled("block")
+    producer = threading.Thread(target=queue.put, args=("c",))
+    producer.start()
+
+    producer.join(0.1)
+    assert producer.is_alive()
+    assert queue.qsize() == 2
+
+    # Un get() libera un posto e sblocca il produttore
+    assert queue.get() == "a"
+    producer.join(2)
+    assert not producer.is_alive()
+    assert _drain(queue) == ["b", "c"]
+    assert queue.stats()["dropped"] == 0
+
+def test_drop_oldest_policy_discards_the_head():
+    discarded = []
+    queue = _filled("drop_oldest", on_discard=discarded.append)
+
+    queue.put("c")
+
+    assert discarded == ["a"]
+    assert _drain(queue) == ["b", "c"]
+    assert queue.stats() == {"depth": 0, "high_water": 2, "dropped": 1, "merged": 0}
+
+def test_merge_policy_combines_the_two_oldest_items():
+    discarded = []
+    queue = _filled("merge", merge=lambda first, second: first + second, on_discard=discarded.append)
+
+    queue.put("c")
+
+    assert discarded == ["b"]
+    assert _drain(queue) == ["ab", "c"]
+    assert queue.stats()["merged"] == 1
+
+def test_merge_policy_with_one_slot_drops_the_oldest():
+    queue = BoundedQueue(1, policy="merge", merge=lambda first, second: first + second)
+    queue.put("a")
+
+    queue.put("b")
+
+    assert _drain(queue) == ["b"]
+    assert queue.stats()["dropped"] == 1
+
+def test_forced_put_ignores_the_limit():
+    queue = _filled("block")
+
+    queue.put(None, force=True)
+
+    assert queue.qsize() == 3
+    assert queue.stats()["high_water"] == 3
+
+def test_join_waits_for_processed_and_discarded_items():
+    queue = _filled("drop_oldest")
+    queue.put("c")
+    waiter = threading.Thread(target=queue.join)
+    waiter.daemon = True
+    waiter.start()
+
+    # "a" è stato scartato, "b" e "c" restano da elaborare
+    assert queue.get() == "b"
+    queue.task_done()
+    waiter.join(0.05)
+    assert waiter.is_alive()
+
+    assert queue.get() == "c"
+    queue.task_done()
+    waiter.join(2)
+    assert not waiter.is_alive()
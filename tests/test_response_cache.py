@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the cache of Gemini responses.
+"""
+
+from voice_recognizer.config.api_settings import GEMINI_API_SETTINGS
+from voice_recognizer.services.conversation_service import ConversationStore
+from voice_recognizer.services.response_cache_service import ResponseCache
+
+HISTORY = {"enabled": True, "max_bytes": 4000, "summary_max_chars": 200, "summary_line_chars": 40}
+
+def _put(cache, text, context):
+    """Store a fake response to an utterance."""
+    cache.put(text, context, {"candidates": []}, f"risposta a {text}", [b"\0\0"])
+
+def test_same_history_replays_the_response():
+    cache = ResponseCache(model="m")
+    store = ConversationStore(HISTORY)
+    _, context = store.context()
+    _put(cache, "chi ha scritto la divina commedia", context)
+
+    assert cache.get("Chi ha scritto la Divina Commedia?", store.context()[1]).text == "risposta a chi ha scritto la divina commedia"
+
+def test_different_history_is_a_miss():
+    cache = ResponseCache(model="m")
+    store = ConversationStore(HISTORY)
+    store.add_turn("chi è dante", "Dante Alighieri è un poeta.")
+    _, context = store.context()
+    _put(cache, "dove è nato", context)
+
+    # Stessa domanda dopo un'altra storia: la risposta non vale più
+    store.clear()
+    store.add_turn("chi è leopardi", "Giacomo Leopardi è un poeta.")
+    assert cache.get("dove è nato", store.context()[1]) is None
+
+    store.clear()
+    store.add_turn("chi è dante", "Dante Alighieri è un poeta.")
+    assert cache.get("dove è nato", store.context()[1]) is not None
+
+def test_context_changes_with_every_turn():
+    store = ConversationStore(HISTORY)
+    seen = {store.context()}
+    for index in range(3):
+        store.add_turn(f"domanda {index}", f"Risposta {index}.")
+        seen.add(store.context())
+    assert len({digest for _, digest in seen}) == 4
+
+def test_disabled_history_has_a_constant_context():
+    store = ConversationStore(dict(HISTORY, enabled=False))
+    _, before = store.context()
+    store.add_turn("domanda", "Risposta.")
+    assert store.context()[1] == before == ""
+
+def test_relative_dates_are_never_cached():
+    cache = ResponseCache(model="m")
+    for text in ("che tempo fa domani", "cosa ho fatto ieri", "che programmi ci sono stasera", "chi ha vinto la partita della settimana scorsa"):
+        assert cache.ttl_for(text) == 0
+        _put(cache, text, "")
+        assert cache.get(text, "") is None
+
+    assert cache.ttl_for("che tempo fa oggi") == 15 * 60
+    assert cache.ttl_for("chi ha scritto i promessi sposi") == GEMINI_API_SETTINGS["response_cache"]["default_ttl"]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the single-thread timer scheduler.
+"""
+
+import threading
+import time
+import pytest
+from voice_recognizer.utils.scheduler_utils import TimerScheduler
+
+@pytest.fixture
+def scheduler():
+    timer_scheduler = TimerScheduler("TestScheduler")
+    yield timer_scheduler
+    timer_scheduler.stop()
+
+def _recorder():
+    """
+    Build a callback that records its arguments, and an event set when "last" runs.
+    """
+    calls = []
+    done = threading.Event()
+
+    def record(name):
+        calls.append(name)
+        if name == "last":
+            done.set()
+
+    return calls, done, record
+
+def test_tasks_run_in_deadline_order(scheduler):
+    calls, done, record = _recorder()
+    scheduler.schedule(0.06, record, "last")
+    scheduler.schedule(0.02, record, "first")
+    scheduler.schedule(0.04, record, "second")
+
+    assert done.wait(2)
+    assert calls == ["first", "second", "last"]
+
+def test_equal_deadlines_run_in_insertion_order(scheduler, monkeypatch):
+    calls, done, record = _recorder()
+
+    # Stesso istante per tutti i task: decide l'ordine di inserimento
+    monkeypatch.setattr(time, "monotonic", lambda: 1000.0)
+    for name in ("a", "b", "c", "last"):
+        scheduler.schedule(0, record, name)
+    monkeypatch.undo()
+
+    assert done.wait(2)
+    assert calls == ["a", "b", "c", "last"]
+
+def test_cancelled_task_does_not_run(scheduler):
+    calls, done, record = _recorder()
+    task = scheduler.schedule(0.02, record, "cancelled")
+    scheduler.schedule(0.05, record, "last")
+
+    scheduler.cancel(task)
+
+    assert not task.is_pending()
+    assert done.wait(2)
+    assert calls == ["last"]
+
+def test_reschedule_moves_the_task_behind_later_deadlines(scheduler):
+    calls, done, record = _recorder()
+    task = scheduler.schedule(0.02, record, "moved")
+    scheduler.schedule(0.04, record, "kept")
+
+    # Riprogrammare = annullare e pianificare di nuovo, come fa il countdown del buffer
+    scheduler.cancel(task)
+    scheduler.schedule(0.08, record, "last")
+    scheduler.schedule(0.06, record, "moved")
+
+    assert done.wait(2)
+    assert calls == ["kept", "moved", "last"]
+
+def test_cancel_of_a_task_that_already_ran_is_a_no_op(scheduler):
+    calls, done, record = _recorder()
+    task = scheduler.schedule(0, record, "last")
+    assert done.wait(2)
+
+    scheduler.cancel(task)
+    scheduler.cancel(None)
+
+    assert calls == ["last"]
+    assert scheduler.pending_count() == 0
+
+def test_cancel_keeps_the_heap_ordered(scheduler):
+    calls, done, record = _recorder()
+    tasks = [scheduler.schedule(0.05 + index * 0.01, record, f"t{index}") for index in range(8)]
+    scheduler.schedule(0.2, record, "last")
+
+    # Annullare dal centro dello heap non deve alterare l'ordine degli altri
+    for index in (3, 0, 6):
+        scheduler.cancel(tasks[index])
+    assert scheduler.pending_count() == 6
+
+    assert done.wait(2)
+    assert calls == ["t1", "t2", "t4", "t5", "t7", "last"]
+
+def test_time_scale_shortens_delays_and_speeds_up_the_clock(scheduler):
+    calls, done, record = _recorder()
+    scheduler.set_time_scale(10.0)
+
+    started = time.monotonic()
+    clock_start = scheduler.now()
+    scheduler.schedule(1.0, record, "last")
+
+    # Un secondo sull'orologio dello scheduler è un decimo di secondo reale
+    assert done.wait(2)
+    real = time.monotonic() - started
+    assert 0.09 <= real < 0.5
+    assert scheduler.now() - clock_start == pytest.approx(real * 10.0, rel=0.2)
+
+def test_time_scale_must_be_positive(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.set_time_scale(0)
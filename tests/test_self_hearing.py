@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for self-hearing suppression and barge-in in RecognitionService.
+"""
+
+import time
+import numpy as np
+import pytest
+import speech_recognition as sr
+from voice_recognizer.config.settings import RECOGNITION_SETTINGS
+from voice_recognizer.services.recognition_service import RecognitionService
+from voice_recognizer.services.vad_service import VoiceActivityDetector, VADSegmenter
+
+SAMPLE_RATE = 16000
+
+def _phrase(seconds):
+    """
+    Build a phrase of silence lasting the given time, just completed.
+    """
+    return sr.AudioData(b"\0\0" * int(SAMPLE_RATE * seconds), SAMPLE_RATE, 2)
+
+@pytest.fixture
+def service(monkeypatch):
+    """
+    Recognition service whose reply started playing two seconds ago.
+    """
+    monkeypatch.setitem(RECOGNITION_SETTINGS["calibration_profiles"], "enabled", False)
+    recognition_service = RecognitionService()
+    tts_service = recognition_service.gemini_service.tts_service
+    tts_service.is_speaking = True
+    tts_service._playback_windows.append((time.monotonic() - 2.0, None))
+    return recognition_service
+
+@pytest.mark.parametrize("mode", ["duck", "stop"])
+def test_phrase_started_during_barge_in_is_kept(service, monkeypatch, mode):
+    monkeypatch.setitem(service.barge_in, "mode", mode)
+    monkeypatch.setattr(service.gemini_service, "is_delivering", lambda: False)
+
+    # Il VAD segnala l'inizio del parlato, poi la frase si conclude
+    service._on_speech_start(20.0)
+    time.sleep(0.05)
+
+    assert not service._is_self_hearing(_phrase(1.0))
+
+def test_duck_mode_lowers_the_reply(service):
+    service._on_speech_start(20.0)
+
+    assert service.ducked
+    assert service.gemini_service.tts_service._duck_level == service.barge_in["duck_level"]
+
+def test_phrase_without_speech_onset_is_dropped_as_echo(service):
+    assert service._is_self_hearing(_phrase(1.0))
+
+def test_onset_as_loud_as_the_echo_is_not_barge_in(service):
+    service._on_speech_start(3.0)
+
+    assert not service.ducked
+    assert service._is_self_hearing(_phrase(1.0))
+
+def test_onset_right_after_the_reply_starts_is_not_barge_in(service):
+    tts_service = service.gemini_service.tts_service
+    tts_service._playback_windows.append((time.monotonic() - 0.2, None))
+
+    service._on_speech_start(30.0)
+
+    assert not service.ducked
+    assert service._is_self_hearing(_phrase(1.0))
+
+def _voice(seconds, amplitude):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return sum(amplitude / k * np.sin(2 * np.pi * 180 * k * t) for k in range(1, 5))
+
+def _silence(seconds, rng):
+    return 0.001 * rng.standard_normal(int(SAMPLE_RATE * seconds))
+
+def test_vad_onsets_of_the_echo_are_dropped_and_the_user_is_kept(service):
+    rng = np.random.default_rng(0)
+    detector = VoiceActivityDetector(SAMPLE_RATE)
+    detector.noise_floor_db = -60.0
+    segmenter = VADSegmenter(SAMPLE_RATE, 2, detector=detector, on_speech_start=service._on_speech_start)
+
+    def feed(signal):
+        pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes()
+        return [
+            sr.AudioData(phrase.data, SAMPLE_RATE, 2)
+            for start in range(0, len(pcm), 2048)
+            for phrase in segmenter.process(pcm[start:start + 2048])
+        ]
+
+    # L'eco della risposta: frasi allo stesso livello separate da pause
+    echo = feed(np.concatenate([np.concatenate([_voice(0.6, 0.05), _silence(0.5, rng)]) for _ in range(5)]))
+    assert len(echo) == 5
+    assert not service.ducked
+    assert all(service._is_self_hearing(audio) for audio in echo)
+
+    # L'utente parla sopra la risposta, molto più forte dell'eco
+    user = feed(np.concatenate([_voice(0.8, 0.5), _silence(0.5, rng)]))
+    assert len(user) == 1
+    assert service.ducked
+    assert not service._is_self_hearing(user[0])
+
+def test_phrase_after_playback_is_kept(service):
+    tts_service = service.gemini_service.tts_service
+    tts_service.is_speaking = False
+    tts_service._playback_windows.clear()
+    tts_service._playback_windows.append((time.monotonic() - 10.0, time.monotonic() - 5.0))
+
+    assert not service._is_self_hearing(_phrase(1.0))
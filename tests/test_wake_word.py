@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests for on-device wake word spotting on WAV recordings.
+
+The recordings are synthesized at test time: vowels are harmonic series
+shaped by their formants, fricatives are filtered noise, and each take of
+a word varies in pitch and tempo like a different utterance.
+"""
+
+import wave
+import numpy as np
+import pytest
+from voice_recognizer.services.wake_word_service import WakeWordService
+
+RATE = 16000
+
+# Formanti (Hz) delle vocali usate nelle parole sintetiche
+FORMANTS = {"a": (800, 1300, 2500), "e": (450, 1900, 2600), "i": (300, 2300, 3000),
+            "o": (500, 900, 2500), "u": (320, 800, 2300)}
+
+def _vowel(rng, name, duration, pitch):
+    t = np.arange(int(duration * RATE)) / float(RATE)
+    signal = np.zeros_like(t)
+    for harmonic in range(1, int(4000 / pitch)):
+        frequency = harmonic * pitch
+        weight = sum(np.exp(-((frequency - formant) / 120.0) ** 2) for formant in FORMANTS[name])
+        signal += weight * np.sin(2 * np.pi * frequency * t + rng.uniform(0, 2 * np.pi))
+    envelope = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.02)
+    return 0.1 * signal * envelope / np.abs(signal).max()
+
+def _fricative(rng, name, duration):
+    noise = rng.normal(0, 1, int(duration * RATE))
+    spectrum = np.fft.rfft(noise)
+    frequencies = np.fft.rfftfreq(len(noise), 1.0 / RATE)
+    spectrum *= (frequencies > 4000) if name == "s" else 0.5 * (frequencies > 1500)
+    return 0.03 * np.fft.irfft(spectrum, len(noise))
+
+def _write_word(path, rng, letters, tempo=1.0, pitch=150):
+    """
+    Synthesize words (separated by spaces) surrounded by silence and save them as a 16-bit WAV file.
+    """
+    silence = np.zeros(int(0.2 * RATE))
+    parts = [silence]
+    for letter in letters:
+        if letter == " ":
+            parts.append(silence)
+        elif letter in FORMANTS:
+            parts.append(_vowel(rng, letter, 0.18 * tempo, pitch))
+        else:
+            parts.append(_fricative(rng, letter, 0.1 * tempo))
+    signal = np.concatenate(parts + [silence])
+    signal += rng.normal(0, 0.002, len(signal))
+
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(RATE)
+        wav_file.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+    return str(path)
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1)
+
+@pytest.fixture
+def service(tmp_path, rng):
+    templates_dir = tmp_path / "wake_word"
+    templates_dir.mkdir()
+    for index, (tempo, pitch) in enumerate([(1.0, 140), (1.1, 160), (0.9, 180)]):
+        _write_word(templates_dir / f"sofi_{index}.wav", rng, "sofi", tempo, pitch)
+    return WakeWordService(templates_dir=str(templates_dir))
+
+def test_templates_are_loaded_with_a_threshold(service):
+    assert len(service.templates) == 3
+    assert service.is_available()
+    assert np.isfinite(service.threshold)
+
+@pytest.mark.parametrize("tempo, pitch", [(1.2, 150), (0.85, 200)])
+def test_wake_word_is_spotted_in_a_new_take(service, tmp_path, rng, tempo, pitch):
+    assert service.detect_file(_write_word(tmp_path / "sofi.wav", rng, "sofi", tempo, pitch))
+
+def test_wake_word_is_spotted_inside_a_longer_phrase(service, tmp_path, rng):
+    assert service.detect_file(_write_word(tmp_path / "phrase.wav", rng, "casa sofi"))
+
+@pytest.mark.parametrize("letters", ["casa", "aeu", "fiso"])
+def test_other_words_are_rejected(service, tmp_path, rng, letters):
+    assert not service.detect_file(_write_word(tmp_path / f"{letters}.wav", rng, letters))
+
+def test_template_cannot_collapse_onto_a_single_frame(service):
+    template = service.templates[0]
+
+    # Ogni frame del modello su un solo frame della frase: allineamento non ammesso
+    assert service._subsequence_dtw(template, template[len(template) // 2:len(template) // 2 + 1]) == float("inf")
+    assert np.isfinite(service._subsequence_dtw(template, template[::2]))
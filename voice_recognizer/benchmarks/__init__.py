@@ -0,0 +1,3 @@
+"""
+Benchmark per le prestazioni del riconoscimento vocale.
+"""
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of FLAC encoding for ASR uploads: in-process encoder versus the flac binary.
+
+Usage:
+    python -m voice_recognizer.benchmarks.flac_benchmark [FIXTURE ...]
+    python -m voice_recognizer.benchmarks.flac_benchmark --duration 5 --rates 16000,44100
+
+Each fixture is a mono WAV recording, or a directory of them; without
+fixtures a synthetic voiced phrase is generated at every rate. Both
+encoders get the same 16-bit samples; the binary is the one
+SpeechRecognition runs for every phrase when in_process_flac is off. Every
+stream produced in-process is decoded with the binary and compared with
+the input.
+"""
+
+import argparse
+import subprocess
+import time
+import numpy as np
+import speech_recognition as sr
+from voice_recognizer.benchmarks.vad_benchmark import find_fixtures
+from voice_recognizer.utils.audio_utils import read_wav, float_to_pcm16
+from voice_recognizer.utils.flac_utils import FlacEncoder
+
+def synthetic_phrase(rng, duration, sample_rate):
+    """
+    Generate a voiced phrase: a harmonic tone with a syllable-like envelope.
+
+    Args:
+        rng (numpy.random.Generator): The random generator.
+        duration (float): Length in seconds.
+        sample_rate (int): Sample rate.
+
+    Returns:
+        numpy.ndarray: The float samples.
+    """
+    t = np.arange(int(duration * sample_rate)) / float(sample_rate)
+    pitch = rng.uniform(110, 220)
+    voice = sum(np.sin(2 * np.pi * pitch * harmonic * t) / harmonic for harmonic in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 5) * t) ** 2
+    return (0.2 * voice * envelope + rng.normal(0, 0.003, len(t))).astype(np.float32)
+
+def decode_flac(data):
+    """
+    Decode a FLAC stream with the flac binary bundled with SpeechRecognition.
+
+    Args:
+        data (bytes): The FLAC stream.
+
+    Returns:
+        numpy.ndarray: The decoded 16-bit samples.
+    """
+    process = subprocess.run(
+        [sr.get_flac_converter(), "--decode", "--silent", "--stdout",
+         "--force-raw-format", "--endian=little", "--sign=signed", "-"],
+        input=data,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=True
+    )
+    return np.frombuffer(process.stdout, dtype="<i2")
+
+def time_call(function, repeat):
+    """
+    Time a call, keeping the median of several runs.
+
+    Args:
+        function (callable): The call to time.
+        repeat (int): Number of runs.
+
+    Returns:
+        tuple: The median time in milliseconds and the last result.
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), result
+
+def run_benchmark(signals, repeat):
+    """
+    Encode every signal with both encoders and print a report.
+
+    Args:
+        signals (list): (name, float samples, sample rate) tuples.
+        repeat (int): Runs per encoder and signal.
+
+    Returns:
+        list: One dict per signal with the timings, the sizes and the round-trip check.
+    """
+    encoder = FlacEncoder()
+    results = []
+
+    print(f"{'signal':<30} {'rate':>6} {'secs':>6} {'in-proc ms':>11} {'binary ms':>10} {'in-proc KB':>11} {'binary KB':>10} {'ok':>4}")
+    for name, samples, sample_rate in signals:
+        pcm = float_to_pcm16(samples)
+        audio = sr.AudioData(pcm.tobytes(), sample_rate, 2)
+
+        # Un primo giro a vuoto per le tabelle e i buffer
+        encoder.encode(pcm, sample_rate)
+        in_process_ms, stream = time_call(lambda: encoder.encode(pcm, sample_rate), repeat)
+        binary_ms, binary_stream = time_call(audio.get_flac_data, repeat)
+        round_trip = np.array_equal(decode_flac(stream), pcm)
+
+        results.append({
+            "name": name,
+            "sample_rate": sample_rate,
+            "in_process_ms": in_process_ms,
+            "binary_ms": binary_ms,
+            "in_process_bytes": len(stream),
+            "binary_bytes": len(binary_stream),
+            "round_trip": round_trip,
+        })
+        print(
+            f"{name[:30]:<30} {sample_rate:>6} {len(pcm) / float(sample_rate):>6.1f} "
+            f"{in_process_ms:>11.2f} {binary_ms:>10.2f} "
+            f"{len(stream) / 1024:>11.1f} {len(binary_stream) / 1024:>10.1f} {'yes' if round_trip else 'NO':>4}"
+        )
+    return results
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Confronta l'encoder FLAC interno con il binario flac.")
+    parser.add_argument("fixtures", nargs="*", help="File WAV o cartelle di file WAV")
+    parser.add_argument("--duration", type=float, default=5.0, help="Durata della frase sintetica in secondi")
+    parser.add_argument("--rates", default="16000,44100", help="Frequenze della frase sintetica, separate da virgole")
+    parser.add_argument("--repeat", type=int, default=20, help="Codifiche per encoder e segnale")
+    parser.add_argument("--seed", type=int, default=0, help="Seme del generatore casuale")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        signals = [(path, *read_wav(path)) for path in find_fixtures(args.fixtures)]
+        if not signals:
+            parser.error("Nessun file WAV trovato.")
+    else:
+        rng = np.random.default_rng(args.seed)
+        signals = [
+            ("synthetic", synthetic_phrase(rng, args.duration, int(rate)), int(rate))
+            for rate in args.rates.split(",")
+        ]
+    run_benchmark(signals, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Offline benchmark of the whole pipeline, with fake ASR, Gemini and TTS backends.
+
+Usage:
+    python -m voice_recognizer.benchmarks.pipeline_benchmark --synthetic 20
+    python -m voice_recognizer.benchmarks.pipeline_benchmark FIXTURE [FIXTURE ...] --speed 2
+
+The audio (WAV/FLAC fixtures, or a synthetic session of voiced bursts) is
+replayed through FileAudioSource and start_recognition, like a microphone.
+Transcription, the Gemini API and speech synthesis are replaced by fakes
+whose latencies are drawn from log-normal distributions ("median:sigma",
+in seconds); Gemini is a local SSE server, so the HTTP client and the
+stream parser are exercised too. No network, API key or audio device is
+needed: playback uses the SDL dummy driver.
+
+The report gives throughput, percentiles of every traced stage and the
+behavior of the audio queue, the timers and the speculative requests.
+Each fake transcript is the start time of its phrase in the recording, so
+transcripts delivered out of capture order are counted. The recording is
+never dropped from the audio queue (file replay blocks instead), and the
+end-of-turn deadlines and the simulated replies run on the recording
+clock, so turns are measured at any --speed. The simulated latencies are
+in recording time too, and the stage durations are reported in recording
+time (the real overhead of the pipeline is multiplied by the speed).
+--speed 0 has no such clock and measures the phrase stages (capture,
+queue, recognition) alone, in real time.
+"""
+
+import os
+
+# Nessun dispositivo audio: pygame usa il driver fittizio (prima di importarlo)
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import io
+import itertools
+import json
+import tempfile
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from voice_recognizer.config.settings import KEYWORD_SETTINGS, TTS_SETTINGS, TRACING_SETTINGS
+from voice_recognizer.config.api_settings import GEMINI_API_SETTINGS
+from voice_recognizer.services.asr_service import ASRBackend
+from voice_recognizer.services.file_source_service import FileAudioSource
+from voice_recognizer.services.gemini_service import GeminiService
+from voice_recognizer.services.tts_service import TTSService
+
+# Frequenza delle sessioni sintetiche
+SYNTHETIC_RATE = 16000
+
+# Byte iniziali di una frase cercati nella registrazione per riconoscerla
+PHRASE_HEAD_BYTES = 3200
+
+# Fasi misurate per ogni frase; le altre dipendono dalle scadenze di fine turno
+PHRASE_STAGES = ("capture", "asr_queue", "asr", "add_to_buffer")
+
+class LatencyModel:
+    """
+    Log-normal latency distribution.
+    """
+
+    def __init__(self, spec, rng, time_scale=1.0):
+        """
+        Initialize the distribution.
+
+        Args:
+            spec (str): "median:sigma" in seconds (sigma of the log, 0 for a fixed latency).
+            rng (numpy.random.Generator): The random generator.
+            time_scale (float): Speed of the replay; latencies are divided by it.
+        """
+        median, _, sigma = spec.partition(":")
+        self.median = float(median) / time_scale
+        self.sigma = float(sigma or 0.0)
+        self.rng = rng
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """
+        Draw a latency.
+
+        Returns:
+            float: Seconds.
+        """
+        if self.median <= 0:
+            return 0.0
+        with self._lock:
+            return float(self.rng.lognormal(np.log(self.median), self.sigma))
+
+class FakeASRBackend(ASRBackend):
+    """
+    ASR backend that waits for a random latency and names the phrase by its position in the recording.
+
+    The transcript depends only on the audio, not on the order in which the
+    workers finish, so the order of the transcripts reaching the buffer
+    shows whether the worker pool kept the capture order.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency, source):
+        """
+        Initialize the backend.
+
+        Args:
+            latency (LatencyModel): Latency of each transcription.
+            source (FileAudioSource): The recording being replayed.
+        """
+        super().__init__()
+        self.latency = latency
+        self.source = source
+
+    def phrase_offset(self, audio):
+        """
+        Find where a phrase starts in the recording.
+
+        Args:
+            audio (AudioData): The phrase, as captured from the source.
+
+        Returns:
+            float: Seconds from the start of the recording, or None if not found.
+        """
+        # Il VAD consegna i byte della sorgente: basta cercarne l'inizio
+        head = audio.get_raw_data(self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)[:PHRASE_HEAD_BYTES]
+        index = self.source.frame_data.find(head)
+        while index >= 0 and index % self.source.SAMPLE_WIDTH:
+            index = self.source.frame_data.find(head, index + 1)
+        if index < 0:
+            return None
+        return index / float(self.source.bytes_per_second)
+
+    def _recognize(self, audio):
+        """
+        Simulate a transcription.
+
+        Args:
+            audio (AudioData): The phrase.
+
+        Returns:
+            str: The transcript, "frase" followed by the start time of the phrase.
+        """
+        time.sleep(self.latency.sample())
+        offset = self.phrase_offset(audio)
+        if offset is None:
+            return "frase sconosciuta"
+        return f"frase {offset:.2f}"
+
+class FakeTTSService(TTSService):
+    """
+    TTS service that synthesizes silence of a plausible duration after a random latency.
+    """
+
+    def __init__(self, latency, chars_per_second=15.0):
+        """
+        Initialize the service.
+
+        Args:
+            latency (LatencyModel): Latency of each synthesized chunk.
+            chars_per_second (float): Speaking rate that sets the duration of the audio.
+        """
+        super().__init__()
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+
+    def _synthesize(self, text):
+        """
+        Simulate the synthesis of a chunk.
+
+        Args:
+            text (str): The chunk.
+
+        Yields:
+            bytes: A WAV file of silence.
+        """
+        time.sleep(self.latency.sample())
+        frames = int(22050 * len(text) / self.chars_per_second)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(22050)
+            wav_file.writeframes(b"\0\0" * frames)
+        yield buffer.getvalue()
+
+class FakeGeminiServer:
+    """
+    Local HTTP server that answers like the Gemini API, with random latencies.
+    """
+
+    def __init__(self, ttfb, fragment_delay, fragments=4):
+        """
+        Start the server on a free local port.
+
+        Args:
+            ttfb (LatencyModel): Time to the first fragment.
+            fragment_delay (LatencyModel): Time between two fragments.
+            fragments (int): Fragments of each streamed response.
+        """
+        self.ttfb = ttfb
+        self.fragment_delay = fragment_delay
+        self.fragments = fragments
+        self.requests = 0
+        self.statuses = []  # Stati di errore restituiti, in ordine, prima delle risposte normali
+        self._counter = itertools.count(1)
+
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                server.requests += 1
+                if server.statuses:
+                    self.send_response(server.statuses.pop(0))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                words = f"Risposta numero {next(server._counter)}, tutto chiaro. Posso aiutarti ancora?".split(" ")
+                time.sleep(server.ttfb.sample())
+
+                if "streamGenerateContent" not in self.path:
+                    self._send_json({"candidates": [{"content": {"parts": [{"text": " ".join(words)}]}}]})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                size = max(1, -(-len(words) // server.fragments))
+                for index in range(0, len(words), size):
+                    if index:
+                        time.sleep(server.fragment_delay.sample())
+                    fragment = " ".join(words[index:index + size]) + " "
+                    event = json.dumps({"candidates": [{"content": {"parts": [{"text": fragment}]}}]})
+                    self._send_chunk(f"data: {event}\r\n\r\n".encode("utf-8"))
+                self._send_chunk(b"")
+
+            def _send_json(self, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, data):
+                try:
+                    self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Richiesta speculativa annullata: il client ha chiuso la connessione
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1beta/models/fake"
+        server_thread = threading.Thread(target=self.httpd.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+
+    def settings(self):
+        """
+        Build GeminiService settings pointing at this server.
+
+        Returns:
+            dict: A copy of GEMINI_API_SETTINGS.
+        """
+        settings = dict(GEMINI_API_SETTINGS)
+        settings.update(
+            api_key="benchmark",
+            api_url=self.url + ":generateContent",
+            stream_api_url=self.url + ":streamGenerateContent",
+            enabled=True,
+        )
+        settings["response_cache"] = dict(settings["response_cache"], enabled=False)
+        return settings
+
+    def close(self):
+        """
+        Stop the server.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def synthetic_session(rng, turns):
+    """
+    Generate a recording of voiced bursts grouped into turns.
+
+    Each phrase is a harmonic tone with a syllable-like envelope over a
+    low noise floor; phrases of a turn are separated by short pauses, turns
+    by the time the assistant needs to answer.
+
+    Args:
+        rng (numpy.random.Generator): The random generator.
+        turns (int): Number of turns.
+
+    Returns:
+        tuple: The float samples and the number of phrases.
+    """
+    pieces = [rng.normal(0, 0.003, int(1.0 * SYNTHETIC_RATE))]
+    phrases = 0
+    for _ in range(turns):
+        for position in range(int(rng.integers(1, 4))):
+            if position:
+                pieces.append(rng.normal(0, 0.003, int(rng.uniform(0.6, 1.2) * SYNTHETIC_RATE)))
+
+            duration = rng.uniform(0.6, 1.8)
+            t = np.arange(int(duration * SYNTHETIC_RATE)) / float(SYNTHETIC_RATE)
+            pitch = rng.uniform(110, 220)
+            voice = sum(np.sin(2 * np.pi * pitch * harmonic * t) / harmonic for harmonic in range(1, 6))
+            envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 5) * t) ** 2
+            pieces.append(0.2 * voice * envelope + rng.normal(0, 0.003, len(t)))
+            phrases += 1
+
+        # L'utente aspetta la risposta prima del turno successivo
+        pieces.append(rng.normal(0, 0.003, int(rng.uniform(8.0, 12.0) * SYNTHETIC_RATE)))
+    return np.concatenate(pieces).astype(np.float32), phrases
+
+def write_wav(path, samples, sample_rate):
+    """
+    Write a float signal as a 16-bit mono WAV file.
+
+    Args:
+        path (str): Path of the file.
+        samples (numpy.ndarray): The float signal.
+        sample_rate (int): Sample rate.
+    """
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+
+def percentiles(values):
+    """
+    Summarize a list of durations.
+
+    Args:
+        values (list): Durations in milliseconds.
+
+    Returns:
+        tuple: Count, p50, p90, p99 and maximum.
+    """
+    data = np.asarray(values, dtype=float)
+    p50, p90, p99 = np.percentile(data, [50, 90, 99])
+    return len(data), p50, p90, p99, float(data.max())
+
+def run_benchmark(path, args, expected_turns=None):
+    """
+    Replay a recording through the pipeline with the fake backends and print a report.
+
+    Args:
+        path (str): The recording (file or directory).
+        args (argparse.Namespace): Command line options.
+        expected_turns (int, optional): Turns in the recording, if known.
+
+    Returns:
+        dict: Spans per stage and the pipeline counters.
+    """
+    # La configurazione va adattata prima di creare i servizi
+    KEYWORD_SETTINGS["enabled"] = False
+    TTS_SETTINGS["cache"]["enabled"] = False
+    TRACING_SETTINGS.update(enabled=True, jsonl_path=args.trace_file, http_port=None, recent_spans=1000000)
+
+    from voice_recognizer.services.recognition_service import RecognitionService
+
+    # Backend simulati nel tempo della registrazione: a velocità doppia rispondono in metà tempo
+    time_scale = args.speed or 1.0
+    rng = np.random.default_rng(args.seed)
+    gemini_server = FakeGeminiServer(
+        LatencyModel(args.gemini_ttfb, rng, time_scale),
+        LatencyModel(args.gemini_fragment_delay, rng, time_scale)
+    )
+
+    source = FileAudioSource(path, speed=args.speed)
+    service = RecognitionService()
+    service.asr_backend = FakeASRBackend(LatencyModel(args.asr_latency, rng, time_scale), source)
+    service.gemini_service = GeminiService(
+        settings=gemini_server.settings(),
+        tts_service=FakeTTSService(LatencyModel(args.tts_latency, rng, time_scale), chars_per_second=15.0 * time_scale)
+    )
+
+    # Campiona le scadenze in attesa sullo scheduler
+    timer_samples = []
+    sampling = threading.Event()
+
+    def sample_timers():
+        while not sampling.wait(0.05):
+            timer_samples.append(service.pending_timers())
+
+    sampler = threading.Thread(target=sample_timers)
+    sampler.daemon = True
+    sampler.start()
+
+    # Trascrizioni nell'ordine in cui arrivano al buffer, dopo il riordino
+    transcripts = []
+    add_to_buffer = service._add_to_buffer
+
+    def record_transcript(text, *args):
+        transcripts.append(text)
+        return add_to_buffer(text, *args)
+
+    service._add_to_buffer = record_transcript
+
+    started_at = time.perf_counter()
+    service.start_recognition(source)
+    while not source.finished.wait(0.1):
+        pass
+    service.stop_listening_callback(wait_for_stop=True)
+    service.wait_until_idle()
+    elapsed = time.perf_counter() - started_at
+
+    sampling.set()
+    service.stop_recognition()
+    gemini_server.close()
+
+    spans = {}
+    turns = set()
+    for line in service.tracer.recent_spans().splitlines():
+        record = json.loads(line)
+        spans.setdefault(record["span"], []).append(record["duration_ms"] * time_scale)
+        turns.add(record["turn"])
+
+    asr_stats = service.asr_stats()
+    queue_stats = service.audio_queue_stats()
+    turn_count = len(spans.get("turn_total", []))
+
+    # Senza pacing non c'è un orologio della registrazione: le pause spariscono
+    # e le frasi di più turni finiscono in un unico invio
+    turns_measured = args.speed > 0
+    if not turns_measured:
+        spans = {name: values for name, values in spans.items() if name in PHRASE_STAGES}
+
+    offsets = [float(text.split()[-1]) for text in transcripts if text.split()[-1][0].isdigit()]
+    out_of_order = sum(1 for previous, current in zip(offsets, offsets[1:]) if current < previous)
+
+    print(f"\nAudio: {source.duration:.1f}s replayed in {elapsed:.1f}s "
+          f"(speed {args.speed:g}x, real-time factor {source.duration / elapsed:.2f})")
+    print(f"Phrases: {asr_stats['calls']} transcribed ({asr_stats['calls'] / elapsed:.2f}/s), "
+          f"{service.echo_phrases_dropped} dropped during playback, {out_of_order} delivered out of order")
+    if turns_measured:
+        turns_line = (f"Turns: {turn_count} answered ({turn_count / elapsed * 60:.1f}/min), "
+                      f"{gemini_server.requests} Gemini requests (speculative included)")
+        if expected_turns is not None:
+            turns_line += f" (expected {expected_turns})"
+        print(turns_line)
+    else:
+        print("Turns: not measured, the end-of-turn deadlines need a --speed above 0")
+
+    print(f"\n{'stage':<16} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name in sorted(spans):
+        count, p50, p90, p99, maximum = percentiles(spans[name])
+        print(f"{name:<16} {count:>6} {p50:>9.1f} {p90:>9.1f} {p99:>9.1f} {maximum:>9.1f}")
+
+    print("\nAudio queue: depth high-water {high_water}, dropped {dropped}, merged {merged}".format(**queue_stats))
+    if turns_measured:
+        if timer_samples:
+            print(f"Pending timers: mean {np.mean(timer_samples):.2f}, max {max(timer_samples)}")
+        print("Speculative requests: started {started}, reused {reused}, cancelled {cancelled}".format(**service.speculation_stats))
+        if service.end_of_turn is not None:
+            quantile = service.end_of_turn.gap_quantile()
+            print("End of turn: learned pause quantile " + (f"{quantile:.2f}s" if quantile is not None else "n/a"))
+
+    return {"spans": spans, "turns": turn_count if turns_measured else None, "elapsed": elapsed,
+            "audio_queue": queue_stats, "out_of_order": out_of_order}
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark dell'intera pipeline con backend simulati.")
+    parser.add_argument("fixtures", nargs="?", help="File WAV/FLAC o cartella di file da riprodurre")
+    parser.add_argument("--synthetic", type=int, default=0, help="Numero di turni di una sessione sintetica")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Velocità di riproduzione (0: il più veloce possibile, senza misurare i turni)")
+    parser.add_argument("--seed", type=int, default=0, help="Seme per la sessione e le latenze simulate")
+    parser.add_argument("--asr-latency", default="0.4:0.4", help="Latenza ASR, mediana:sigma in secondi")
+    parser.add_argument("--gemini-ttfb", default="0.5:0.3", help="Tempo al primo frammento di Gemini")
+    parser.add_argument("--gemini-fragment-delay", default="0.1:0.3", help="Tempo tra i frammenti di Gemini")
+    parser.add_argument("--tts-latency", default="0.2:0.3", help="Latenza di sintesi di ogni chunk")
+    parser.add_argument("--trace-file", default=None, help="Scrive anche le tracce in questo file JSON lines")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        run_benchmark(args.fixtures, args)
+        return
+
+    if not args.synthetic:
+        parser.error("Indica dei file audio o usa --synthetic.")
+
+    samples, phrases = synthetic_session(np.random.default_rng(args.seed), args.synthetic)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.wav")
+        write_wav(path, samples, SYNTHETIC_RATE)
+        print(f"Sessione sintetica: {args.synthetic} turni, {phrases} frasi")
+        run_benchmark(path, args, expected_turns=args.synthetic)
+
+if __name__ == "__main__":
+    main()
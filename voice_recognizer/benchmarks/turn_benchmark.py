@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Replay benchmark of end-of-turn detection: fixed buffer delay versus the adaptive detector.
+
+Usage:
+    python -m voice_recognizer.benchmarks.turn_benchmark SESSION [SESSION ...]
+    python -m voice_recognizer.benchmarks.turn_benchmark --synthetic 5
+
+Each session is a JSON file (or a directory of them) with the transcripts
+of a conversation, grouped by the turns the user intended:
+
+    {"turns": [{"phrases": [{"time": 0.0, "text": "che tempo fa"},
+                            {"time": 1.8, "text": "domani a Roma?"}]}, ...]}
+
+"time" is when the transcript reached the buffer, in seconds from the
+start of the session. Every send that happens before the last phrase of
+its turn is a premature send.
+"""
+
+import argparse
+import json
+import os
+import numpy as np
+from voice_recognizer.config.settings import RECOGNITION_SETTINGS
+from voice_recognizer.services.end_of_turn_service import EndOfTurnDetector
+
+# Parole per generare sessioni sintetiche
+SYNTHETIC_WORDS = ["che", "tempo", "fa", "domani", "Roma", "musica", "sveglia", "luce", "cucina", "notizie"]
+
+class FixedPolicy:
+    """
+    The fixed deadline of RecognitionService without the adaptive detector.
+    """
+
+    def __init__(self):
+        """
+        Initialize the policy from RECOGNITION_SETTINGS["buffer_delay"].
+        """
+        buffer_delay = RECOGNITION_SETTINGS["buffer_delay"]
+        self.delay = (buffer_delay - 3.0 if buffer_delay > 3.0 else 0.1) + 3.0
+
+    def observe_gap(self, gap):
+        """
+        Ignore the pause: the deadline does not adapt.
+
+        Args:
+            gap (float): Seconds between two phrases.
+        """
+
+    def send_delay(self, text):
+        """
+        Get the deadline of the turn.
+
+        Args:
+            text (str): The text of the turn so far.
+
+        Returns:
+            float: Seconds to wait after the latest phrase.
+        """
+        return self.delay
+
+def replay(turns, policy):
+    """
+    Replay a session through a send policy.
+
+    Args:
+        turns (list): The turns of the session, each a list of (time, text) tuples.
+        policy: Object with observe_gap(gap) and send_delay(text).
+
+    Returns:
+        dict: Turn latencies, premature sends, merged turns and number of turns.
+    """
+    phrases = [(time, text, index) for index, turn in enumerate(turns) for time, text in turn]
+    phrases.sort()
+    last_of_turn = {index: max(time for time, _ in turn) for index, turn in enumerate(turns) if turn}
+
+    latencies = []
+    premature = 0
+    merged = 0
+    buffer = []  # Frasi in attesa di invio: (istante, testo, indice del turno)
+    deadline = None
+    previous_time = None
+
+    def send(send_time):
+        nonlocal premature, merged
+        turn_indexes = {index for _, _, index in buffer}
+        merged += len(turn_indexes) - 1
+        last_time, _, last_index = buffer[-1]
+        if last_time < last_of_turn[last_index]:
+            premature += 1
+        else:
+            latencies.append(send_time - last_of_turn[last_index])
+        buffer.clear()
+
+    for time, text, index in phrases:
+        if buffer and time > deadline:
+            send(deadline)
+
+        if previous_time is not None:
+            policy.observe_gap(time - previous_time)
+        previous_time = time
+
+        buffer.append((time, text, index))
+        deadline = time + policy.send_delay(" ".join(phrase_text for _, phrase_text, _ in buffer))
+
+    if buffer:
+        send(deadline)
+
+    return {"latencies": latencies, "premature": premature, "merged": merged, "turns": len(turns)}
+
+def load_session(path):
+    """
+    Load a session file.
+
+    Args:
+        path (str): Path of the JSON file.
+
+    Returns:
+        list: The turns, each a list of (time, text) tuples.
+    """
+    with open(path, encoding="utf-8") as session_file:
+        data = json.load(session_file)
+    return [
+        [(float(phrase["time"]), phrase.get("text", "")) for phrase in turn["phrases"]]
+        for turn in data["turns"]
+    ]
+
+def synthetic_session(rng, turns=60):
+    """
+    Generate a session for a simulated user with their own pause habits.
+
+    Args:
+        rng (numpy.random.Generator): The random generator.
+        turns (int): Number of turns.
+
+    Returns:
+        list: The turns, each a list of (time, text) tuples.
+    """
+    median_pause = rng.uniform(0.2, 1.0)
+    session = []
+    time = 0.0
+    for _ in range(turns):
+        turn = []
+        phrase_count = int(rng.integers(1, 5))
+        for position in range(phrase_count):
+            words = list(rng.choice(SYNTHETIC_WORDS, size=int(rng.integers(2, 6))))
+            if position < phrase_count - 1 and rng.random() < 0.3:
+                words.append("e")
+            elif position == phrase_count - 1 and rng.random() < 0.3:
+                words[-1] += "?"
+
+            # La trascrizione arriva alla fine della frase: pausa più durata della frase
+            time += rng.lognormal(np.log(median_pause), 0.5) + rng.uniform(0.5, 1.5)
+            turn.append((time, " ".join(words)))
+        session.append(turn)
+
+        # Tempo per la risposta dell'assistente prima del turno successivo
+        time += rng.uniform(6.0, 15.0)
+    return session
+
+def find_sessions(paths):
+    """
+    Expand the command line paths into a list of session files.
+
+    Args:
+        paths (list): Files or directories.
+
+    Returns:
+        list: Paths of the JSON files.
+    """
+    sessions = []
+    for path in paths:
+        if os.path.isdir(path):
+            sessions.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(".json")
+            )
+        else:
+            sessions.append(path)
+    return sessions
+
+def run_benchmark(sessions):
+    """
+    Replay every session with both policies and print a report.
+
+    Args:
+        sessions (list): (name, turns) tuples.
+
+    Returns:
+        dict: Totals per policy.
+    """
+    policies = (("fixed", FixedPolicy), ("adaptive", EndOfTurnDetector))
+    totals = {name: {"latencies": [], "premature": 0, "merged": 0, "turns": 0} for name, _ in policies}
+
+    print(f"{'session':<30} {'policy':<9} {'turns':>6} {'latency (s)':>12} {'premature':>10} {'merged':>7}")
+    for session_name, turns in sessions:
+        for name, policy_class in policies:
+            # Ogni sessione parte da zero, come un nuovo utente
+            result = replay(turns, policy_class())
+
+            total = totals[name]
+            total["latencies"].extend(result["latencies"])
+            for key in ("premature", "merged", "turns"):
+                total[key] += result[key]
+
+            latency = float(np.mean(result["latencies"])) if result["latencies"] else float("nan")
+            print(
+                f"{session_name[:30]:<30} {name:<9} {result['turns']:>6} {latency:>12.3f} "
+                f"{result['premature'] / max(1, result['turns']):>10.1%} {result['merged']:>7}"
+            )
+
+    print("\nTotals:")
+    for name, total in totals.items():
+        latency = float(np.mean(total["latencies"])) if total["latencies"] else float("nan")
+        rate = total["premature"] / max(1, total["turns"])
+        print(
+            f"  {name:<9} turns={total['turns']} avg_turn_latency={latency:.3f}s "
+            f"premature_rate={rate:.1%} merged={total['merged']}"
+        )
+    return totals
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Confronta la scadenza fissa con il rilevamento adattivo della fine del turno.")
+    parser.add_argument("sessions", nargs="*", help="File JSON di sessione o cartelle di file JSON")
+    parser.add_argument("--synthetic", type=int, default=0, help="Numero di utenti simulati da aggiungere")
+    parser.add_argument("--seed", type=int, default=0, help="Seme per le sessioni simulate")
+    args = parser.parse_args(argv)
+
+    sessions = [(os.path.basename(path), load_session(path)) for path in find_sessions(args.sessions)]
+
+    rng = np.random.default_rng(args.seed)
+    sessions.extend((f"synthetic-{i}", synthetic_session(rng)) for i in range(args.synthetic))
+
+    if not sessions:
+        parser.error("Nessuna sessione: indica dei file JSON o usa --synthetic.")
+    run_benchmark(sessions)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of phrase segmentation: VAD versus the energy threshold.
+
+Usage:
+    python -m voice_recognizer.benchmarks.vad_benchmark FIXTURE [FIXTURE ...]
+
+Each fixture is a mono WAV recording, or a directory of them. If a label
+file with the same name and a .txt extension exists (the format exported by
+Audacity: "start<TAB>end<TAB>label" per line, in seconds), it is used as
+the ground truth for the utterances.
+"""
+
+import argparse
+import math
+import os
+import time
+import numpy as np
+from voice_recognizer.config.settings import RECOGNITION_SETTINGS
+from voice_recognizer.services.vad_service import VADSegmenter
+from voice_recognizer.utils.audio_utils import read_wav
+
+# Dimensione dei blocchi letti dal microfono, come in speech_recognition
+CHUNK_SIZE = 1024
+
+def load_labels(path):
+    """
+    Load utterance labels exported by Audacity.
+
+    Args:
+        path (str): Path of the label file.
+
+    Returns:
+        list: List of (start, end) tuples in seconds.
+    """
+    labels = []
+    with open(path, encoding="utf-8") as label_file:
+        for line in label_file:
+            fields = line.split("\t")
+            if len(fields) >= 2 and not line.startswith("\\"):
+                labels.append((float(fields[0]), float(fields[1])))
+    return labels
+
+def segment_with_vad(samples, sample_rate):
+    """
+    Segment a recording with the VAD, feeding it microphone-sized chunks.
+
+    Args:
+        samples (numpy.ndarray): The float signal.
+        sample_rate (int): Sample rate of the signal.
+
+    Returns:
+        list: List of (start, end) tuples in seconds.
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    segmenter = VADSegmenter(
+        sample_rate,
+        2,
+        phrase_time_limit=RECOGNITION_SETTINGS["phrase_time_limit"]
+    )
+
+    segments = []
+    chunk_bytes = CHUNK_SIZE * 2
+    for offset in range(0, len(pcm), chunk_bytes):
+        for phrase in segmenter.process(pcm[offset:offset + chunk_bytes]):
+            segments.append((phrase.start_time, phrase.end_time))
+
+    phrase = segmenter.flush()
+    if phrase is not None:
+        segments.append((phrase.start_time, phrase.end_time))
+    return segments
+
+def segment_with_energy_gate(samples, sample_rate):
+    """
+    Segment a recording like Recognizer.listen does, with the energy threshold,
+    pause_threshold, non_speaking_duration and phrase_time_limit settings.
+
+    Args:
+        samples (numpy.ndarray): The float signal.
+        sample_rate (int): Sample rate of the signal.
+
+    Returns:
+        list: List of (start, end) tuples in seconds.
+    """
+    seconds_per_buffer = CHUNK_SIZE / float(sample_rate)
+    chunks = len(samples) // CHUNK_SIZE
+    energies = np.sqrt(np.mean(samples[:chunks * CHUNK_SIZE].reshape(chunks, CHUNK_SIZE) ** 2, axis=1)) * 32768
+
+    pause_buffers = int(math.ceil(RECOGNITION_SETTINGS["pause_threshold"] / seconds_per_buffer))
+    phrase_buffers = int(math.ceil(0.3 / seconds_per_buffer))  # Recognizer.phrase_threshold
+    non_speaking_buffers = int(math.ceil(RECOGNITION_SETTINGS["non_speaking_duration"] / seconds_per_buffer))
+    limit_buffers = int(math.ceil(RECOGNITION_SETTINGS["phrase_time_limit"] / seconds_per_buffer))
+
+    # Calibrazione come adjust_for_ambient_noise, poi soglia dinamica
+    calibration = max(1, int(RECOGNITION_SETTINGS["calibration_duration"] / seconds_per_buffer))
+    threshold = float(np.mean(energies[:calibration])) * 1.5
+    damping = 0.15 ** seconds_per_buffer
+
+    segments = []
+    index = calibration
+    while index < chunks:
+        # Attesa dell'inizio della frase
+        if energies[index] <= threshold:
+            if RECOGNITION_SETTINGS["dynamic_energy_threshold"]:
+                threshold = threshold * damping + energies[index] * 1.5 * (1 - damping)
+            index += 1
+            continue
+
+        start = index - non_speaking_buffers
+        pause_count = 0
+        phrase_count = 0
+        while index < chunks and index - start < limit_buffers:
+            if energies[index] > threshold:
+                pause_count = 0
+            else:
+                pause_count += 1
+            phrase_count += 1
+            index += 1
+            if pause_count > pause_buffers:
+                break
+
+        # Le frasi troppo brevi vengono scartate
+        if phrase_count - pause_count >= phrase_buffers:
+            segments.append((max(start, 0) * seconds_per_buffer, index * seconds_per_buffer))
+
+    return segments
+
+def evaluate(segments, labels):
+    """
+    Compare detected segments with the labeled utterances.
+
+    Args:
+        segments (list): Detected (start, end) tuples.
+        labels (list): Labeled (start, end) tuples.
+
+    Returns:
+        dict: End-of-speech latency, partial phrases, missed utterances and spurious segments.
+    """
+    latencies = []
+    partial = 0
+    missed = 0
+    matched = set()
+
+    for label_start, label_end in labels:
+        overlapping = [
+            i for i, (start, end) in enumerate(segments)
+            if start < label_end and end > label_start
+        ]
+        if not overlapping:
+            missed += 1
+            continue
+
+        matched.update(overlapping)
+
+        # Ogni segmento in più dentro lo stesso enunciato è una frase spezzata
+        partial += len(overlapping) - 1
+        latencies.append(max(segments[i][1] for i in overlapping) - label_end)
+
+    return {
+        "eos_latency": float(np.mean(latencies)) if latencies else float("nan"),
+        "partial": partial,
+        "missed": missed,
+        "spurious": len(segments) - len(matched),
+    }
+
+def find_fixtures(paths):
+    """
+    Expand the command line paths into a list of WAV files.
+
+    Args:
+        paths (list): Files or directories.
+
+    Returns:
+        list: Paths of the WAV files.
+    """
+    fixtures = []
+    for path in paths:
+        if os.path.isdir(path):
+            fixtures.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(".wav")
+            )
+        else:
+            fixtures.append(path)
+    return fixtures
+
+def run_benchmark(fixtures):
+    """
+    Run both segmenters on every fixture and print a report.
+
+    Args:
+        fixtures (list): Paths of the WAV files.
+
+    Returns:
+        dict: Totals per method.
+    """
+    methods = (("vad", segment_with_vad), ("energy", segment_with_energy_gate))
+    totals = {name: {"segments": 0, "latencies": [], "partial": 0, "missed": 0,
+                     "spurious": 0, "seconds": 0.0, "audio": 0.0} for name, _ in methods}
+
+    print(f"{'fixture':<30} {'method':<7} {'segs':>5} {'eos lat (s)':>12} {'partial':>8} {'missed':>7} {'RTF':>8}")
+    for path in fixtures:
+        samples, sample_rate = read_wav(path)
+        duration = len(samples) / float(sample_rate)
+        label_path = os.path.splitext(path)[0] + ".txt"
+        labels = load_labels(label_path) if os.path.exists(label_path) else []
+
+        for name, segment in methods:
+            start = time.perf_counter()
+            segments = segment(samples, sample_rate)
+            elapsed = time.perf_counter() - start
+
+            total = totals[name]
+            total["segments"] += len(segments)
+            total["seconds"] += elapsed
+            total["audio"] += duration
+
+            result = evaluate(segments, labels) if labels else None
+            if result:
+                if not math.isnan(result["eos_latency"]):
+                    total["latencies"].append(result["eos_latency"])
+                for key in ("partial", "missed", "spurious"):
+                    total[key] += result[key]
+
+            print(
+                f"{os.path.basename(path)[:30]:<30} {name:<7} {len(segments):>5} "
+                f"{result['eos_latency'] if result else float('nan'):>12.3f} "
+                f"{result['partial'] if result else '-':>8} "
+                f"{result['missed'] if result else '-':>7} "
+                f"{elapsed / duration:>8.4f}"
+            )
+
+    print("\nTotals:")
+    for name, total in totals.items():
+        latency = float(np.mean(total["latencies"])) if total["latencies"] else float("nan")
+        rtf = total["seconds"] / total["audio"] if total["audio"] else float("nan")
+        print(
+            f"  {name:<7} segments={total['segments']} eos_latency={latency:.3f}s "
+            f"partial={total['partial']} missed={total['missed']} spurious={total['spurious']} RTF={rtf:.4f}"
+        )
+    return totals
+
+def main(argv=None):
+    """
+    Command line entry point.
+
+    Args:
+        argv (list, optional): Command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Confronta la segmentazione VAD con la soglia di energia.")
+    parser.add_argument("fixtures", nargs="+", help="File WAV o cartelle di file WAV")
+    args = parser.parse_args(argv)
+
+    fixtures = find_fixtures(args.fixtures)
+    if not fixtures:
+        parser.error("Nessun file WAV trovato.")
+    run_benchmark(fixtures)
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,35 @@ GEMINI_API_SETTINGS = {
     "api_key": os.getenv("GEMINI_API_KEY"),
     "model": "gemini-2.0-flash",
     "api_url": "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent",
-    "timeout": 10,  # Timeout for API requests in seconds
+    "stream_api_url": "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent",
+    "stream": True,  # Use SSE streaming and speak each sentence as soon as it is complete
+    "connect_timeout": 3.05,  # Timeout for opening the connection in seconds
+    "timeout": 10,  # Timeout for reading the response in seconds
+    "pool_size": 4,  # Persistent connections kept open to the API
+    "warm_up": True,  # Open the connection at startup, before the first turn
+    "max_retries": 2,  # Retries after a connection error, a timeout or a 429/5xx status
+    "backoff_base": 0.5,  # Base delay of the exponential backoff in seconds (with jitter)
+    "backoff_max": 4.0,  # Maximum delay between retries in seconds
+    "circuit_failure_threshold": 5,  # Consecutive failed requests that stop further requests
+    "circuit_reset_timeout": 30.0,  # Seconds before a request is tried again
+    "log_connections": False,  # Print whether each request reused a connection
+    "history": {
+        "enabled": True,  # Send the previous turns, so the assistant remembers the conversation
+        "max_bytes": 16000,  # Budget of the history sent with each request (about 4 bytes per token)
+        "summary_max_chars": 2000,  # Older turns are folded into a summary of at most this length
+        "summary_line_chars": 160,  # Maximum length of the question and answer kept per summarized turn
+    },
+    "response_cache": {
+        "enabled": True,  # Answer repeated utterances from memory, with the audio already synthesized
+        "max_entries": 100,  # Least recently used responses are evicted beyond this number
+        "default_ttl": 24 * 3600,  # Seconds a response stays valid
+        # First matching rule (regex on the normalized utterance) sets the time to live; 0 disables caching
+        "ttl_rules": [
+            (r"\b(ore|ora|orario|adesso|giorno|data)\b", 0),  # Time and date change continuously
+            (r"\b(ieri|domani|dopodomani|stamattina|stasera|stanotte|scors[oa]|prossim[oa])\b", 0),  # Relative to today
+            (r"^(e|ed|ma|anche|invece|quindi|allora|perche|come mai)\b", 0),  # Follow-ups depend on the conversation
+            (r"\b(tempo|meteo|temperatura|piove|notizie|oggi)\b", 15 * 60),  # Weather and news change slowly
+        ],
+    },
     "enabled": True,  # Enable or disable Gemini API integration
 } 
\ No newline at end of file
@@ -5,6 +5,8 @@
 Global configurations for voice recognition.
 """
 
+import os
+
 # Recognition settings
 RECOGNITION_SETTINGS = {
     # Recognition language (ISO standard code)
@@ -18,14 +20,137 @@ RECOGNITION_SETTINGS = {
     
     # Calibration
     "calibration_duration": 1,  # Duration of ambient noise calibration in seconds
+    "calibration_profiles": {
+        "enabled": True,  # Reuse the noise floor saved for the microphone instead of calibrating at startup
+        "path": os.path.join(os.path.expanduser("~"), ".config", "sofi", "calibration_profiles.json"),
+        "refine_interval": 30.0,  # Seconds between two updates of the profile while listening
+        "smoothing": 0.3,  # Weight of the latest noise floor in the moving average of the profile
+    },
     
     # Phrase segmentation
     "phrase_time_limit": 5,  # Maximum time limit for phrase in seconds
     
+    # Voice activity detection used for phrase boundaries instead of the energy threshold
+    "vad": {
+        "enabled": True,
+        "frame_ms": 20,  # Frame length in milliseconds (10-30)
+        "energy_margin_db": 10.0,  # Energy above the noise floor required for speech
+        "flatness_threshold": 0.4,  # Maximum spectral flatness of voiced frames
+        "zcr_threshold": 0.25,  # Minimum zero-crossing rate of unvoiced (fricative) frames
+        "onset_frames": 2,  # Consecutive speech frames needed to start a phrase
+        "hangover_ms": 300,  # Silence after speech before the phrase is closed
+        "preroll_ms": 200,  # Audio kept before the detected start of speech
+        "min_speech_ms": 150,  # Shorter phrases are discarded as clicks or noise
+        "noise_adaptation": 0.05,  # Adaptation rate of the noise floor estimate
+        "level_window_ms": 1000,  # Time constant of the recent input level, compared with the start of each phrase
+    },
+    
+    # Barge-in: when the user starts speaking, the reply being played is interrupted
+    "barge_in": {
+        "enabled": True,
+        "mode": "duck",  # "stop": stop the reply as soon as speech starts (best with headphones);
+                         # "duck": lower it while the user speaks, stop it if the phrase is accepted as a turn
+        "duck_level": 0.3,  # Fraction of the volume while ducked
+        # With self_hearing enabled, only an onset this much louder (dB) than the recent microphone
+        # level counts as barge-in: quieter onsets are the echo of the reply itself
+        "min_contrast_db": 10.0,
+        "settle_time": 1.0,  # Seconds after the reply starts before the level reflects its echo
+    },
+    
+    # Self-hearing suppression: phrases captured while a reply is played are not sent to the ASR
+    "self_hearing": {
+        "enabled": True,
+        "tail": 0.5,  # Seconds after the end of playback still treated as echo
+        "allow_wake_word": True,  # Keep the phrases where the wake word is spotted locally ("Sofi, stop")
+    },
+    
+    # Recognition workers
+    "recognition_workers": 3,  # Number of phrases recognized in parallel
+    "reorder_gap_timeout": 15.0,  # Seconds after which a missing transcript stops holding back the later ones
+    
+    # Speech-to-text engine
+    "asr_backend": "google",  # "google" (cloud) or "vosk" (offline, requires the vosk package and a model)
+    "vosk": {
+        "model_path": os.path.expanduser("~/.cache/sofi/vosk-model-small-it"),  # Directory of the Vosk model
+    },
+    
+    # Hedged recognition: a slow phrase is also sent to a second backend, the first transcript wins
+    "asr_hedging": {
+        "enabled": False,
+        "secondary_backend": "google",  # Backend raced against asr_backend (may be the same engine)
+        "percentile": 95,  # The secondary starts after this percentile of the primary's latency
+        "initial_delay": 1.5,  # Deadline in seconds until enough latencies are collected
+        "min_delay": 0.3,  # Lower bound of the deadline, to limit duplicate requests
+        "min_samples": 20,  # Latencies needed before the percentile is used
+    },
+    
+    # Audio upload
+    "in_process_flac": True,  # Encode FLAC in-process instead of running the flac binary per phrase
+    "asr_sample_rate": 16000,  # Phrases recorded at higher rates are downsampled before upload
+    
+    # Audio queue between capture and recognition
+    "audio_queue_size": 8,  # Maximum number of phrases waiting for recognition
+    "audio_queue_policy": "drop_oldest",  # Overflow policy: "block", "drop_oldest" or "merge"
+    
     # Buffer settings
     "buffer_delay": 2.0,  # Tempo di attesa in secondi prima di inviare il testo all'API
     "buffer_extension_time": 1.0,  # Tempo aggiuntivo di attesa quando viene aggiunto nuovo testo al buffer
     "max_buffer_hold_time": 10.0,  # Tempo massimo di attesa per il buffer prima dell'invio forzato
+    
+    # Fine del turno adattiva: sostituisce buffer_delay con una scadenza appresa dalle pause dell'utente
+    "end_of_turn": {
+        "adaptive": True,
+        "quantile": 0.9,  # Quantile delle pause tra le frasi di uno stesso turno
+        "margin": 1.2,  # Moltiplicatore del quantile
+        "initial_delay": 3.0,  # Scadenza usata finché non ci sono abbastanza pause osservate
+        "min_samples": 10,  # Pause necessarie prima di usare il quantile
+        "min_delay": 0.6,  # Scadenza minima in secondi
+        "max_delay": 4.0,  # Scadenza massima in secondi
+        "max_gap": 6.0,  # Pause più lunghe non appartengono a un turno e vengono ignorate
+        "question_factor": 0.6,  # Moltiplicatore se il testo termina con un punto interrogativo
+        "continuation_factor": 1.5,  # Moltiplicatore se il testo termina con una congiunzione
+        "continuation_words": [
+            "e", "ed", "ma", "o", "oppure", "però", "perché", "quindi", "allora",
+            "che", "cioè", "poi", "mentre", "se", "come", "di", "a", "per", "con", "il", "la", "un", "una",
+            "ehm", "uhm",
+        ],
+    },
+
+    # Dispatch settings
+    "follow_up_policy": "queue",  # "queue": i turni successivi attendono la risposta in corso; "cancel": un nuovo turno la interrompe
+    "speculative_dispatch": True,  # Invia il testo a Gemini all'inizio del countdown e riusa la risposta se il testo non cambia
+}
+
+# Local voice commands, handled without the countdown and without Gemini
+COMMAND_SETTINGS = {
+    "enabled": True,
+    # Grammar: for each command, the phrases that trigger it. Each phrase is a regex
+    # that must match the whole utterance, lowercase, without accents, punctuation and wake word
+    "commands": {
+        "stop": [r"stop", r"basta", r"fermati", r"(stai )?zitta", r"silenzio", r"smetti( di parlare)?"],
+        "repeat": [r"ripeti", r"(puoi )?ripetere", r"ripeti (per favore|la risposta)", r"come hai detto", r"cosa hai detto"],
+        "louder": [r"(parla )?piu forte", r"alza (il volume|la voce)", r"volume su"],
+        "quieter": [r"(parla )?piu piano", r"abbassa (il volume|la voce)", r"volume giu"],
+        "cancel": [r"annulla", r"lascia (stare|perdere)", r"niente", r"cancella"],
+    },
+    "volume_step": 0.2,  # Volume change of louder/quieter (the volume ranges from 0 to 1)
+}
+
+# Text-to-speech settings
+TTS_SETTINGS = {
+    "language": "it",  # Language code for speech synthesis
+    "max_chunk_chars": 200,  # Maximum length of a chunk synthesized in one go
+    "lookahead_chunks": 2,  # Chunks synthesized ahead of the one being played
+    "poll_interval": 0.01,  # Playback polling interval in seconds
+    "volume": 1.0,  # Initial playback volume (0 to 1)
+
+    # Cache of synthesized phrases, keyed by cleaned text, language and engine
+    "cache": {
+        "enabled": True,
+        "memory_entries": 64,  # Phrases kept in memory (LRU)
+        "disk_dir": os.path.join(os.path.expanduser("~"), ".cache", "sofi", "tts"),  # None to disable the disk tier
+        "disk_max_bytes": 50 * 1024 * 1024,  # Size cap of the disk tier
+    },
 }
 
 # Display settings
@@ -42,9 +167,28 @@ SYSTEM_SETTINGS = {
     "thread_join_timeout": 1,  # Timeout for thread termination wait
 }
 
+# Latency tracing of each turn (capture, ASR, buffer, Gemini, TTS)
+TRACING_SETTINGS = {
+    "enabled": False,
+    "jsonl_path": os.path.join(os.path.expanduser("~"), ".cache", "sofi", "traces.jsonl"),  # None to disable the file export
+    "http_host": "127.0.0.1",
+    "http_port": 9464,  # Local endpoint serving /metrics (Prometheus) and /spans (JSON lines); None to disable
+    "buckets": [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],  # Histogram bounds in seconds
+    "recent_spans": 1000,  # Spans kept in memory for /spans
+}
+
 # Wake word settings
 KEYWORD_SETTINGS = {
     "enabled": True,  # Enable or disable wake word activation
     "keyword": "sofi",  # The wake word that activates the assistant (lowercase)
     "timeout": 10,     # Time in seconds the assistant remains active after hearing the wake word
+    
+    # On-device wake word spotting: while the assistant is inactive, only the
+    # phrases where the wake word is spotted locally are sent to the cloud ASR
+    "local_detection": {
+        "enabled": True,
+        "templates_dir": os.path.join(os.path.expanduser("~"), ".config", "sofi", "wake_word"),  # WAV recordings of the wake word
+        "threshold": None,  # DTW distance threshold (None: derived from the templates)
+        "threshold_margin": 1.2,  # Margin applied to the derived threshold
+    },
 } 
\ No newline at end of file
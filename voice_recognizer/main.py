@@ -5,39 +5,152 @@
 Main module for real-time voice recognition.
 """
 
+import argparse
 import time
 
 from voice_recognizer.services.microphone_service import MicrophoneService
 from voice_recognizer.services.recognition_service import RecognitionService
+from voice_recognizer.services.file_source_service import FileAudioSource
+from voice_recognizer.utils.import_utils import measure_import_times
 from voice_recognizer.utils.logging_utils import (
     print_welcome,
+    print_info,
     print_calibration_start,
-    print_calibration_complete
+    print_calibration_complete,
+    print_calibration_loaded
 )
 from voice_recognizer.utils.exception_utils import (
     handle_keyboard_interrupt,
     handle_exception
 )
 
-def main():
+def parse_arguments(argv=None):
+    """
+    Parse the command line arguments.
+    
+    Args:
+        argv (list, optional): Command line arguments (default: sys.argv).
+        
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Sofi - assistente vocale in tempo reale.")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="run",
+        choices=["run", "startup-report"],
+        help="'run' avvia l'assistente, 'startup-report' misura i tempi di avvio"
+    )
+    parser.add_argument(
+        "--source",
+        default="mic",
+        help="Sorgente audio: 'mic' (microfono) oppure un file WAV/FLAC o una cartella di file da riprodurre"
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Velocità di riproduzione dei file rispetto al tempo reale (0: il più veloce possibile)"
+    )
+    parser.add_argument(
+        "--recalibrate",
+        action="store_true",
+        help="Calibra di nuovo il rumore di fondo anche se esiste un profilo salvato per il microfono"
+    )
+    return parser.parse_args(argv)
+
+def run_file_source(recognition_service, path, speed):
+    """
+    Replay recordings through the recognition pipeline and wait for the last turn.
+    
+    Args:
+        recognition_service (RecognitionService): The recognition service.
+        path (str): A WAV/FLAC file or a directory of them.
+        speed (float): Replay speed relative to real time.
+    """
+    source = FileAudioSource(path, speed=speed)
+    print_info(f"Riproduzione di {len(source.paths)} file ({source.duration:.1f}s di audio) a velocità {speed:g}x")
+    
+    recognition_service.start_recognition(source)
+    
+    # Attendi la fine della registrazione, poi che l'ultima frase sia trascritta e l'ultimo turno risposto
+    while not source.finished.wait(0.1):
+        pass
+    recognition_service.stop_listening_callback(wait_for_stop=True)
+    recognition_service.wait_until_idle()
+    recognition_service.stop_recognition()
+
+def run_startup_report(top=10):
+    """
+    Print where the startup time goes: module imports, service creation and background warm-up.
+    
+    Args:
+        top (int): Number of packages listed by import time.
+    """
+    # Import misurati in un interprete nuovo, come con "python -X importtime"
+    imports = measure_import_times("voice_recognizer.main")
+    if imports:
+        total = imports[-1][2] / 1000
+        packages = {}
+        for name, self_us, _, _ in imports:
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + self_us
+        
+        print(f"Import di voice_recognizer.main: {total:.1f} ms")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            print(f"  {package:<24} {self_us / 1000:8.1f} ms")
+    
+    start = time.perf_counter()
+    recognition_service = RecognitionService()
+    print(f"Creazione dei servizi: {(time.perf_counter() - start) * 1000:.1f} ms")
+    
+    # Lavoro spostato fuori dal percorso di avvio
+    start = time.perf_counter()
+    recognition_service.warm_up().join()
+    print(f"Warm-up in background (pygame, mixer audio): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+def main(argv=None):
     """
     Main function that starts voice recognition.
+    
+    Args:
+        argv (list, optional): Command line arguments (default: sys.argv).
     """
+    args = parse_arguments(argv)
+    
+    if args.command == "startup-report":
+        run_startup_report()
+        return
+    
     # Initialize services
     mic_service = MicrophoneService()
     recognition_service = RecognitionService()
     
+    # L'uscita audio si prepara mentre si inizializza e calibra il microfono
+    recognition_service.warm_up()
+    
     try:
         # Print welcome message
         print_welcome()
         
+        if args.source != "mic":
+            # La calibrazione consumerebbe l'inizio della registrazione: il VAD si adatta da solo
+            run_file_source(recognition_service, args.source, args.speed)
+            return
+        
         # Initialize microphone
         microphone = mic_service.initialize_microphone()
         
-        # Calibrate for ambient noise
-        print_calibration_start()
-        recognition_service.calibrate_for_ambient_noise(microphone)
-        print_calibration_complete()
+        # Il profilo salvato per il microfono evita la calibrazione bloccante
+        device_name = mic_service.get_device_name()
+        if recognition_service.use_calibration_profile(device_name) and not args.recalibrate:
+            print_calibration_loaded(device_name)
+        else:
+            # Calibrate for ambient noise
+            print_calibration_start()
+            recognition_service.calibrate_for_ambient_noise(microphone)
+            print_calibration_complete()
         
         # Start voice recognition
         recognition_service.start_recognition(microphone)
@@ -52,4 +165,4 @@ def main():
         handle_exception(e, recognition_service)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
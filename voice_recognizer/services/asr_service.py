@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for speech-to-text with interchangeable ASR backends.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
+import speech_recognition as sr
+from voice_recognizer.config.settings import RECOGNITION_SETTINGS
+from voice_recognizer.utils.audio_utils import pcm_to_float, float_to_pcm16, resample
+from voice_recognizer.utils.flac_utils import FlacEncoder, FlacAudioData
+from voice_recognizer.utils.logging_utils import print_error
+
+# Vosk è opzionale: serve solo per il riconoscimento offline
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+# Numero di latenze recenti conservate per le statistiche
+LATENCY_WINDOW = 200
+
+# Esito di una chiamata: testo vuoto se non c'era parlato, failed se la richiesta è fallita
+Recognition = namedtuple("Recognition", ["text", "failed"])
+
+class ASRBackend:
+    """
+    Base class of the speech-to-text backends.
+
+    Subclasses implement _recognize; transcribe adds error handling and
+    records the latency of every call.
+    """
+
+    name = "base"
+
+    def __init__(self, language=None):
+        """
+        Initialize the backend.
+
+        Args:
+            language (str, optional): Recognition language (default: from settings).
+        """
+        self.language = language or RECOGNITION_SETTINGS["language"]
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def is_available(self):
+        """
+        Check if the backend can be used.
+
+        Returns:
+            bool: True if the backend is ready.
+        """
+        return True
+
+    def transcribe(self, audio):
+        """
+        Transcribe a phrase.
+
+        Args:
+            audio (AudioData): The captured phrase.
+
+        Returns:
+            str: The transcript, or None if nothing was recognized or the request failed.
+        """
+        return self.recognize(audio).text or None
+
+    def recognize(self, audio):
+        """
+        Transcribe a phrase, telling a failed request from a phrase without speech.
+
+        Args:
+            audio (AudioData): The captured phrase.
+
+        Returns:
+            Recognition: The transcript ("" if no speech was recognized) and
+                         whether the request failed.
+        """
+        start = time.perf_counter()
+        text = ""
+        failed = False
+        try:
+            text = self._recognize(audio) or ""
+        except sr.UnknownValueError:
+            pass  # Nessun parlato riconosciuto
+        except sr.RequestError as e:
+            failed = True
+            print_error(f"Error during {self.name} recognition request: {e}")
+        except Exception as e:
+            failed = True
+            print_error(f"Error during {self.name} recognition: {e}")
+        finally:
+            self._record(time.perf_counter() - start, failed)
+
+        return Recognition(text, failed)
+
+    def _recognize(self, audio):
+        """
+        Transcribe a phrase with the backend engine.
+
+        Args:
+            audio (AudioData): The captured phrase.
+
+        Returns:
+            str: The transcript.
+
+        Raises:
+            sr.UnknownValueError: If no speech was recognized.
+            sr.RequestError: If the engine could not be reached.
+        """
+        raise NotImplementedError
+
+    def _record(self, latency, failed):
+        """
+        Record the outcome of a call.
+
+        Args:
+            latency (float): Duration of the call in seconds.
+            failed (bool): True if the call raised an error.
+        """
+        with self._stats_lock:
+            self.calls += 1
+            if failed:
+                self.failures += 1
+            self._latencies.append(latency)
+
+    def latency_percentile(self, percentile):
+        """
+        Get a percentile of the recent latencies.
+
+        Args:
+            percentile (float): The percentile (0-100).
+
+        Returns:
+            float: The latency in seconds, or None if no call was made yet.
+        """
+        with self._stats_lock:
+            latencies = list(self._latencies)
+        if not latencies:
+            return None
+        return float(np.percentile(latencies, percentile))
+
+    def stats(self):
+        """
+        Get the counters and latencies of the backend.
+
+        Returns:
+            dict: Calls, failures and mean, median and 95th percentile latency in seconds.
+        """
+        with self._stats_lock:
+            latencies = list(self._latencies)
+            calls, failures = self.calls, self.failures
+
+        stats = {"backend": self.name, "calls": calls, "failures": failures,
+                 "mean_latency": None, "p50_latency": None, "p95_latency": None}
+        if latencies:
+            stats["mean_latency"] = float(np.mean(latencies))
+            stats["p50_latency"] = float(np.percentile(latencies, 50))
+            stats["p95_latency"] = float(np.percentile(latencies, 95))
+        return stats
+
+class GoogleASRBackend(ASRBackend):
+    """
+    Google Speech Recognition through the speech_recognition library.
+    """
+
+    name = "google"
+
+    def __init__(self, recognizer=None, language=None):
+        """
+        Initialize the backend.
+
+        Args:
+            recognizer (Recognizer, optional): The recognizer used for the requests.
+            language (str, optional): Recognition language (default: from settings).
+        """
+        super().__init__(language)
+        self.recognizer = recognizer or sr.Recognizer()
+
+        # Un encoder FLAC per thread: i buffer vengono riusati tra le frasi
+        self._encoders = threading.local()
+
+    def _recognize(self, audio):
+        """
+        Send a phrase to Google Speech Recognition.
+
+        Args:
+            audio (AudioData): The captured phrase.
+
+        Returns:
+            str: The transcript.
+        """
+        if RECOGNITION_SETTINGS["in_process_flac"]:
+            audio = self._prepare_audio(audio)
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+    def _prepare_audio(self, audio):
+        """
+        Wrap a phrase so it is downsampled and FLAC-encoded in-process.
+
+        Args:
+            audio (AudioData): The captured phrase.
+
+        Returns:
+            FlacAudioData: The phrase, ready for upload.
+        """
+        encoder = getattr(self._encoders, "encoder", None)
+        if encoder is None:
+            encoder = self._encoders.encoder = FlacEncoder()
+        return FlacAudioData(audio, encoder, RECOGNITION_SETTINGS["asr_sample_rate"])
+
+class VoskASRBackend(ASRBackend):
+    """
+    Offline recognition on the CPU with a Vosk (Kaldi) model.
+
+    The model is loaded once and shared; every phrase gets its own
+    recognizer, so several workers can transcribe in parallel.
+    """
+
+    name = "vosk"
+
+    # Frequenza di campionamento con cui sono addestrati i modelli Vosk
+    SAMPLE_RATE = 16000
+
+    def __init__(self, model_path=None, language=None):
+        """
+        Initialize the backend and load the model.
+
+        Args:
+            model_path (str, optional): Directory of the Vosk model (default: from settings).
+            language (str, optional): Recognition language, only informative:
+                                      the language is set by the model.
+        """
+        super().__init__(language)
+        self.model_path = model_path or RECOGNITION_SETTINGS["vosk"]["model_path"]
+        self.model = None
+
+        if vosk is None:
+            print_error("Il pacchetto vosk non è installato: riconoscimento offline non disponibile.")
+        elif not os.path.isdir(self.model_path):
+            print_error(f"Modello Vosk non trovato: {self.model_path}")
+        else:
+            vosk.SetLogLevel(-1)
+            try:
+                self.model = vosk.Model(self.model_path)
+            except Exception as e:
+                print_error(f"Impossibile caricare il modello Vosk: {e}")
+
+    def is_available(self):
+        """
+        Check if the model is loaded.
+
+        Returns:
+            bool: True if the backend is ready.
+        """
+        return self.model is not None
+
+    def _recognize(self, audio):
+        """
+        Transcribe a phrase locally.
+
+        Args:
+            audio (AudioData): The captured phrase.
+
+        Returns:
+            str: The transcript.
+        """
+        samples = resample(pcm_to_float(audio.frame_data, audio.sample_width),
+                           audio.sample_rate, self.SAMPLE_RATE)
+
+        recognizer = vosk.KaldiRecognizer(self.model, self.SAMPLE_RATE)
+        recognizer.AcceptWaveform(float_to_pcm16(samples).tobytes())
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+class HedgedASRBackend(ASRBackend):
+    """
+    Races two backends to cut the tail latency of recognition.
+
+    The phrase goes to the primary backend first. If no answer arrives
+    within a percentile of the primary's recent latencies, or the primary
+    fails before that, the same phrase is sent to the secondary backend
+    as well, and the first backend that answers without failing wins. A
+    phrase without speech is an answer, not a failure: it is never
+    hedged. The losing request is left to finish in its daemon thread and
+    its result is ignored.
+    """
+
+    name = "hedged"
+
+    def __init__(self, primary, secondary, settings=None):
+        """
+        Initialize the backend.
+
+        Args:
+            primary (ASRBackend): The backend tried first.
+            secondary (ASRBackend): The backend raced after the deadline.
+            settings (dict, optional): Hedging settings (default: RECOGNITION_SETTINGS["asr_hedging"]).
+        """
+        super().__init__(primary.language)
+        settings = settings or RECOGNITION_SETTINGS["asr_hedging"]
+        self.primary = primary
+        self.secondary = secondary
+        self.name = f"{primary.name}+{secondary.name}"
+        self.percentile = settings["percentile"]
+        self.initial_delay = settings["initial_delay"]
+        self.min_delay = settings["min_delay"]
+        self.min_samples = settings["min_samples"]
+
+        self.hedged = 0
+        self.wins = {"primary": 0, "secondary": 0}
+
+    def hedge_delay(self):
+        """
+        Get the time the primary backend is given before the secondary is raced.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        delay = None
+        if self.primary.calls >= self.min_samples:
+            delay = self.primary.latency_percentile(self.percentile)
+        if delay is None:
+            delay = self.initial_delay
+        return max(self.min_delay, delay)
+
+    def _recognize(self, audio):
+        """
+        Transcribe a phrase, racing the secondary backend if the primary is slow or fails.
+
+        Args:
+            audio (AudioData): The captured phrase.
+
+        Returns:
+            str: The transcript of the first backend that answered.
+
+        Raises:
+            sr.UnknownValueError: If the winning backend recognized no speech.
+            sr.RequestError: If both backends failed.
+        """
+        results = queue.Queue()
+        self._start(self.primary, "primary", audio, results)
+
+        try:
+            side, result = results.get(timeout=self.hedge_delay())
+        except queue.Empty:
+            side, result = None, None
+
+        # Risposta del primario entro la scadenza, anche senza parlato: nessuna gara
+        if result is not None and not result.failed:
+            return self._winner(side, result.text)
+
+        # Primario lento, o fallito subito: il secondario parte adesso
+        with self._stats_lock:
+            self.hedged += 1
+        self._start(self.secondary, "secondary", audio, results)
+
+        # Vince la prima risposta valida; si rinuncia solo se entrambi falliscono
+        pending = 1 if side is not None else 2
+        for _ in range(pending):
+            side, result = results.get()
+            if not result.failed:
+                return self._winner(side, result.text)
+        raise sr.RequestError(f"both {self.primary.name} and {self.secondary.name} failed")
+
+    def _start(self, backend, side, audio, results):
+        """
+        Run a backend in a daemon thread.
+
+        Args:
+            backend (ASRBackend): The backend to run.
+            side (str): "primary" or "secondary".
+            audio (AudioData): The captured phrase.
+            results (queue.Queue): Receives (side, Recognition) when the backend answers.
+        """
+        thread = threading.Thread(target=lambda: results.put((side, backend.recognize(audio))))
+        thread.daemon = True
+        thread.start()
+
+    def _winner(self, side, text):
+        """
+        Count the winning side and return its transcript.
+
+        Args:
+            side (str): "primary" or "secondary".
+            text (str): The transcript, empty if no speech was recognized.
+
+        Returns:
+            str: The transcript.
+
+        Raises:
+            sr.UnknownValueError: If the transcript is empty.
+        """
+        with self._stats_lock:
+            self.wins[side] += 1
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def stats(self):
+        """
+        Get the counters and latencies of the race and of both backends.
+
+        Returns:
+            dict: The overall figures, plus hedged requests, wins per side and
+                  the stats of the primary and secondary backends.
+        """
+        stats = super().stats()
+        with self._stats_lock:
+            stats["hedged"] = self.hedged
+            stats["primary_wins"] = self.wins["primary"]
+            stats["secondary_wins"] = self.wins["secondary"]
+        stats["hedge_delay"] = self.hedge_delay()
+        stats["primary"] = self.primary.stats()
+        stats["secondary"] = self.secondary.stats()
+        return stats
+
+# Backend disponibili, selezionabili da RECOGNITION_SETTINGS["asr_backend"]
+ASR_BACKENDS = {
+    GoogleASRBackend.name: GoogleASRBackend,
+    VoskASRBackend.name: VoskASRBackend,
+}
+
+def create_asr_backend(name=None, recognizer=None, hedging=None):
+    """
+    Create the ASR backend selected in the settings.
+
+    Falls back to Google if the requested backend is unknown or unavailable.
+    When hedging is enabled, the backend is raced against a secondary one.
+
+    Args:
+        name (str, optional): Backend name (default: RECOGNITION_SETTINGS["asr_backend"]).
+        recognizer (Recognizer, optional): Recognizer shared with the Google backend.
+        hedging (dict, optional): Hedging settings (default: RECOGNITION_SETTINGS["asr_hedging"]).
+
+    Returns:
+        ASRBackend: The backend.
+    """
+    hedging = hedging or RECOGNITION_SETTINGS["asr_hedging"]
+    backend = _create_single_backend(name or RECOGNITION_SETTINGS["asr_backend"], recognizer)
+
+    if not hedging["enabled"]:
+        return backend
+
+    # Il secondario è sempre un'istanza separata, con statistiche proprie
+    secondary = _create_single_backend(hedging["secondary_backend"], recognizer)
+    return HedgedASRBackend(backend, secondary, hedging)
+
+def _create_single_backend(name, recognizer):
+    """
+    Create one backend by name, falling back to Google.
+
+    Args:
+        name (str): Backend name.
+        recognizer (Recognizer): Recognizer shared with the Google backend.
+
+    Returns:
+        ASRBackend: The backend.
+    """
+    if name == GoogleASRBackend.name or name not in ASR_BACKENDS:
+        if name not in ASR_BACKENDS:
+            print_error(f"Backend ASR sconosciuto: {name}. Uso di Google.")
+        return GoogleASRBackend(recognizer)
+
+    backend = ASR_BACKENDS[name]()
+    if backend.is_available():
+        return backend
+
+    print_error(f"Backend ASR {name} non disponibile. Uso di Google.")
+    return GoogleASRBackend(recognizer)
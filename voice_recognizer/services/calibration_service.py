@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for the ambient-noise calibration profiles of each microphone.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from voice_recognizer.config.settings import RECOGNITION_SETTINGS
+from voice_recognizer.utils.logging_utils import print_error
+
+# Ampiezza massima dei campioni a 16 bit, in cui è espressa la soglia di energia
+_PCM16_FULL_SCALE = 32768.0
+
+def noise_floor_to_energy_threshold(noise_floor_db, dynamic_energy_ratio):
+    """
+    Convert a noise floor into an energy threshold for the Recognizer.
+
+    Args:
+        noise_floor_db (float): Mean power of the background noise, in dB full scale (as the VAD measures it).
+        dynamic_energy_ratio (float): Ratio between the threshold and the noise energy.
+
+    Returns:
+        float: The energy threshold (RMS of 16-bit samples).
+    """
+    return _PCM16_FULL_SCALE * 10.0 ** (noise_floor_db / 20.0) * dynamic_energy_ratio
+
+def energy_threshold_to_noise_floor(energy_threshold, dynamic_energy_ratio):
+    """
+    Convert an energy threshold of the Recognizer into a noise floor.
+
+    Args:
+        energy_threshold (float): The energy threshold (RMS of 16-bit samples).
+        dynamic_energy_ratio (float): Ratio between the threshold and the noise energy.
+
+    Returns:
+        float: The noise floor in dB full scale.
+    """
+    energy = max(energy_threshold / dynamic_energy_ratio, 1e-6)
+    return 20.0 * math.log10(energy / _PCM16_FULL_SCALE)
+
+class CalibrationProfiles:
+    """
+    Noise floor of each microphone, persisted between runs.
+
+    Profiles are stored in a JSON file keyed by device name, so a known
+    microphone starts with its last calibration instead of blocking on a
+    new one. While listening, the noise floor measured by the VAD is
+    folded into the profile with an exponentially weighted moving average:
+    the profile follows a change of room, but a single noisy moment does
+    not overwrite it.
+    """
+
+    def __init__(self, settings=None):
+        """
+        Initialize the profiles, loading them from disk.
+
+        Args:
+            settings (dict, optional): Profile settings (default: RECOGNITION_SETTINGS["calibration_profiles"]).
+        """
+        settings = settings or RECOGNITION_SETTINGS["calibration_profiles"]
+        self.path = settings["path"]
+        self.smoothing = settings["smoothing"]
+        self._lock = threading.Lock()
+        self._profiles = self._load()
+
+    def get(self, device_name):
+        """
+        Get the profile of a microphone.
+
+        Args:
+            device_name (str): Name of the microphone.
+
+        Returns:
+            dict: The profile (noise_floor_db, updated, refinements), or None if unknown.
+        """
+        with self._lock:
+            profile = self._profiles.get(device_name)
+            return dict(profile) if profile is not None else None
+
+    def set(self, device_name, noise_floor_db):
+        """
+        Replace the profile of a microphone with a new calibration.
+
+        Args:
+            device_name (str): Name of the microphone.
+            noise_floor_db (float): The measured noise floor in dB full scale.
+
+        Returns:
+            dict: The new profile.
+        """
+        with self._lock:
+            profile = {"noise_floor_db": round(noise_floor_db, 2), "updated": time.time(), "refinements": 0}
+            self._profiles[device_name] = profile
+            return dict(profile)
+
+    def refine(self, device_name, noise_floor_db):
+        """
+        Fold a new noise floor estimate into the profile of a microphone.
+
+        Args:
+            device_name (str): Name of the microphone.
+            noise_floor_db (float): The current noise floor in dB full scale.
+
+        Returns:
+            dict: The updated profile.
+        """
+        with self._lock:
+            profile = self._profiles.get(device_name)
+            if profile is None:
+                profile = self._profiles[device_name] = {"noise_floor_db": noise_floor_db, "refinements": 0}
+
+            # Media mobile esponenziale: le stime recenti pesano di più
+            profile["noise_floor_db"] = round(
+                profile["noise_floor_db"] + self.smoothing * (noise_floor_db - profile["noise_floor_db"]), 2
+            )
+            profile["updated"] = time.time()
+            profile["refinements"] += 1
+            return dict(profile)
+
+    def save(self):
+        """
+        Write the profiles to disk.
+
+        Returns:
+            bool: True if the file was written.
+        """
+        with self._lock:
+            data = json.dumps(self._profiles, indent=2, ensure_ascii=False)
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+            # Scrittura atomica: un'interruzione non lascia un file a metà
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as profiles_file:
+                profiles_file.write(data)
+            os.replace(temp_path, self.path)
+            return True
+        except OSError as e:
+            print_error(f"Impossibile salvare i profili di calibrazione in {self.path}: {e}")
+            return False
+
+    def _load(self):
+        """
+        Read the profiles from disk.
+
+        Returns:
+            dict: Profiles by device name (empty if the file is missing or invalid).
+        """
+        if not os.path.isfile(self.path):
+            return {}
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as profiles_file:
+                profiles = json.load(profiles_file)
+        except (OSError, ValueError) as e:
+            print_error(f"Profili di calibrazione non leggibili ({self.path}): {e}")
+            return {}
+
+        # Scarta le voci senza una stima del rumore valida
+        return {
+            name: profile for name, profile in profiles.items()
+            if isinstance(profile, dict) and isinstance(profile.get("noise_floor_db"), (int, float))
+        }
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for local voice commands that do not need Gemini.
+"""
+
+import re
+import threading
+import time
+from voice_recognizer.config.settings import COMMAND_SETTINGS
+from voice_recognizer.utils.logging_utils import print_error, print_info
+from voice_recognizer.utils.text_utils import normalize_utterance
+
+class CommandService:
+    """
+    Matches short control commands (stop, repeat, volume...) on the device.
+
+    The grammar of COMMAND_SETTINGS is compiled once into a single regex
+    with one named group per command, so an utterance is classified with
+    one match against its normalized text. A matched command runs its
+    handler immediately: it never enters the text buffer, waits for the
+    countdown or reaches the network.
+    """
+
+    def __init__(self, settings=None):
+        """
+        Initialize the service and compile the grammar.
+
+        Args:
+            settings (dict, optional): Command settings (default: COMMAND_SETTINGS).
+
+        Raises:
+            ValueError: If a phrase of the grammar is not a valid regex.
+        """
+        settings = settings or COMMAND_SETTINGS
+        self.enabled = settings["enabled"]
+        self.commands = list(settings["commands"])
+
+        alternatives = []
+        for index, phrases in enumerate(settings["commands"].values()):
+            # I nomi dei gruppi devono essere identificatori: si usa la posizione del comando
+            alternatives.append(f"(?P<c{index}>" + "|".join(f"(?:{phrase})" for phrase in phrases) + ")")
+        try:
+            self._grammar = re.compile("^(?:" + "|".join(alternatives) + ")$")
+        except re.error as e:
+            raise ValueError(f"Grammatica dei comandi non valida: {e}")
+
+        self._handlers = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {"matched": 0, "handled_ms": 0.0}
+
+    def register(self, command, handler):
+        """
+        Set the function that runs a command.
+
+        Args:
+            command (str): Name of the command in the grammar.
+            handler (callable): Called without arguments when the command is spoken.
+        """
+        self._handlers[command] = handler
+
+    def match(self, text):
+        """
+        Find the command spoken in an utterance.
+
+        Args:
+            text (str): The utterance.
+
+        Returns:
+            str: The name of the command, or None if the utterance is not a command.
+        """
+        if not self.enabled:
+            return None
+
+        match = self._grammar.match(normalize_utterance(text))
+        if match is None:
+            return None
+        return self.commands[int(match.lastgroup[1:])]
+
+    def handle(self, text):
+        """
+        Run the command spoken in an utterance, if any.
+
+        Args:
+            text (str): The utterance.
+
+        Returns:
+            bool: True if the utterance was a command with a handler, False otherwise.
+        """
+        started_at = time.perf_counter()
+        command = self.match(text)
+        handler = self._handlers.get(command)
+        if handler is None:
+            return False
+
+        print_info(f"\nComando: {command}")
+        try:
+            handler()
+        except Exception as e:
+            print_error(f"Errore durante il comando '{command}': {e}")
+
+        with self._stats_lock:
+            self._stats["matched"] += 1
+            self._stats["handled_ms"] += (time.perf_counter() - started_at) * 1000
+        return True
+
+    def stats(self):
+        """
+        Get the counters of the handled commands.
+
+        Returns:
+            dict: Number of commands handled and their mean handling time in milliseconds.
+        """
+        with self._stats_lock:
+            matched = self._stats["matched"]
+            return {
+                "matched": matched,
+                "mean_ms": self._stats["handled_ms"] / matched if matched else 0.0,
+            }
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for the conversation history sent to Gemini.
+"""
+
+import hashlib
+import json
+import threading
+from collections import deque
+from voice_recognizer.config.api_settings import GEMINI_API_SETTINGS
+from voice_recognizer.utils.text_utils import split_sentences
+
+class ConversationStore:
+    """
+    Multi-turn history kept under a byte budget.
+
+    Every turn is serialized to JSON once, when it is added; the request
+    body is then assembled by joining the stored fragments, so building a
+    payload never re-serializes the history. When the budget is exceeded
+    the oldest turns are evicted and folded into a short rolling summary,
+    sent to the model as systemInstruction.
+    """
+
+    def __init__(self, settings=None):
+        """
+        Initialize the store.
+
+        Args:
+            settings (dict, optional): History settings (default: GEMINI_API_SETTINGS["history"]).
+        """
+        settings = settings or GEMINI_API_SETTINGS["history"]
+        self.enabled = settings["enabled"]
+        self.max_bytes = settings["max_bytes"]
+        self.summary_max_chars = settings["summary_max_chars"]
+        self.summary_line_chars = settings["summary_line_chars"]
+
+        self._turns = deque()  # (frammento JSON utente + modello, dimensione in byte, testo utente, testo modello)
+        self._history_bytes = 0
+        self._summary_lines = deque()
+        self._summary_chars = 0
+        self._summary_fragment = ""
+        self._lock = threading.Lock()
+
+        # Incrementato a ogni modifica: una richiesta preparata prima di un
+        # cambiamento della storia va rifatta
+        self.version = 0
+        self.evicted = 0
+
+        # Impronta della storia inviata con la prossima richiesta, aggiornata a ogni modifica
+        self._digest = self._compute_digest()
+
+    def build_body(self, text):
+        """
+        Build the JSON request body for a new user message.
+
+        Args:
+            text (str): The user message.
+
+        Returns:
+            tuple: The UTF-8 request body, with the history and the summary,
+                   and the version of the history it contains.
+        """
+        current = self._content_fragment("user", text)
+        with self._lock:
+            version = self.version
+            if not self.enabled:
+                return ('{"contents":[' + current + ']}').encode("utf-8"), version
+            contents = [fragment for fragment, _, _, _ in self._turns]
+            summary_fragment = self._summary_fragment
+
+        contents.append(current)
+        body = '{"contents":[' + ",".join(contents) + "]"
+        if summary_fragment:
+            body += ',"systemInstruction":' + summary_fragment
+        return (body + "}").encode("utf-8"), version
+
+    def context(self):
+        """
+        Get a fingerprint of the history the next request will carry.
+
+        Two requests with the same fingerprint are sent with the same turns
+        and summary, so the same utterance gets an equivalent answer.
+
+        Returns:
+            tuple: The version of the history and a digest of its turns and
+                   summary (empty when the history is disabled).
+        """
+        with self._lock:
+            return self.version, self._digest
+
+    def add_turn(self, user_text, model_text):
+        """
+        Record a completed exchange, evicting old turns if over budget.
+
+        Args:
+            user_text (str): The user message.
+            model_text (str): The model response.
+        """
+        if not self.enabled:
+            return
+
+        fragment = self._content_fragment("user", user_text) + "," + self._content_fragment("model", model_text)
+        size = len(fragment.encode("utf-8"))
+
+        with self._lock:
+            self._turns.append((fragment, size, user_text, model_text))
+            self._history_bytes += size
+
+            # I turni più vecchi escono dalla storia e finiscono nel riassunto
+            evicted = []
+            while self._history_bytes > self.max_bytes and len(self._turns) > 1:
+                _, old_size, old_user, old_model = self._turns.popleft()
+                self._history_bytes -= old_size
+                evicted.append((old_user, old_model))
+
+            for old_user, old_model in evicted:
+                self._summarize(old_user, old_model)
+            if evicted:
+                self._summary_fragment = self._build_summary_fragment()
+                self.evicted += len(evicted)
+
+            self.version += 1
+            self._digest = self._compute_digest()
+
+    def clear(self):
+        """
+        Forget the history and the summary.
+        """
+        with self._lock:
+            self._turns.clear()
+            self._history_bytes = 0
+            self._summary_lines.clear()
+            self._summary_chars = 0
+            self._summary_fragment = ""
+            self.version += 1
+            self._digest = self._compute_digest()
+
+    def stats(self):
+        """
+        Get the size of the history.
+
+        Returns:
+            dict: Turns kept, their size in bytes, summary length and evicted turns.
+        """
+        with self._lock:
+            return {
+                "turns": len(self._turns),
+                "history_bytes": self._history_bytes,
+                "summary_chars": self._summary_chars,
+                "evicted": self.evicted,
+            }
+
+    def _compute_digest(self):
+        """
+        Hash the turns and the summary sent with a request (the lock must be held).
+
+        Returns:
+            str: Hex digest, or an empty string if the history is disabled.
+        """
+        if not self.enabled:
+            return ""
+        history = hashlib.sha256(self._summary_fragment.encode("utf-8"))
+        for fragment, _, _, _ in self._turns:
+            history.update(b"\0" + fragment.encode("utf-8"))
+        return history.hexdigest()
+
+    def _summarize(self, user_text, model_text):
+        """
+        Fold an evicted turn into the rolling summary (the lock must be held).
+
+        The summary keeps the question and the first sentence of the answer;
+        the oldest lines are dropped when it grows beyond summary_max_chars.
+
+        Args:
+            user_text (str): The user message.
+            model_text (str): The model response.
+        """
+        sentences = split_sentences(model_text)
+        answer = sentences[0] if sentences else model_text
+        line = f"- Utente: {self._clip(user_text)} / Sofi: {self._clip(answer)}"
+
+        self._summary_lines.append(line)
+        self._summary_chars += len(line) + 1
+        while self._summary_chars > self.summary_max_chars and len(self._summary_lines) > 1:
+            self._summary_chars -= len(self._summary_lines.popleft()) + 1
+
+    def _build_summary_fragment(self):
+        """
+        Serialize the summary as a systemInstruction (the lock must be held).
+
+        Returns:
+            str: The JSON fragment.
+        """
+        text = "Riassunto dei turni precedenti della conversazione:\n" + "\n".join(self._summary_lines)
+        return json.dumps({"parts": [{"text": text}]}, ensure_ascii=False)
+
+    def _clip(self, text):
+        """
+        Shorten a text for the summary.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            str: The text, cut at a word boundary if too long.
+        """
+        text = " ".join(text.split())
+        if len(text) <= self.summary_line_chars:
+            return text
+        return text[:self.summary_line_chars].rsplit(" ", 1)[0] + "…"
+
+    def _content_fragment(self, role, text):
+        """
+        Serialize one message of the conversation.
+
+        Args:
+            role (str): "user" or "model".
+            text (str): The message.
+
+        Returns:
+            str: The JSON fragment.
+        """
+        return json.dumps({"role": role, "parts": [{"text": text}]}, ensure_ascii=False)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for adaptive end-of-turn detection.
+"""
+
+import re
+import threading
+from voice_recognizer.config.settings import RECOGNITION_SETTINGS
+from voice_recognizer.utils.stats_utils import P2Quantile
+
+class EndOfTurnDetector:
+    """
+    Chooses how long to wait after a phrase before the turn is sent.
+
+    The pauses between the phrases of the user are learned online with a
+    streaming quantile: the deadline is that quantile times a margin, so a
+    fast talker is answered sooner than a slow one. Cheap cues on the end
+    of the transcript shorten the deadline (a question mark) or extend it
+    (a trailing conjunction, which announces more speech).
+    """
+
+    def __init__(self, settings=None):
+        """
+        Initialize the detector.
+
+        Args:
+            settings (dict, optional): End-of-turn settings (default: RECOGNITION_SETTINGS["end_of_turn"]).
+        """
+        settings = settings or RECOGNITION_SETTINGS["end_of_turn"]
+        self.margin = settings["margin"]
+        self.min_delay = settings["min_delay"]
+        self.max_delay = settings["max_delay"]
+        self.min_samples = settings["min_samples"]
+        self.max_gap = settings["max_gap"]
+        self.question_factor = settings["question_factor"]
+        self.continuation_factor = settings["continuation_factor"]
+        self.continuation_words = {word.lower() for word in settings["continuation_words"]}
+        self.initial_delay = settings["initial_delay"]
+
+        self._gaps = P2Quantile(settings["quantile"])
+        self._lock = threading.Lock()
+
+    def observe_gap(self, gap):
+        """
+        Record the pause between two consecutive phrases.
+
+        Pauses longer than max_gap are not part of a turn and are ignored.
+
+        Args:
+            gap (float): Seconds between the two phrases.
+        """
+        if gap <= 0 or gap > self.max_gap:
+            return
+        with self._lock:
+            self._gaps.add(gap)
+
+    def gap_quantile(self):
+        """
+        Get the learned pause quantile.
+
+        Returns:
+            float: The quantile in seconds, or None until min_samples pauses are observed.
+        """
+        with self._lock:
+            if self._gaps.count < self.min_samples:
+                return None
+            return self._gaps.value()
+
+    def send_delay(self, text):
+        """
+        Choose the deadline for the turn, after its latest phrase.
+
+        Args:
+            text (str): The text of the turn so far.
+
+        Returns:
+            float: Seconds to wait for more speech before sending.
+        """
+        quantile = self.gap_quantile()
+        delay = self.initial_delay if quantile is None else quantile * self.margin
+
+        cue = self.text_cue(text)
+        if cue == "question":
+            delay *= self.question_factor
+        elif cue == "continuation":
+            delay *= self.continuation_factor
+
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def text_cue(self, text):
+        """
+        Classify the end of a transcript.
+
+        Args:
+            text (str): The text of the turn so far.
+
+        Returns:
+            str: "question", "continuation" or None.
+        """
+        text = text.strip()
+        if text.endswith("?"):
+            return "question"
+
+        words = re.findall(r"\w+", text.lower())
+        if words and words[-1] in self.continuation_words:
+            return "continuation"
+        return None
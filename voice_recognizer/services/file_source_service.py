@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for replaying audio files as if they came from a microphone.
+"""
+
+import os
+import threading
+import time
+import numpy as np
+import speech_recognition as sr
+from voice_recognizer.utils.audio_utils import pcm_to_float, float_to_pcm16, resample
+
+# Estensioni dei file audio letti da una cartella
+AUDIO_EXTENSIONS = (".wav", ".flac", ".aif", ".aiff")
+
+def find_audio_files(path):
+    """
+    Expand a file or a directory into the list of audio files to replay.
+
+    Args:
+        path (str): An audio file, or a directory of them (sorted by name).
+
+    Returns:
+        list: Paths of the audio files.
+
+    Raises:
+        FileNotFoundError: If the path does not exist or the directory has no audio files.
+    """
+    if os.path.isdir(path):
+        files = [
+            os.path.join(path, name) for name in sorted(os.listdir(path))
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        ]
+        if not files:
+            raise FileNotFoundError(f"Nessun file audio in {path}")
+        return files
+
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"File audio non trovato: {path}")
+    return [path]
+
+def load_audio_file(path, sample_rate=None):
+    """
+    Read a WAV, AIFF or FLAC file as mono float32 samples.
+
+    Args:
+        path (str): Path of the file.
+        sample_rate (int, optional): Resample to this rate (default: keep the rate of the file).
+
+    Returns:
+        tuple: The samples (numpy.ndarray) and their sample rate.
+    """
+    with sr.AudioFile(path) as audio_file:
+        # AudioFile converte già in mono; i FLAC vengono decodificati con il binario flac
+        frame_data = audio_file.stream.read(-1)
+        samples = pcm_to_float(frame_data, audio_file.SAMPLE_WIDTH)
+        file_rate = audio_file.SAMPLE_RATE
+
+    if sample_rate and sample_rate != file_rate:
+        return resample(samples, file_rate, sample_rate), sample_rate
+    return samples, file_rate
+
+class _ReplayStream:
+    """
+    Stream with the read(frames) interface of a PyAudio input stream.
+    """
+
+    def __init__(self, source):
+        """
+        Initialize the stream at the start of the recording.
+
+        Args:
+            source (FileAudioSource): The source being replayed.
+        """
+        self.source = source
+        self._offset = 0
+        self._started_at = None
+
+    def read(self, size):
+        """
+        Read the next frames, paced at the speed of the source.
+
+        Args:
+            size (int): Number of frames.
+
+        Returns:
+            bytes: The PCM data; empty at the end of the recording.
+        """
+        source = self.source
+        data = source.frame_data[self._offset:self._offset + size * source.SAMPLE_WIDTH]
+        if not data:
+            source.finished.set()
+
+            # Chi continua a leggere (come listen_in_background) non deve girare a vuoto
+            if source.speed > 0:
+                time.sleep(size / float(source.SAMPLE_RATE) / source.speed)
+            return b""
+
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+        self._offset += len(data)
+
+        # Come un microfono, i dati sono disponibili solo quando sono stati "registrati"
+        if source.speed > 0:
+            ready_at = self._started_at + self._offset / float(source.bytes_per_second) / source.speed
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def close(self):
+        """
+        Close the stream.
+        """
+        self._offset = len(self.source.frame_data)
+
+class FileAudioSource(sr.AudioSource):
+    """
+    Audio source that streams recordings instead of a microphone.
+
+    The files are decoded once, converted to mono 16-bit PCM at a common
+    rate and concatenated; reads are paced so that the recording plays in
+    real time, or speed times faster (speed 0: as fast as possible). It can
+    be passed to start_recognition like an sr.Microphone, which makes
+    performance runs reproducible.
+    """
+
+    def __init__(self, path, speed=1.0, sample_rate=None, gap=0.0, chunk_size=1024):
+        """
+        Load the recordings.
+
+        Args:
+            path (str): An audio file (WAV, AIFF or FLAC) or a directory of them.
+            speed (float): Replay speed relative to real time; 0 for no pacing.
+            sample_rate (int, optional): Rate of the stream (default: rate of the first file).
+            gap (float): Seconds of silence inserted between two files.
+            chunk_size (int): Frames per read, like Microphone.CHUNK.
+
+        Raises:
+            FileNotFoundError: If there are no audio files to replay.
+        """
+        self.paths = find_audio_files(path)
+        self.speed = speed
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk_size
+
+        signals = []
+        for file_path in self.paths:
+            samples, sample_rate = load_audio_file(file_path, sample_rate)
+            if signals and gap > 0:
+                signals.append(np.zeros(int(gap * sample_rate), dtype=np.float32))
+            signals.append(samples)
+
+        self.SAMPLE_RATE = sample_rate
+        self.frame_data = float_to_pcm16(np.concatenate(signals)).tobytes()
+        self.bytes_per_second = self.SAMPLE_RATE * self.SAMPLE_WIDTH
+        self.duration = len(self.frame_data) / float(self.bytes_per_second)
+
+        self.stream = None
+        self.finished = threading.Event()
+
+    def __enter__(self):
+        """
+        Start the replay from the beginning of the recording.
+
+        Returns:
+            FileAudioSource: The source, with an open stream.
+        """
+        self.finished.clear()
+        self.stream = _ReplayStream(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Close the stream.
+        """
+        self.stream.close()
+        self.stream = None
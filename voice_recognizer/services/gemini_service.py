@@ -6,97 +6,399 @@ Service for interacting with Gemini API.
 """
 
 import json
+import threading
+import time
+from urllib.parse import urlsplit
 import requests
 from voice_recognizer.config.api_settings import GEMINI_API_SETTINGS
-from voice_recognizer.utils.logging_utils import print_error, print_api_response
+from voice_recognizer.utils.http_utils import HTTPClient
+from voice_recognizer.utils.logging_utils import (
+    print_error,
+    print_info,
+    print_api_response,
+    print_api_response_fragment
+)
+from voice_recognizer.utils.text_utils import SentenceSplitter
+from voice_recognizer.utils.tracing_utils import NULL_TRACE
 from voice_recognizer.services.tts_service import TTSService
+from voice_recognizer.services.conversation_service import ConversationStore
+from voice_recognizer.services.response_cache_service import ResponseCache
+
+class PendingResponse:
+    """
+    A Gemini request running in the background.
+
+    The text fragments are collected as they arrive, so the response can
+    be delivered while it is still being generated, or abandoned. Its
+    spans join the trace of the turn only if it is delivered: a
+    speculative request that is discarded leaves no trace.
+    """
+
+    def __init__(self, text, history_version=0, trace=NULL_TRACE):
+        """
+        Initialize the request state.
+
+        Args:
+            text (str): The text sent to the API.
+            history_version (int): Version of the conversation history included in the request.
+            trace (Trace, optional): Latency trace of the turn.
+        """
+        self.text = text
+        self.history_version = history_version
+        self.trace = trace
+        self.request_bytes = 0
+        self.started_at = time.perf_counter_ns()
+        self.first_fragment_at = None
+        self.finished_at = None
+        self.response_data = None
+        self.cached = None  # CachedResponse, se la risposta viene dalla cache
+        self.context = None  # Impronta della storia inviata, None se la risposta non va in cache
+        self.error = None  # Eccezione sollevata dalla richiesta
+        self.error_message = None  # Risposta di errore dell'API
+        self._fragments = []
+        self._finished = False
+        self._delivered = False
+        self._spans_recorded = False
+        self._cancelled = threading.Event()
+        self._condition = threading.Condition()
+
+    def add_fragment(self, fragment):
+        """
+        Store a text fragment of the response.
+
+        Args:
+            fragment (str): The fragment.
+        """
+        with self._condition:
+            if self.first_fragment_at is None:
+                self.first_fragment_at = time.perf_counter_ns()
+            self._fragments.append(fragment)
+            self._condition.notify_all()
+
+    def finish(self):
+        """
+        Mark the request as finished (successfully or not).
+        """
+        with self._condition:
+            self._finished = True
+            self.finished_at = time.perf_counter_ns()
+            delivered = self._delivered
+            self._condition.notify_all()
+
+        if delivered:
+            self._record_spans()
+
+    def mark_delivered(self):
+        """
+        Mark the response as the one delivered for its turn, so its spans are recorded.
+        """
+        with self._condition:
+            self._delivered = True
+            finished = self._finished
+
+        if finished:
+            self._record_spans()
+
+    def _record_spans(self):
+        """
+        Add the spans of the request to the trace, once, when it is both delivered and finished.
+        """
+        with self._condition:
+            if self._spans_recorded or self.is_cancelled():
+                return
+            self._spans_recorded = True
+
+        if self.cached is not None:
+            self.trace.add("gemini_cache_hit", self.started_at, self.finished_at)
+            return
+
+        if self.first_fragment_at is not None:
+            self.trace.add("gemini_ttfb", self.started_at, self.first_fragment_at)
+        self.trace.add(
+            "gemini_total", self.started_at, self.finished_at,
+            request_bytes=self.request_bytes, ok=self.error is None and self.error_message is None
+        )
+
+    def is_finished(self):
+        """
+        Check if the request has finished.
+
+        Returns:
+            bool: True if no more fragments will arrive.
+        """
+        with self._condition:
+            return self._finished
+
+    def cancel(self):
+        """
+        Abandon the request: the stream is closed at the next fragment.
+        """
+        self._cancelled.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def is_cancelled(self):
+        """
+        Check if the request has been cancelled.
+
+        Returns:
+            bool: True if cancel() was called.
+        """
+        return self._cancelled.is_set()
+
+    def iter_fragments(self):
+        """
+        Iterate over the fragments, waiting for new ones until the request finishes.
+
+        Yields:
+            str: Each text fragment, in order.
+        """
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self._fragments) and not self._finished and not self.is_cancelled():
+                    self._condition.wait()
+                if index >= len(self._fragments):
+                    return
+                fragment = self._fragments[index]
+            index += 1
+            yield fragment
+
+    def time_to_first_fragment(self):
+        """
+        Get the time between the start of the request and the first text fragment.
+
+        Returns:
+            float: Seconds, or None if no fragment arrived yet.
+        """
+        if self.first_fragment_at is None:
+            return None
+        return (self.first_fragment_at - self.started_at) / 1e9
+
+    def full_text(self):
+        """
+        Get the text received so far.
+
+        Returns:
+            str: The concatenated fragments.
+        """
+        with self._condition:
+            return "".join(self._fragments)
 
 class GeminiService:
     """
     Service for sending text to the Gemini API and processing responses.
     """
-    
-    def __init__(self):
+
+    def __init__(self, settings=None, tts_service=None):
         """
         Initialize the Gemini API service.
+
+        Args:
+            settings (dict, optional): API settings to use instead of GEMINI_API_SETTINGS,
+                                       e.g. to point the service at a local test server.
+            tts_service (TTSService, optional): TTS service used to speak the responses.
         """
-        self.api_key = GEMINI_API_SETTINGS["api_key"]
-        self.model = GEMINI_API_SETTINGS["model"]
-        self.api_url = GEMINI_API_SETTINGS["api_url"]
-        self.timeout = GEMINI_API_SETTINGS["timeout"]
-        self.enabled = GEMINI_API_SETTINGS["enabled"]
-        
+        settings = settings or GEMINI_API_SETTINGS
+        self.api_key = settings["api_key"]
+        self.model = settings["model"]
+        self.api_url = settings["api_url"]
+        self.stream_api_url = settings["stream_api_url"]
+        self.stream = settings["stream"]
+        self.timeout = settings["timeout"]
+        self.enabled = settings["enabled"]
+
+        # Storia della conversazione, entro un limite di dimensione
+        self.conversation = ConversationStore(settings["history"])
+
         # Inizializza il servizio TTS
-        self.tts_service = TTSService(language="it")
-        
+        self.tts_service = tts_service or TTSService(language="it")
+
+        # Risposte (e audio) alle frasi ripetute; la chiave dipende anche da modello e voce
+        self.response_cache = ResponseCache(
+            settings["response_cache"],
+            model=self.model,
+            variant={
+                "tts_engine": self.tts_service.engine,
+                "tts_language": self.tts_service.language,
+                "history": settings["history"]["enabled"],
+            }
+        )
+
+        # Client HTTP con connessioni persistenti, condiviso da tutte le richieste
+        self.http = HTTPClient(settings, name="Gemini")
+        if settings["warm_up"] and self.is_configured():
+            parts = urlsplit(self.api_url)
+            self.http.warm_up(f"{parts.scheme}://{parts.netloc}/")
+
+        # Stato della risposta in corso, per poterla annullare
+        self._pending = None
+        self._speech_job = None
+
+        # Ultima risposta completata, per poterla ripetere
+        self.last_response_text = None
+
     def is_configured(self):
         """
         Check if the service is properly configured.
-        
+
         Returns:
             bool: True if the API key is set, False otherwise.
         """
         return self.api_key is not None and self.enabled
-        
-    def send_text(self, text):
+
+    def send_text(self, text, trace=NULL_TRACE):
         """
         Send text to the Gemini API.
-        
+
         Args:
             text (str): The text to send to the API.
-            
+            trace (Trace, optional): Latency trace of the turn.
+
         Returns:
             dict: The API response or None if there was an error.
         """
+        return self.deliver(self.prepare(text, trace=trace))
+
+    def prepare(self, text, trace=NULL_TRACE):
+        """
+        Start the request for a text in the background, without speaking the response.
+
+        The response is collected while it is generated; deliver() shows and
+        speaks it, and the request can be abandoned with its cancel() method.
+
+        Args:
+            text (str): The text to send to the API.
+            trace (Trace, optional): Latency trace of the turn, filled in by the request.
+
+        Returns:
+            PendingResponse: The request in progress, or None if the service is not configured.
+        """
         if not self.is_configured():
             print_error("Gemini API key non configurata o servizio disabilitato.")
             return None
-            
+
+        # Frase ripetuta nello stesso contesto: la risposta e il suo audio sono già pronti
+        history_version, context = self.conversation.context()
+        cached = self.response_cache.get(text, context)
+        if cached is not None:
+            pending = PendingResponse(text, history_version, trace)
+            pending.cached = cached
+            pending.response_data = cached.response_data
+            pending.add_fragment(cached.text)
+            pending.finish()
+            return pending
+
+        # Prepare the request body: the history is already serialized
+        body, body_version = self.conversation.build_body(text)
+
+        pending = PendingResponse(text, body_version, trace)
+        pending.request_bytes = len(body)
+
+        # Se la storia è cambiata nel frattempo l'impronta letta non descrive il corpo inviato
+        if body_version == history_version:
+            pending.context = context
+        request_thread = threading.Thread(target=self._run_request, args=(pending, body))
+        request_thread.daemon = True
+        request_thread.start()
+        return pending
+
+    def deliver(self, pending):
+        """
+        Show and speak a prepared response, starting with the part already received.
+
+        Args:
+            pending (PendingResponse): The request returned by prepare().
+
+        Returns:
+            dict: The API response or None if there was an error.
+        """
+        if pending is None:
+            return None
+
+        # Preparata prima che la storia cambiasse (ad esempio una richiesta speculativa):
+        # senza l'ultimo scambio la risposta non sarebbe coerente
+        if pending.history_version != self.conversation.version and not pending.is_cancelled():
+            pending.cancel()
+            pending = self.prepare(pending.text, trace=pending.trace)
+            if pending is None:
+                return None
+
+        self._pending = pending
+        pending.mark_delivered()
+        speech_job = None
+        job_closed = False
+
         try:
-            # Prepare request parameters
-            url = f"{self.api_url}?key={self.api_key}"
-            
-            # Prepare the request payload
-            payload = {
-                "contents": [{
-                    "parts": [{"text": text}]
-                }]
-            }
-            
-            # Send the request
-            response = requests.post(
-                url,
-                headers={"Content-Type": "application/json"},
-                data=json.dumps(payload),
-                timeout=self.timeout
-            )
-            
-            # Check if the request was successful
-            if response.status_code == 200:
-                response_data = response.json()
-                
-                # Extract and return the response text
-                if "candidates" in response_data and len(response_data["candidates"]) > 0:
-                    # Get the text from the first candidate
-                    if "content" in response_data["candidates"][0]:
-                        content = response_data["candidates"][0]["content"]
-                        if "parts" in content and len(content["parts"]) > 0:
-                            response_text = content["parts"][0].get("text", "")
-                            
-                            # Mostra la risposta testuale
-                            print_api_response(response_text)
-                            
-                            # Riproduci la risposta come voce
-                            self.tts_service.speak(response_text)
-                            
-                            return response_data
-                
-                print_error("Struttura di risposta non valida dall'API Gemini.")
+            splitter = SentenceSplitter()
+            fragments = []
+
+            for fragment in pending.iter_fragments():
+                # Annullando la risposta si interrompe anche la generazione
+                if pending.is_cancelled():
+                    break
+
+                if speech_job is None:
+                    # L'audio delle risposte memorizzabili viene conservato per la cache
+                    record_audio = pending.context is not None and self.response_cache.ttl_for(pending.text) > 0
+                    speech_job = self._open_speech_job(record_audio, pending.trace)
+                fragments.append(fragment)
+
+                if pending.cached is not None:
+                    # Risposta dalla cache: il testo viene mostrato e l'audio riprodotto senza sintesi
+                    print_api_response(fragment)
+                    self.tts_service.enqueue_audio(speech_job, pending.cached.audio)
+                    continue
+
+                if not self.stream:
+                    # Mostra la risposta testuale e riproducila come voce
+                    print_api_response(fragment)
+                    self.tts_service.enqueue(speech_job, fragment)
+                    continue
+
+                # Mostra il frammento appena arriva
+                print_api_response_fragment(fragment, first=len(fragments) == 1)
+
+                # Ogni frase completa va subito alla pipeline di sintesi vocale
+                for sentence in splitter.feed(fragment):
+                    self.tts_service.enqueue(speech_job, sentence)
+
+            if speech_job is not None:
+                for sentence in splitter.flush():
+                    self.tts_service.enqueue(speech_job, sentence)
+                self.tts_service.close_job(speech_job)
+                job_closed = True
+
+            if pending.error is not None:
+                raise pending.error
+
+            if pending.error_message is not None:
+                print_error(pending.error_message)
                 return None
-            else:
-                print_error(f"Errore API Gemini: Codice {response.status_code}, {response.text}")
+
+            if pending.is_cancelled():
+                print_info("\nRisposta annullata.")
+                return None
+
+            if not fragments:
+                print_error("Struttura di risposta non valida dall'API Gemini.")
                 return None
-                
+
+            if self.stream and pending.cached is None:
+                print_api_response_fragment("\n")
+
+            # Lo scambio entra nella storia subito, così la prossima richiesta lo include
+            self.conversation.add_turn(pending.text, pending.full_text())
+            self.last_response_text = pending.full_text()
+
+            # Attendi la fine della riproduzione
+            if speech_job.wait() and speech_job.audio is not None:
+                self.response_cache.put(
+                    pending.text, pending.context, pending.response_data, pending.full_text(), speech_job.audio
+                )
+
+            return pending.response_data
+
         except requests.exceptions.Timeout:
             print_error(f"Timeout durante la richiesta all'API Gemini (dopo {self.timeout}s).")
         except requests.exceptions.RequestException as e:
@@ -105,5 +407,222 @@ class GeminiService:
             print_error("Errore durante la decodifica della risposta JSON dall'API Gemini.")
         except Exception as e:
             print_error(f"Errore imprevisto durante l'interazione con Gemini API: {e}")
-            
-        return None 
\ No newline at end of file
+        finally:
+            if speech_job is not None and not job_closed:
+                self.tts_service.close_job(speech_job)
+            self._pending = None
+            self._speech_job = None
+
+        return None
+
+    def repeat_last(self):
+        """
+        Speak the last response again, without a new request.
+
+        The chunks are usually still in the TTS cache, so playback starts
+        without synthesis. The method does not wait for playback.
+
+        Returns:
+            SpeechJob: The job playing the response, or None if there is nothing to repeat.
+        """
+        text = self.last_response_text
+        if not text:
+            return None
+
+        print_api_response(text)
+        speech_job = self.tts_service.open_job()
+        self.tts_service.enqueue(speech_job, text)
+        self.tts_service.close_job(speech_job)
+        return speech_job
+
+    def http_stats(self):
+        """
+        Get the counters of the HTTP client.
+
+        Returns:
+            dict: Requests, retries, new and reused connections, failures and breaker state.
+        """
+        return self.http.stats()
+
+    def cancel(self):
+        """
+        Cancel the response being delivered: the stream is closed and playback stops.
+        """
+        pending = self._pending
+        if pending is not None:
+            pending.cancel()
+
+        speech_job = self._speech_job
+        if speech_job is not None:
+            self.tts_service.cancel(speech_job)
+
+    def is_delivering(self):
+        """
+        Check if a response is being shown and spoken.
+
+        Returns:
+            bool: True while deliver() is running.
+        """
+        return self._pending is not None
+
+    def is_cancelled(self):
+        """
+        Check if the response being delivered has been cancelled.
+
+        Returns:
+            bool: True if cancel() was called during the current delivery.
+        """
+        pending = self._pending
+        return pending is not None and pending.is_cancelled()
+
+    def _open_speech_job(self, record_audio=False, trace=NULL_TRACE):
+        """
+        Open the TTS job of the current response, so that cancel() can reach it.
+
+        Args:
+            record_audio (bool): Keep the synthesized audio in the job.
+            trace (Trace, optional): Latency trace of the turn.
+
+        Returns:
+            SpeechJob: The new job.
+        """
+        self._speech_job = self.tts_service.open_job(record_audio=record_audio, trace=trace)
+        if self.is_cancelled():
+            self.tts_service.cancel(self._speech_job)
+        return self._speech_job
+
+    def _run_request(self, pending, body):
+        """
+        Perform the request of a PendingResponse (runs in its own thread).
+
+        Args:
+            pending (PendingResponse): The request to fill in.
+            body (bytes): The JSON request body.
+        """
+        try:
+            if self.stream:
+                self._request_stream(pending, body)
+            else:
+                self._request_blocking(pending, body)
+        except Exception as e:
+            pending.error = e
+        finally:
+            # I tempi entrano nella traccia solo se la risposta viene consegnata
+            pending.finish()
+
+    def _request_blocking(self, pending, body):
+        """
+        Send the body to generateContent and store the full response.
+
+        Args:
+            pending (PendingResponse): The request to fill in.
+            body (bytes): The JSON request body.
+        """
+        url = f"{self.api_url}?key={self.api_key}"
+
+        # Send the request
+        response = self.http.post(
+            url,
+            should_abort=pending.is_cancelled,
+            headers={"Content-Type": "application/json"},
+            data=body
+        )
+
+        # Check if the request was successful
+        if response.status_code != 200:
+            pending.error_message = f"Errore API Gemini: Codice {response.status_code}, {response.text}"
+            return
+
+        response_data = response.json()
+        response_text = self._extract_text(response_data)
+        if response_text is None:
+            return
+
+        pending.response_data = response_data
+        pending.add_fragment(response_text)
+
+    def _request_stream(self, pending, body):
+        """
+        Send the body to streamGenerateContent (SSE) and store each text
+        fragment as soon as it arrives, while the rest is still generated.
+
+        Args:
+            pending (PendingResponse): The request to fill in.
+            body (bytes): The JSON request body.
+        """
+        url = f"{self.stream_api_url}?alt=sse&key={self.api_key}"
+
+        with self.http.post(
+            url,
+            should_abort=pending.is_cancelled,
+            headers={"Content-Type": "application/json"},
+            data=body,
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                pending.error_message = f"Errore API Gemini: Codice {response.status_code}, {response.text}"
+                return
+
+            for event in self._iter_sse_events(response):
+                # Chiudendo la risposta si interrompe anche la generazione
+                if pending.is_cancelled():
+                    return
+
+                fragment = self._extract_text(event)
+                if fragment:
+                    pending.add_fragment(fragment)
+
+        # Risposta con la stessa struttura di generateContent, con il testo completo
+        pending.response_data = {
+            "candidates": [{
+                "content": {"parts": [{"text": pending.full_text()}]}
+            }]
+        }
+
+    def _iter_sse_events(self, response):
+        """
+        Parse a Server-Sent Events stream into JSON objects.
+
+        Args:
+            response: A streaming requests response.
+
+        Yields:
+            dict: The decoded data of each event.
+        """
+        data_lines = []
+
+        # chunk_size=None restituisce i chunk HTTP appena arrivano
+        for raw_line in response.iter_lines(chunk_size=None):
+            line = raw_line.decode("utf-8") if isinstance(raw_line, bytes) else raw_line
+
+            if line.startswith("data:"):
+                data_lines.append(line[5:].strip())
+            elif not line and data_lines:
+                # Una riga vuota chiude l'evento
+                yield json.loads("\n".join(data_lines))
+                data_lines = []
+
+        if data_lines:
+            yield json.loads("\n".join(data_lines))
+
+    def _extract_text(self, response_data):
+        """
+        Extract the text of the first candidate from a Gemini response.
+
+        Args:
+            response_data (dict): A generateContent response or stream event.
+
+        Returns:
+            str: The response text, or None if the structure is not valid.
+        """
+        candidates = response_data.get("candidates")
+        if not candidates:
+            return None
+
+        # Get the text from the first candidate
+        content = candidates[0].get("content", {})
+        parts = content.get("parts")
+        if not parts:
+            return None
+
+        return "".join(part.get("text", "") for part in parts)
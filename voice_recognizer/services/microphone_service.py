@@ -17,6 +17,7 @@ class MicrophoneService:
         Initialize the microphone service.
         """
         self.microphone = None
+        self.device_index = None
         
     def initialize_microphone(self, device_index=None):
         """
@@ -30,8 +31,34 @@ class MicrophoneService:
             Microphone: The initialized microphone object.
         """
         self.microphone = sr.Microphone(device_index=device_index)
+        self.device_index = device_index
         return self.microphone
     
+    def get_device_name(self):
+        """
+        Get the name of the current microphone, used as the key of its calibration profile.
+        
+        Returns:
+            str: The device name, or "default" if it cannot be determined.
+        """
+        device_index = self.device_index
+        try:
+            if device_index is None:
+                # Il microfono predefinito è scelto da PortAudio
+                audio = sr.Microphone.get_pyaudio().PyAudio()
+                try:
+                    device_index = audio.get_default_input_device_info()["index"]
+                finally:
+                    audio.terminate()
+            
+            for index, name in self.list_microphone_devices():
+                if index == device_index:
+                    return name
+        except Exception:
+            pass  # Dispositivo non interrogabile: si usa un profilo generico
+        
+        return "default"
+    
     def get_microphone(self):
         """
         Get the current microphone object.
@@ -5,21 +5,42 @@
 Service for voice recognition management.
 """
 
+import itertools
 import queue
 import threading
 import time
 import speech_recognition as sr
 
-from voice_recognizer.config.settings import RECOGNITION_SETTINGS, KEYWORD_SETTINGS, DISPLAY_SETTINGS
+from voice_recognizer.config.settings import (
+    RECOGNITION_SETTINGS,
+    KEYWORD_SETTINGS,
+    DISPLAY_SETTINGS,
+    SYSTEM_SETTINGS,
+    COMMAND_SETTINGS
+)
 from voice_recognizer.utils.logging_utils import (
     print_recognized_text, 
-    print_error, 
+    print_info, 
     print_progress,
     print_keyword_detected,
     print_buffering_text,
     print_countdown
 )
-from voice_recognizer.services.gemini_service import GeminiService
+from voice_recognizer.utils.scheduler_utils import TimerScheduler
+from voice_recognizer.utils.tracing_utils import get_tracer, NULL_TRACE
+from voice_recognizer.utils.queue_utils import ReorderBuffer, BoundedQueue
+from voice_recognizer.services.gemini_service import GeminiService, PendingResponse
+from voice_recognizer.services.wake_word_service import WakeWordService
+from voice_recognizer.services.vad_service import listen_in_background_with_vad, VoiceActivityDetector
+from voice_recognizer.services.calibration_service import (
+    CalibrationProfiles,
+    noise_floor_to_energy_threshold,
+    energy_threshold_to_noise_floor
+)
+from voice_recognizer.services.asr_service import create_asr_backend
+from voice_recognizer.services.end_of_turn_service import EndOfTurnDetector
+from voice_recognizer.services.file_source_service import FileAudioSource
+from voice_recognizer.services.command_service import CommandService
 
 class RecognitionService:
     """
@@ -30,22 +51,66 @@ class RecognitionService:
         """
         Initialize the voice recognition service.
         """
-        self.audio_queue = queue.Queue()
         self.recognizer = sr.Recognizer()
         self.stop_listening_callback = None
-        self.worker_thread = None
+        self.worker_threads = []
+        self.recognition_workers = max(1, RECOGNITION_SETTINGS["recognition_workers"])
+        
+        # Coda limitata tra cattura e riconoscimento: la memoria resta costante
+        # e le frasi vecchie non vengono trascritte con minuti di ritardo
+        self.audio_queue = BoundedQueue(
+            RECOGNITION_SETTINGS["audio_queue_size"],
+            policy=RECOGNITION_SETTINGS["audio_queue_policy"],
+            merge=self._merge_phrases,
+            on_discard=self._discard_phrase
+        )
+        self.response_thread = None
         self.keyword_active = False
         self.keyword_timer = None
         self.gemini_service = GeminiService()
         
+        # Motore di trascrizione scelto nelle impostazioni (Google o offline)
+        self.asr_backend = create_asr_backend(recognizer=self.recognizer)
+
+        # Riconoscimento locale della parola chiave, per evitare chiamate ASR inutili
+        self.wake_word_service = None
+        if KEYWORD_SETTINGS["enabled"] and KEYWORD_SETTINGS["local_detection"]["enabled"]:
+            self.wake_word_service = WakeWordService()
+        self.asr_calls_saved = 0
+        
+        # Un solo thread gestisce tutte le scadenze (buffer, countdown, wake word)
+        self.scheduler = TimerScheduler()
+
+        # Ogni frase catturata riceve un numero di sequenza: le trascrizioni
+        # prodotte in parallelo vengono riconsegnate nell'ordine di cattura
+        self._audio_sequence = itertools.count()
+        self.transcript_buffer = ReorderBuffer(
+            self._handle_transcript,
+            gap_timeout=RECOGNITION_SETTINGS["reorder_gap_timeout"],
+            scheduler=self.scheduler
+        )
+        
+        # Tracce delle latenze: ogni frase ha la sua, unita a quella del turno nel buffer
+        self.tracer = get_tracer()
+        
         # Buffer per accumulare il testo prima di inviarlo
         self.text_buffer = ""
+        self.turn_trace = NULL_TRACE
         self.buffer_timer = None
         self.buffer_lock = threading.Lock()
         self.countdown_timer = None
         self.forced_send_timer = None
         
-        # Timestamp dell'ultimo testo aggiunto al buffer
+        # Coda dei turni da inviare a Gemini, consumata dal thread delle risposte
+        self.dispatch_queue = queue.Queue()
+        self.follow_up_policy = RECOGNITION_SETTINGS["follow_up_policy"]
+        
+        # Richiesta speculativa inviata durante il countdown, riusata se il testo non cambia
+        self.speculative_dispatch = RECOGNITION_SETTINGS["speculative_dispatch"]
+        self.speculative_response = None
+        self.speculation_stats = {"started": 0, "reused": 0, "cancelled": 0}
+
+        # Timestamp dell'ultimo testo aggiunto al buffer, sull'orologio dello scheduler (0: buffer vuoto)
         self.last_text_time = 0
         
         # Flag che indica se il countdown è visibile
@@ -56,6 +121,40 @@ class RecognitionService:
         self.buffer_extension = RECOGNITION_SETTINGS["buffer_extension_time"]
         self.max_buffer_hold_time = RECOGNITION_SETTINGS["max_buffer_hold_time"]
         
+        # Scadenza di invio appresa dalle pause dell'utente, al posto di buffer_delay
+        self.end_of_turn = None
+        if RECOGNITION_SETTINGS["end_of_turn"]["adaptive"]:
+            self.end_of_turn = EndOfTurnDetector()
+        
+        # Comandi vocali gestiti localmente, senza countdown né Gemini
+        self.command_service = None
+        if COMMAND_SETTINGS["enabled"]:
+            self.command_service = CommandService()
+            self.command_service.register("stop", self._command_stop)
+            self.command_service.register("cancel", self._command_cancel)
+            self.command_service.register("repeat", self._command_repeat)
+            self.command_service.register("louder", lambda: self._command_volume(COMMAND_SETTINGS["volume_step"]))
+            self.command_service.register("quieter", lambda: self._command_volume(-COMMAND_SETTINGS["volume_step"]))
+        
+        # Interruzione della risposta quando l'utente inizia a parlare
+        self.barge_in = RECOGNITION_SETTINGS["barge_in"]
+        self.barge_in_count = 0
+        self.barge_in_time = 0
+        self.ducked = False
+        
+        # Le frasi catturate durante la riproduzione sono quasi sempre la voce dell'assistente
+        self.self_hearing = RECOGNITION_SETTINGS["self_hearing"]
+        self.echo_phrases_dropped = 0
+        
+        # Profili di calibrazione per microfono, affinati durante l'ascolto
+        self.calibration_profiles = None
+        if RECOGNITION_SETTINGS["calibration_profiles"]["enabled"]:
+            self.calibration_profiles = CalibrationProfiles()
+        self.device_name = None
+        self.noise_floor_db = None
+        self.vad_detector = None
+        self.calibration_timer = None
+        
         self._configure_recognizer()
         
     def _configure_recognizer(self):
@@ -67,6 +166,15 @@ class RecognitionService:
         self.recognizer.pause_threshold = RECOGNITION_SETTINGS["pause_threshold"]
         self.recognizer.non_speaking_duration = RECOGNITION_SETTINGS["non_speaking_duration"]
     
+    def warm_up(self):
+        """
+        Load the audio output in the background, while the microphone is being set up.
+
+        Returns:
+            threading.Thread: The daemon thread doing the work.
+        """
+        return self.gemini_service.tts_service.warm_up()
+
     def calibrate_for_ambient_noise(self, microphone, duration=None):
         """
         Calibrate the recognizer for ambient noise.
@@ -79,6 +187,75 @@ class RecognitionService:
         
         with microphone as source:
             self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+        
+        self.noise_floor_db = energy_threshold_to_noise_floor(
+            self.recognizer.energy_threshold,
+            self.recognizer.dynamic_energy_ratio
+        )
+        
+        # Il nuovo profilo sostituisce quello salvato per il microfono
+        if self.calibration_profiles is not None and self.device_name is not None:
+            self.calibration_profiles.set(self.device_name, self.noise_floor_db)
+            self.calibration_profiles.save()
+    
+    def use_calibration_profile(self, device_name):
+        """
+        Select the microphone whose profile is loaded, refined and saved.
+        
+        Args:
+            device_name (str): Name of the microphone.
+            
+        Returns:
+            bool: True if a saved profile was applied and calibration can be skipped.
+        """
+        self.device_name = device_name
+        if self.calibration_profiles is None:
+            return False
+        
+        profile = self.calibration_profiles.get(device_name)
+        if profile is None:
+            return False
+        
+        self.noise_floor_db = profile["noise_floor_db"]
+        self.recognizer.energy_threshold = noise_floor_to_energy_threshold(
+            self.noise_floor_db,
+            self.recognizer.dynamic_energy_ratio
+        )
+        return True
+    
+    def _refine_calibration(self):
+        """
+        Fold the current noise floor into the profile of the microphone and save it.
+        
+        Runs on the scheduler thread every refine_interval seconds while listening.
+        """
+        profile_settings = RECOGNITION_SETTINGS["calibration_profiles"]
+        self.calibration_timer = self.scheduler.schedule(
+            profile_settings["refine_interval"],
+            self._refine_calibration
+        )
+        
+        detector = self.vad_detector
+        if detector is not None:
+            # Durante il parlato (o la risposta) la stima del rumore non è affidabile
+            if detector.noise_floor_db is None or detector.in_speech or self.gemini_service.tts_service.is_speaking:
+                return
+            noise_floor_db = detector.noise_floor_db
+        else:
+            # Senza VAD la soglia dinamica del Recognizer segue già il rumore
+            noise_floor_db = energy_threshold_to_noise_floor(
+                self.recognizer.energy_threshold,
+                self.recognizer.dynamic_energy_ratio
+            )
+        
+        profile = self.calibration_profiles.refine(self.device_name, noise_floor_db)
+        self.noise_floor_db = profile["noise_floor_db"]
+        if detector is not None:
+            self.recognizer.energy_threshold = noise_floor_to_energy_threshold(
+                self.noise_floor_db,
+                self.recognizer.dynamic_energy_ratio
+            )
+        self.calibration_profiles.save()
     
     def _audio_callback(self, recognizer, audio):
         """
@@ -88,23 +265,230 @@ class RecognitionService:
             recognizer: The recognizer that detected the audio.
             audio: The detected audio.
         """
-        self.audio_queue.put(audio)
+        # Una sorgente registrata, a fine file, può consegnare frasi vuote
+        if not audio.frame_data:
+            return
+        
+        # La frase è finita: la risposta abbassata torna al volume normale
+        if self.ducked:
+            self.ducked = False
+            self.gemini_service.tts_service.unduck()
+        
+        # Scarta le frasi catturate mentre l'assistente parlava
+        if self._is_self_hearing(audio):
+            self.echo_phrases_dropped += 1
+            return
+        
+        # Mentre l'assistente è inattivo, scarta le frasi senza la parola chiave
+        if not self._passes_wake_word_gate(audio):
+            self.asr_calls_saved += 1
+            return
+        
+        # La frase è appena finita: la cattura è iniziata una durata fa (in tempo reale)
+        trace = self.tracer.start_trace()
+        end_ns = time.perf_counter_ns()
+        duration_ns = int(len(audio.frame_data) * 1e9 / (audio.sample_rate * audio.sample_width) / self.scheduler.time_scale)
+        trace.add("capture", end_ns - duration_ns, end_ns)
+        trace.mark("captured", end_ns)
+        
+        self.audio_queue.put((next(self._audio_sequence), audio, trace))
         print_progress()
     
+    def _on_speech_start(self, contrast_db):
+        """
+        Callback called by the VAD as soon as speech starts, before the phrase is complete.
+        
+        If a reply is being played and the onset is the user's voice rather
+        than the echo of the reply, the reply is stopped or ducked right away (barge-in).
+        
+        Args:
+            contrast_db (float): Energy of the onset above the recent microphone level, in dB.
+        """
+        tts_service = self.gemini_service.tts_service
+        if not self.barge_in["enabled"] or not tts_service.is_speaking:
+            return
+        
+        # Anche l'eco della risposta fa partire una frase: senza questo controllo
+        # ogni eco passerebbe per barge-in e il filtro dell'eco non scarterebbe nulla
+        if self.self_hearing["enabled"] and not self._is_user_onset(contrast_db):
+            return
+        
+        # In entrambe le modalità la frase che inizia ora è dell'utente: non va
+        # scartata come eco, altrimenti in modalità "duck" non arriverebbe mai all'ASR
+        self.barge_in_time = time.monotonic()
+        
+        if self.barge_in["mode"] == "stop":
+            self._interrupt_reply()
+        else:
+            self.ducked = True
+            tts_service.duck(self.barge_in["duck_level"])
+    
+    def _is_user_onset(self, contrast_db):
+        """
+        Tell the user's voice from the echo of the reply at the start of a phrase.
+        
+        While the reply plays, the recent microphone level is the level of its
+        echo: only an onset well above it is the user speaking over the reply.
+        Right after the reply starts the level still reflects the silence
+        before it, so the onsets of the first settle_time seconds count as echo.
+        
+        Args:
+            contrast_db (float): Energy of the onset above the recent microphone level, in dB.
+            
+        Returns:
+            bool: True if the onset is the user's voice.
+        """
+        playing_since = self.gemini_service.tts_service.playing_since()
+        settle_time = self.barge_in["settle_time"] / self.scheduler.time_scale
+        if playing_since is None or time.monotonic() - playing_since < settle_time:
+            return False
+        return contrast_db >= self.barge_in["min_contrast_db"]
+    
+    def _interrupt_reply(self):
+        """
+        Stop the reply being played: its stream, queued synthesis and playback are cancelled.
+        """
+        tts_service = self.gemini_service.tts_service
+        if not tts_service.is_speaking and not self.gemini_service.is_delivering():
+            return
+        
+        self.barge_in_count += 1
+        self.barge_in_time = time.monotonic()
+        self.gemini_service.cancel()
+        tts_service.interrupt()
+        if self.ducked:
+            self.ducked = False
+            tts_service.unduck()
+    
+    def _is_self_hearing(self, audio):
+        """
+        Check if a phrase was captured while a reply was being played.
+        
+        Such phrases are dropped before the ASR, unless the user interrupted or
+        ducked the reply while saying them (barge-in) or they contain the wake word.
+        
+        Args:
+            audio: The captured phrase, just completed.
+            
+        Returns:
+            bool: True if the phrase must be discarded.
+        """
+        if not self.self_hearing["enabled"]:
+            return False
+        
+        # La frase è appena finita: la sua durata dà l'istante di inizio. Durate e
+        # coda sono in tempo reale, anche se la registrazione è riprodotta più veloce
+        end = time.monotonic()
+        duration = len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)
+        start = end - duration / self.scheduler.time_scale
+        tail = self.self_hearing["tail"] / self.scheduler.time_scale
+        if not self.gemini_service.tts_service.was_playing(start, end, tail=tail):
+            return False
+        
+        # La risposta è stata interrotta o abbassata all'inizio di questa frase
+        # (o poco prima): è la voce dell'utente, non l'eco della risposta
+        if start - tail <= self.barge_in_time <= end:
+            return False
+        
+        if self.self_hearing["allow_wake_word"] and self.wake_word_service is not None \
+                and self.wake_word_service.is_available() and self.wake_word_service.detect_audio(audio):
+            self._activate_keyword()
+            return False
+        
+        return True
+    
+    def _passes_wake_word_gate(self, audio):
+        """
+        Check locally if a phrase must be sent to the cloud ASR.
+        
+        Args:
+            audio: The captured phrase.
+            
+        Returns:
+            bool: True if the phrase must be recognized, False if it can be discarded.
+        """
+        if not KEYWORD_SETTINGS["enabled"] or self.keyword_active:
+            return True
+            
+        # Senza modelli della parola chiave si usa il controllo sul testo trascritto
+        if self.wake_word_service is None or not self.wake_word_service.is_available():
+            return True
+            
+        if self.wake_word_service.detect_audio(audio):
+            self._activate_keyword()
+            return True
+            
+        return False
+    
+    def _merge_phrases(self, first, second):
+        """
+        Merge two adjacent queued phrases into one.
+        
+        Args:
+            first (tuple): Sequence number, audio and trace of the older phrase.
+            second (tuple): Sequence number, audio and trace of the newer phrase.
+            
+        Returns:
+            tuple: The merged phrase, with the sequence number of the older one.
+        """
+        sequence, audio, trace = first
+        _, next_audio, next_trace = second
+        trace.adopt(next_trace)
+        merged_audio = sr.AudioData(
+            audio.frame_data + next_audio.get_raw_data(audio.sample_rate, audio.sample_width),
+            audio.sample_rate,
+            audio.sample_width
+        )
+        return sequence, merged_audio, trace
+    
+    def _discard_phrase(self, item):
+        """
+        Called for each phrase dropped or absorbed by a merge in the audio queue.
+        
+        Args:
+            item (tuple): Sequence number, audio and trace of the phrase.
+        """
+        sequence = item[0]
+        self.transcript_buffer.skip(sequence)
+    
+    def audio_queue_stats(self):
+        """
+        Get the counters of the audio queue.
+        
+        Returns:
+            dict: Current depth, high-water mark, dropped and merged phrases.
+        """
+        return self.audio_queue.stats()
+    
+    def asr_stats(self):
+        """
+        Get the counters and latencies of the ASR backend.
+        
+        Returns:
+            dict: Calls, failures and latency figures of the backend.
+        """
+        return self.asr_backend.stats()
+    
     def _reset_keyword_timer(self):
         """
         Reset the timer for the wake word timeout.
         """
-        if self.keyword_timer is not None:
-            self.keyword_timer.cancel()
+        self.scheduler.cancel(self.keyword_timer)
             
-        # Create a new timer that deactivates the wake word after timeout
-        self.keyword_timer = threading.Timer(
+        # Schedule the deactivation of the wake word after timeout
+        self.keyword_timer = self.scheduler.schedule(
             KEYWORD_SETTINGS["timeout"], 
             self._deactivate_keyword
         )
-        self.keyword_timer.daemon = True
-        self.keyword_timer.start()
+    
+    def pending_timers(self):
+        """
+        Get the number of deadlines waiting on the scheduler.
+        
+        Returns:
+            int: Number of pending timers.
+        """
+        return self.scheduler.pending_count()
     
     def _activate_keyword(self):
         """
@@ -161,19 +545,16 @@ class RecognitionService:
         Annulla tutti i timer attivi relativi al buffer.
         """
         # Annulla il timer del buffer principale
-        if self.buffer_timer is not None:
-            self.buffer_timer.cancel()
-            self.buffer_timer = None
+        self.scheduler.cancel(self.buffer_timer)
+        self.buffer_timer = None
         
         # Annulla il timer del countdown
-        if self.countdown_timer is not None:
-            self.countdown_timer.cancel()
-            self.countdown_timer = None
+        self.scheduler.cancel(self.countdown_timer)
+        self.countdown_timer = None
             
         # Annulla il timer di invio forzato
-        if self.forced_send_timer is not None:
-            self.forced_send_timer.cancel()
-            self.forced_send_timer = None
+        self.scheduler.cancel(self.forced_send_timer)
+        self.forced_send_timer = None
             
         # Resetta il flag del countdown
         self.countdown_active = False
@@ -181,21 +562,146 @@ class RecognitionService:
     def _send_buffer_to_api(self):
         """
         Invia il buffer di testo corrente all'API Gemini e pulisce il buffer.
+
+        Il buffer viene scambiato atomicamente e passato al thread delle risposte,
+        così il riconoscimento non resta bloccato durante la richiesta e la sintesi vocale.
         """
         with self.buffer_lock:
-            if self.text_buffer:
-                # Stampa un messaggio che indica l'invio del testo buffered
-                print_recognized_text(self.text_buffer + " (invio)")
-                
-                # Invia il testo all'API Gemini
-                self.gemini_service.send_text(self.text_buffer)
-                
-                # Pulisce il buffer
-                self.text_buffer = ""
-                
-                # Resetta il timestamp dell'ultimo testo
-                self.last_text_time = 0
-    
+            text = self.text_buffer
+
+            # Pulisce il buffer
+            self.text_buffer = ""
+
+            # Resetta il timestamp dell'ultimo testo
+            self.last_text_time = 0
+
+            # La richiesta speculativa vale solo se è stata fatta con lo stesso testo
+            speculative = self.speculative_response
+            self.speculative_response = None
+
+            trace = self.turn_trace
+            self.turn_trace = NULL_TRACE
+
+        if speculative is not None and (not text or speculative.text != text):
+            self._discard_speculation(speculative)
+            speculative = None
+
+        if text:
+            # Stampa un messaggio che indica l'invio del testo buffered
+            print_recognized_text(text + " (invio)")
+
+            # Attesa dall'ultima frase alla scadenza del countdown
+            trace.since("last_phrase", "turn_wait", speculative=speculative is not None)
+            trace.mark("sent")
+
+            if speculative is not None:
+                self.speculation_stats["reused"] += 1
+            self._dispatch_turn(speculative or text, trace)
+
+    def _dispatch_turn(self, text, trace=NULL_TRACE):
+        """
+        Accoda un turno per il thread delle risposte, secondo la politica configurata.
+
+        Args:
+            text (str or PendingResponse): Testo del turno, o la sua richiesta già avviata.
+            trace (Trace, optional): Traccia delle latenze del turno.
+        """
+        if self.follow_up_policy == "cancel":
+            # Il nuovo turno sostituisce quelli in attesa e la risposta in corso
+            self.cancel_turns()
+
+        self.dispatch_queue.put((text, trace))
+
+    def cancel_turns(self):
+        """
+        Annulla i turni in attesa e interrompe la risposta in corso.
+        """
+        while True:
+            try:
+                item = self.dispatch_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            # Il segnale di uscita non va perso
+            if item is None:
+                self.dispatch_queue.put(None)
+                self.dispatch_queue.task_done()
+                break
+
+            text, trace = item
+            if isinstance(text, PendingResponse):
+                text.cancel()
+            trace.finish()
+            self.dispatch_queue.task_done()
+
+        self.gemini_service.cancel()
+
+    def _response_worker(self):
+        """
+        Worker thread that sends the dispatched turns to Gemini and speaks the responses.
+        """
+        while True:
+            item = self.dispatch_queue.get()
+
+            # Exit signal
+            if item is None:
+                break
+
+            text, trace = item
+            try:
+                if isinstance(text, PendingResponse):
+                    # Risposta speculativa: parte di essa può essere già arrivata
+                    self.gemini_service.deliver(text)
+                else:
+                    self.gemini_service.send_text(text, trace=trace)
+            finally:
+                # La risposta è stata riprodotta: la traccia del turno è completa
+                trace.since("captured", "turn_total")
+                trace.finish()
+                self.dispatch_queue.task_done()
+
+    def _command_stop(self):
+        """
+        Comando "stop": interrompe la risposta in corso e i turni in attesa.
+        """
+        self.cancel_turns()
+        self.gemini_service.tts_service.interrupt()
+
+    def _command_cancel(self):
+        """
+        Comando "annulla": scarta il testo in attesa di invio e interrompe la risposta in corso.
+        """
+        self._cancel_timers()
+
+        with self.buffer_lock:
+            self.text_buffer = ""
+            self.last_text_time = 0
+            self.turn_trace = NULL_TRACE
+            speculative = self.speculative_response
+            self.speculative_response = None
+
+        if speculative is not None:
+            self._discard_speculation(speculative)
+
+        self._command_stop()
+
+    def _command_repeat(self):
+        """
+        Comando "ripeti": riproduce di nuovo l'ultima risposta, senza una nuova richiesta.
+        """
+        if self.gemini_service.repeat_last() is None:
+            print_info("Nessuna risposta da ripetere.")
+
+    def _command_volume(self, delta):
+        """
+        Comandi "più forte" e "più piano": cambia il volume della voce.
+
+        Args:
+            delta (float): Variazione del volume.
+        """
+        volume = self.gemini_service.tts_service.adjust_volume(delta)
+        print_info(f"Volume: {volume:.0%}")
+
     def _start_countdown(self, seconds):
         """
         Avvia un countdown visibile per l'utente prima dell'invio del testo.
@@ -206,6 +712,9 @@ class RecognitionService:
         # Imposta il flag del countdown
         self.countdown_active = True
         
+        # Il buffer è fermo: la richiesta parte subito, in parallelo al countdown
+        self._start_speculation()
+        
         def _countdown_step(remaining):
             """Step del countdown."""
             if remaining <= 0:
@@ -218,13 +727,74 @@ class RecognitionService:
             print_countdown(remaining)
                 
             # Programma il prossimo step del countdown
-            self.countdown_timer = threading.Timer(1.0, _countdown_step, [remaining - 1])
-            self.countdown_timer.daemon = True
-            self.countdown_timer.start()
+            self.countdown_timer = self.scheduler.schedule(1.0, _countdown_step, remaining - 1)
         
         # Avvia il countdown
         _countdown_step(int(seconds))
     
+    def _start_speculation(self):
+        """
+        Invia il buffer a Gemini in background, senza riprodurre la risposta.
+
+        Se allo scadere del countdown il testo è invariato, la risposta (in corso
+        o già completa) viene riusata invece di inviare una nuova richiesta.
+        """
+        if not self.speculative_dispatch:
+            return
+
+        with self.buffer_lock:
+            text = self.text_buffer
+            if not text or (self.speculative_response is not None and self.speculative_response.text == text):
+                return
+
+            previous = self.speculative_response
+            self.speculative_response = self.gemini_service.prepare(text, trace=self.turn_trace)
+            if self.speculative_response is not None:
+                self.speculation_stats["started"] += 1
+
+        if previous is not None:
+            self._discard_speculation(previous)
+
+    def _cancel_speculation(self):
+        """
+        Annulla la richiesta speculativa, perché il buffer è cambiato.
+        """
+        with self.buffer_lock:
+            speculative = self.speculative_response
+            self.speculative_response = None
+
+        if speculative is not None:
+            self._discard_speculation(speculative)
+
+    def _discard_speculation(self, speculative):
+        """
+        Abbandona una richiesta speculativa non più valida.
+
+        Args:
+            speculative (PendingResponse): La richiesta da annullare.
+        """
+        speculative.cancel()
+        self.speculation_stats["cancelled"] += 1
+
+    def _send_deadline(self, text):
+        """
+        Calcola quando inviare il turno dopo l'ultima frase.
+        
+        Args:
+            text (str): Testo attualmente nel buffer.
+            
+        Returns:
+            tuple: Attesa prima del countdown e durata del countdown, in secondi.
+        """
+        if self.end_of_turn is None:
+            # Lascia almeno 3 secondi per il countdown o 0.1 se il buffer_delay è troppo piccolo
+            return (self.buffer_delay - 3.0 if self.buffer_delay > 3.0 else 0.1), 3
+        
+        # Il countdown visibile copre i secondi interi finali della scadenza (al massimo 3)
+        delay = self.end_of_turn.send_delay(text)
+        countdown = min(3, int(delay))
+        return delay - countdown, countdown
+    
     def _schedule_buffer_send(self):
         """
         Pianifica l'invio del buffer all'API dopo un ritardo.
@@ -233,44 +803,54 @@ class RecognitionService:
         self._cancel_timers()
         
         # Calcola il tempo passato dall'ultima aggiunta di testo
-        time_since_last_text = time.time() - self.last_text_time
+        time_since_last_text = self.scheduler.now() - self.last_text_time
+        
+        with self.buffer_lock:
+            text = self.text_buffer
+        wait, countdown = self._send_deadline(text)
         
         # Se è passato troppo tempo, invia subito
-        if time_since_last_text > self.buffer_delay and self.last_text_time > 0:
+        if time_since_last_text > wait + countdown and self.last_text_time > 0:
             self._send_buffer_to_api()
             return
             
         # Imposta il timer per l'avvio del countdown
-        self.buffer_timer = threading.Timer(
-            self.buffer_delay - 3.0 if self.buffer_delay > 3.0 else 0.1,  # Lascia almeno 3 secondi per il countdown o 0.1 se il buffer_delay è troppo piccolo
+        self.buffer_timer = self.scheduler.schedule(
+            wait,
             self._start_countdown,
-            [3]  # Countdown di 3 secondi
+            countdown
         )
-        self.buffer_timer.daemon = True
-        self.buffer_timer.start()
         
         # Imposta un timer di sicurezza per l'invio forzato dopo il tempo massimo
         if self.max_buffer_hold_time > 0:
-            self.forced_send_timer = threading.Timer(
+            self.forced_send_timer = self.scheduler.schedule(
                 self.max_buffer_hold_time,
                 self._force_send_buffer
             )
-            self.forced_send_timer.daemon = True
-            self.forced_send_timer.start()
             
         # Mostra il testo buffered con indicazione visiva
         with self.buffer_lock:
             if self.text_buffer:
                 print_buffering_text(self.text_buffer)
     
-    def _add_to_buffer(self, text):
+    def _add_to_buffer(self, text, trace=NULL_TRACE):
         """
         Aggiunge testo al buffer e pianifica l'invio.
         
         Args:
             text (str): Testo da aggiungere al buffer.
+            trace (Trace, optional): Traccia della frase, unita a quella del turno.
         """
         with self.buffer_lock:
+            # La prima frase del buffer apre il turno, le successive vi si uniscono
+            if not self.turn_trace.enabled:
+                self.turn_trace = trace
+            else:
+                self.turn_trace.adopt(trace)
+            self.turn_trace.since("transcribed", "add_to_buffer")
+            self.turn_trace.mark("last_phrase")
+            
+
             if self.text_buffer:
                 # Se c'è già del testo nel buffer, aggiungi uno spazio prima del nuovo testo
                 self.text_buffer += " " + text
@@ -278,12 +858,21 @@ class RecognitionService:
                 # Altrimenti, imposta il buffer al nuovo testo
                 self.text_buffer = text
                 
+            # La pausa dalla frase precedente dello stesso turno alimenta il modello di fine turno;
+            # last_text_time è azzerato all'invio, così le pause tra un turno e l'altro non contano
+            now = self.scheduler.now()
+            if self.end_of_turn is not None and self.last_text_time > 0:
+                self.end_of_turn.observe_gap(now - self.last_text_time)
+
             # Aggiorna il timestamp dell'ultimo testo aggiunto
-            self.last_text_time = time.time()
+            self.last_text_time = now
             
             # Mostra il testo buffered con indicazione visiva
             print_buffering_text(self.text_buffer)
             
+        # Il testo è cambiato: la risposta speculativa non è più valida
+        self._cancel_speculation()
+        
         # Se il countdown è attivo, annulla tutto e riprogramma
         if self.countdown_active:
             self._cancel_timers()
@@ -291,46 +880,72 @@ class RecognitionService:
         # Pianifica l'invio del buffer
         self._schedule_buffer_send()
         
+    def _handle_transcript(self, item):
+        """
+        Process a transcript, in capture order.
+        
+        Args:
+            item (tuple): The recognized text and the trace of its phrase.
+        """
+        text, trace = item
+        
+        # Check if the text contains the wake word or if the system is already active
+        if self._check_for_keyword(text):
+            # Se contiene la parola chiave, rimuovila dal testo prima di bufferizzarlo
+            if KEYWORD_SETTINGS["keyword"].lower() in text.lower():
+                # Rimuovi solo la prima occorrenza della parola chiave (case insensitive)
+                keyword = KEYWORD_SETTINGS["keyword"].lower()
+                text_lower = text.lower()
+                start_index = text_lower.find(keyword)
+                if start_index != -1:
+                    text = text[:start_index] + text[start_index + len(keyword):]
+                    text = text.strip()
+            
+            # L'utente ha parlato sopra la risposta: in modalità "duck" viene interrotta ora
+            if text and self.barge_in["enabled"] and self.barge_in["mode"] == "duck":
+                if self.command_service is None or self.command_service.match(text) not in ("louder", "quieter", "repeat"):
+                    self._interrupt_reply()
+            
+            # I comandi locali vengono eseguiti subito e non entrano nel buffer
+            if text and self.command_service is not None:
+                start_ns = time.perf_counter_ns()
+                if self.command_service.handle(text):
+                    trace.add("command", start_ns, time.perf_counter_ns())
+                    trace.since("captured", "turn_total")
+                    trace.finish()
+                    return
+            
+            # Aggiungi il testo al buffer solo se non è vuoto dopo la rimozione della keyword
+            if text:
+                self._add_to_buffer(text, trace)
+        
     def _recognition_worker(self):
         """
         Worker thread that performs voice recognition.
+        
+        Several workers run in parallel; their transcripts go through the
+        reorder buffer so they are processed in capture order.
         """
         while True:
-            audio = self.audio_queue.get()
+            item = self.audio_queue.get()
             
             # Exit signal
-            if audio is None:
-                # Invia il buffer rimanente prima di uscire
-                self._force_send_buffer()
+            if item is None:
+                self.audio_queue.task_done()
                 break
+            
+            sequence, audio, trace = item
+            text = None
+            trace.since("captured", "asr_queue")
                 
             try:
-                # Recognize audio using Google Speech Recognition
-                text = self.recognizer.recognize_google(
-                    audio, 
-                    language=RECOGNITION_SETTINGS["language"]
-                )
-                
-                # Check if the text contains the wake word or if the system is already active
-                if self._check_for_keyword(text):
-                    # Se contiene la parola chiave, rimuovila dal testo prima di bufferizzarlo
-                    if KEYWORD_SETTINGS["keyword"].lower() in text.lower():
-                        # Rimuovi solo la prima occorrenza della parola chiave (case insensitive)
-                        keyword = KEYWORD_SETTINGS["keyword"].lower()
-                        text_lower = text.lower()
-                        start_index = text_lower.find(keyword)
-                        if start_index != -1:
-                            text = text[:start_index] + text[start_index + len(keyword):]
-                            text = text.strip()
-                    
-                    # Aggiungi il testo al buffer solo se non è vuoto dopo la rimozione della keyword
-                    if text:
-                        self._add_to_buffer(text)
-                
-            except sr.UnknownValueError:
-                pass  # Ignore unrecognized audio
-            except sr.RequestError as e:
-                print_error(f"Error during service request: {e}")
+                # Recognize audio with the configured ASR backend
+                with trace.span("asr", backend=self.asr_backend.name):
+                    text = self.asr_backend.transcribe(audio)
+                trace.mark("transcribed")
+            finally:
+                # Anche le frasi senza testo fanno avanzare la sequenza
+                self.transcript_buffer.submit(sequence, (text, trace) if text else None)
             
             self.audio_queue.task_done()
     
@@ -344,20 +959,92 @@ class RecognitionService:
         Returns:
             function: Function to stop listening.
         """
-        # Start the worker thread
-        self.worker_thread = threading.Thread(target=self._recognition_worker)
-        self.worker_thread.daemon = True
-        self.worker_thread.start()
+        if isinstance(microphone, FileAudioSource):
+            # Una registrazione può aspettare: nessuna frase va scartata se il riconoscimento resta indietro
+            self.audio_queue.policy = "block"
+
+            # Le scadenze di fine turno seguono il tempo della registrazione, non quello reale
+            if microphone.speed > 0:
+                self.scheduler.set_time_scale(microphone.speed)
+
+        # Start the worker threads
+        self.worker_threads = []
+        for _ in range(self.recognition_workers):
+            worker_thread = threading.Thread(target=self._recognition_worker)
+            worker_thread.daemon = True
+            worker_thread.start()
+            self.worker_threads.append(worker_thread)
+
+        # Endpoint locale delle tracce, se abilitato
+        self.tracer.start_server()
+        
+        # Start the response thread
+        self.response_thread = threading.Thread(target=self._response_worker)
+        self.response_thread.daemon = True
+        self.response_thread.start()
         
         # Start listening in the background
-        self.stop_listening_callback = self.recognizer.listen_in_background(
-            microphone, 
-            self._audio_callback, 
-            phrase_time_limit=RECOGNITION_SETTINGS["phrase_time_limit"]
-        )
+        if RECOGNITION_SETTINGS["vad"]["enabled"]:
+            # Il VAD parte dal rumore di fondo calibrato o salvato, invece di stimarlo dal primo blocco
+            self.vad_detector = VoiceActivityDetector(microphone.SAMPLE_RATE)
+            self.vad_detector.noise_floor_db = self.noise_floor_db
+            
+            # I confini delle frasi vengono decisi dal VAD invece che dalla soglia di energia
+            self.stop_listening_callback = listen_in_background_with_vad(
+                self.recognizer,
+                microphone,
+                self._audio_callback,
+                phrase_time_limit=RECOGNITION_SETTINGS["phrase_time_limit"],
+                on_speech_start=self._on_speech_start,
+                detector=self.vad_detector
+            )
+        else:
+            self.stop_listening_callback = self.recognizer.listen_in_background(
+                microphone, 
+                self._audio_callback, 
+                phrase_time_limit=RECOGNITION_SETTINGS["phrase_time_limit"]
+            )
+        
+        # Il profilo del microfono segue il rumore della stanza durante l'ascolto
+        if self.calibration_profiles is not None and self.device_name is not None:
+            self.calibration_timer = self.scheduler.schedule(
+                RECOGNITION_SETTINGS["calibration_profiles"]["refine_interval"],
+                self._refine_calibration
+            )
         
         return self.stop_listening_callback
     
+    def wait_until_idle(self, timeout=None, poll_interval=0.05):
+        """
+        Wait until every captured phrase has been transcribed and every turn answered.
+        
+        Used when the audio comes from a recording, to let the last turn
+        finish before stopping.
+        
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds.
+            poll_interval (float): Seconds between two checks.
+            
+        Returns:
+            bool: True if the pipeline is idle, False if the timeout expired.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            if not self.audio_queue.join(timeout=remaining):
+                return False
+            
+            with self.buffer_lock:
+                buffered = bool(self.text_buffer)
+            # unfinished_tasks comprende il turno in corso di risposta
+            if not buffered and self.transcript_buffer.pending_count() == 0 \
+                    and self.dispatch_queue.unfinished_tasks == 0:
+                return True
+            
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(poll_interval)
+    
     def stop_recognition(self, wait_for_stop=False):
         """
         Stop voice recognition.
@@ -369,15 +1056,61 @@ class RecognitionService:
             self.stop_listening_callback(wait_for_stop=wait_for_stop)
         
         # Cancel the wake word timer if active
-        if self.keyword_timer:
-            self.keyword_timer.cancel()
+        self.scheduler.cancel(self.keyword_timer)
+        self.scheduler.cancel(self.calibration_timer)
             
         # Cancel all buffer timers if active
         self._cancel_timers()
             
-        # Send exit signal to worker thread
-        self.audio_queue.put(None)
+        # Send exit signal to worker threads
+        for _ in self.worker_threads:
+            self.audio_queue.put(None, force=True)
+        
+        # Wait for worker threads to terminate
+        deadline = time.time() + SYSTEM_SETTINGS["thread_join_timeout"]
+        for worker_thread in self.worker_threads:
+            if worker_thread.is_alive():
+                worker_thread.join(timeout=max(0, deadline - time.time()))
+        
+        # Riepilogo delle latenze di trascrizione
+        stats = self.asr_stats()
+        if stats["calls"]:
+            print_info(
+                f"ASR {stats['backend']}: {stats['calls']} richieste, {stats['failures']} errori, "
+                f"latenza media {stats['mean_latency']:.2f}s, p95 {stats['p95_latency']:.2f}s"
+            )
+            if "hedged" in stats:
+                print_info(
+                    f"Richieste duplicate: {stats['hedged']}, vinte dal primario: {stats['primary_wins']}, "
+                    f"dal secondario: {stats['secondary_wins']}"
+                )
+        
+        if self.echo_phrases_dropped:
+            print_info(f"Frasi scartate durante la riproduzione: {self.echo_phrases_dropped} (richieste ASR risparmiate)")
+        
+        if self.barge_in_count:
+            print_info(f"Risposte interrotte dall'utente: {self.barge_in_count}")
+        
+        if self.command_service is not None:
+            command_stats = self.command_service.stats()
+            if command_stats["matched"]:
+                print_info(f"Comandi locali: {command_stats['matched']}, gestiti in media in {command_stats['mean_ms']:.1f} ms")
+        
+        http_stats = self.gemini_service.http_stats()
+        if http_stats["requests"]:
+            print_info(
+                f"Gemini: {http_stats['requests']} richieste, {http_stats['reused_connections']} su connessioni riusate, "
+                f"{http_stats['retries']} ripetute, {http_stats['failures']} fallite"
+            )
+        
+        # Invia il buffer rimanente prima di uscire
+        self._force_send_buffer()
+
+        # Send exit signal to the response thread, after the remaining turns
+        self.dispatch_queue.put(None)
+
+        # Stop the scheduler thread
+        self.scheduler.stop()
         
-        # Wait for worker thread to terminate
-        if self.worker_thread and self.worker_thread.is_alive():
-            self.worker_thread.join(timeout=1) 
\ No newline at end of file
+        # Stop the tracing endpoint
+        self.tracer.stop_server() 
\ No newline at end of file
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for caching Gemini responses to repeated utterances.
+"""
+
+import hashlib
+import json
+import re
+import time
+from collections import namedtuple
+from voice_recognizer.config.api_settings import GEMINI_API_SETTINGS
+from voice_recognizer.utils.cache_utils import LRUCache
+from voice_recognizer.utils.text_utils import normalize_utterance
+
+# Risposta memorizzata: dati dell'API, testo, audio sintetizzato per chunk e scadenza
+CachedResponse = namedtuple("CachedResponse", ["response_data", "text", "audio", "expires_at"])
+
+class ResponseCache:
+    """
+    LRU cache of Gemini responses with a time to live per entry.
+
+    Entries are keyed by the normalized utterance, the conversation context
+    it was sent with, the model and the settings that change the response
+    or its audio: a question whose answer depends on the previous turns
+    ("quanti anni ha?") is only replayed after the same history. The TTL of
+    an entry is chosen by the first matching rule; a TTL of zero keeps
+    time-sensitive or context-dependent utterances out of the cache.
+    """
+
+    def __init__(self, settings=None, model=None, variant=None):
+        """
+        Initialize the cache.
+
+        Args:
+            settings (dict, optional): Cache settings (default: GEMINI_API_SETTINGS["response_cache"]).
+            model (str, optional): The Gemini model, part of the key.
+            variant (dict, optional): Other settings that change the response, part of the key.
+        """
+        settings = settings or GEMINI_API_SETTINGS["response_cache"]
+        self.enabled = settings["enabled"]
+        self.default_ttl = settings["default_ttl"]
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in settings["ttl_rules"]]
+        self._entries = LRUCache(max_entries=settings["max_entries"])
+        self._key_prefix = json.dumps([model, variant or {}], sort_keys=True)
+
+    def ttl_for(self, text):
+        """
+        Choose the time to live of an utterance.
+
+        Args:
+            text (str): The utterance.
+
+        Returns:
+            float: Seconds the response stays valid; 0 if it must not be cached.
+        """
+        normalized = normalize_utterance(text)
+        if not self.enabled or not normalized:
+            return 0
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(normalized):
+                return ttl
+        return self.default_ttl
+
+    def get(self, text, context):
+        """
+        Look up the response to an utterance.
+
+        Args:
+            text (str): The utterance.
+            context (str): Digest of the conversation history sent with it.
+
+        Returns:
+            CachedResponse: The entry, or None on a miss or if it expired.
+        """
+        if not self.enabled:
+            return None
+
+        key = self._key(text, context)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.time():
+            self._entries.remove(key)
+            return None
+        return entry
+
+    def put(self, text, context, response_data, response_text, audio):
+        """
+        Store the response to an utterance, unless its TTL is zero.
+
+        Args:
+            text (str): The utterance.
+            context (str): Digest of the conversation history it was sent with.
+            response_data (dict): The API response.
+            response_text (str): The response text.
+            audio (list): MP3 data of each synthesized chunk.
+
+        Returns:
+            bool: True if the response was stored.
+        """
+        ttl = self.ttl_for(text)
+        if ttl <= 0:
+            return False
+
+        entry = CachedResponse(response_data, response_text, list(audio), time.time() + ttl)
+        self._entries.put(self._key(text, context), entry)
+        return True
+
+    def stats(self):
+        """
+        Get the counters of the cache.
+
+        Returns:
+            dict: Entries, hits, misses and evictions.
+        """
+        return self._entries.stats()
+
+    def _key(self, text, context):
+        """
+        Build the key of an utterance.
+
+        Args:
+            text (str): The utterance.
+            context (str): Digest of the conversation history.
+
+        Returns:
+            str: Hex digest of model, settings, history and normalized text.
+        """
+        key = self._key_prefix + "\0" + context + "\0" + normalize_utterance(text)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
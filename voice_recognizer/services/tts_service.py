@@ -5,114 +5,606 @@
 Service for text-to-speech functionality.
 """
 
+import hashlib
+import io
 import os
+import queue
 import re
-import tempfile
-from gtts import gTTS
-import pygame
+import threading
+import time
+from collections import deque
+from voice_recognizer.config.settings import TTS_SETTINGS
+from voice_recognizer.utils.cache_utils import LRUCache, DiskCache
+from voice_recognizer.utils.import_utils import LazyModule, preload
 from voice_recognizer.utils.logging_utils import print_error, print_info
+from voice_recognizer.utils.text_utils import split_sentences
+from voice_recognizer.utils.tracing_utils import NULL_TRACE
+
+# Nasconde il messaggio di benvenuto di pygame
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+# Moduli pesanti: importati al primo uso o in background da warm_up()
+gtts = LazyModule("gtts")
+pygame = LazyModule("pygame")
+
+class SpeechJob:
+    """
+    Handle for a reply going through the TTS pipeline.
+    """
+
+    def __init__(self, service=None, trace=NULL_TRACE):
+        """
+        Initialize the job.
+
+        Args:
+            service (TTSService, optional): The service playing the job, used by cancel().
+            trace (Trace, optional): Latency trace of the turn.
+        """
+        self.service = service
+        self.trace = trace
+        self.done = threading.Event()
+        self.success = True
+        self.started = False
+        self.cancelled = False
+
+        # Audio MP3 di ogni chunk, se la risposta va registrata (ad esempio per una cache)
+        self.audio = None
+
+    def wait(self, timeout=None):
+        """
+        Wait until the whole reply has been played.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds.
+
+        Returns:
+            bool: True if every chunk was synthesized and played, False otherwise.
+        """
+        return self.done.wait(timeout) and self.success
+
+    def cancel(self):
+        """
+        Stop the reply: playback stops and its queued chunks are not synthesized.
+        """
+        if self.service is not None:
+            self.service.cancel(self)
 
 class TTSService:
     """
     Service for converting text to speech using gTTS (Google Text-to-Speech).
+
+    Synthesis and playback run on two worker threads: the reply is split into
+    chunks, chunk N+1 is synthesized while chunk N plays, and the synthesized
+    chunks are queued on a dedicated mixer channel for gapless playback.
+    Synthesized chunks are cached in memory and on disk, so repeated phrases
+    play without a network call. pygame, gTTS and the audio device are
+    loaded by the first reply, or in the background by warm_up(), so
+    creating the service does not delay startup.
     """
-    
-    def __init__(self, language="it"):
+
+    # Motore di sintesi, parte della chiave della cache
+    engine = "gtts"
+
+    def __init__(self, language=None):
         """
         Initialize the TTS service.
-        
+
         Args:
-            language (str): Language code for TTS synthesis.
+            language (str, optional): Language code for TTS synthesis.
         """
-        self.language = language
+        self.language = language or TTS_SETTINGS["language"]
+        self.max_chunk_chars = TTS_SETTINGS["max_chunk_chars"]
+        self.poll_interval = TTS_SETTINGS["poll_interval"]
+        self.volume = TTS_SETTINGS["volume"]
+        self._duck_level = 1.0
         self.is_speaking = False
-        self.temp_file = None
-        
-        # Initialize pygame mixer for audio playback
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            print_error(f"Impossibile inizializzare l'audio per la sintesi vocale: {e}")
-    
+
+        # Code della pipeline: testo da sintetizzare e audio pronto da riprodurre
+        self._synthesis_queue = queue.Queue()
+        self._playback_queue = queue.Queue(maxsize=TTS_SETTINGS["lookahead_chunks"])
+        self._workers_lock = threading.Lock()
+        self._workers_started = False
+        self._channel = None
+        self._playback_lock = threading.Lock()
+        self._playing_job = None
+        self._active_jobs = set()
+
+        # Intervalli di riproduzione recenti (time.monotonic), per riconoscere
+        # le frasi catturate mentre l'assistente parlava
+        self._playback_windows = deque(maxlen=16)
+
+        # Cache a due livelli dell'audio sintetizzato
+        self.memory_cache = None
+        self.disk_cache = None
+        cache_settings = TTS_SETTINGS["cache"]
+        if cache_settings["enabled"]:
+            self.memory_cache = LRUCache(max_entries=cache_settings["memory_entries"])
+            if cache_settings["disk_dir"]:
+                self.disk_cache = DiskCache(
+                    cache_settings["disk_dir"],
+                    cache_settings["disk_max_bytes"],
+                    suffix=".mp3"
+                )
+
+        # Il mixer viene inizializzato al primo uso o da warm_up()
+        self._mixer_lock = threading.Lock()
+        self._mixer_initialized = False
+
+    def warm_up(self):
+        """
+        Import pygame and gTTS and open the audio device in a background thread.
+
+        Returns:
+            threading.Thread: The daemon thread doing the work.
+        """
+        warm_up_thread = threading.Thread(target=self._init_mixer)
+        warm_up_thread.daemon = True
+        warm_up_thread.start()
+        preload(gtts)
+        return warm_up_thread
+
+    def _init_mixer(self):
+        """
+        Initialize the pygame mixer and the voice channel, once.
+
+        Returns:
+            bool: True if the voice channel is available.
+        """
+        with self._mixer_lock:
+            if not self._mixer_initialized:
+                self._mixer_initialized = True
+
+                # Initialize pygame mixer for audio playback
+                try:
+                    pygame.mixer.init()
+
+                    # Riserva un canale per la voce, così i chunk vengono accodati senza pause
+                    pygame.mixer.set_reserved(1)
+                    self._channel = pygame.mixer.Channel(0)
+                except Exception as e:
+                    print_error(f"Impossibile inizializzare l'audio per la sintesi vocale: {e}")
+
+            return self._channel is not None
+
     def clean_text(self, text):
         """
         Rimuove caratteri speciali dal testo, mantenendo solo lettere, numeri e punteggiatura.
-        
+
         Args:
             text (str): Testo da pulire.
-            
+
         Returns:
             str: Testo pulito.
         """
         if not text:
             return ""
-            
+
         # Mantieni solo lettere, numeri, punteggiatura e spazi
         # La regex conserva: lettere (compresi accenti), numeri, spazi, e punteggiatura comune
         cleaned_text = re.sub(r'[^\w\s.,;:!?"\'\(\)\-–—]', '', text, flags=re.UNICODE)
         return cleaned_text
-    
+
     def speak(self, text):
         """
-        Converte il testo in voce e lo riproduce.
-        
+        Converte il testo in voce e lo riproduce, attendendo la fine della riproduzione.
+
         Args:
             text (str): Testo da convertire in voce.
-            
+
         Returns:
             bool: True se la conversione e riproduzione hanno avuto successo, False altrimenti.
         """
-        if not text or self.is_speaking:
+        job = self.speak_async(text)
+        if job is None:
             return False
-            
-        # Pulisce il testo dai caratteri speciali
-        cleaned_text = self.clean_text(text)
-        if not cleaned_text:
+
+        return job.wait()
+
+    def speak_async(self, text):
+        """
+        Converte il testo in voce e ne avvia la riproduzione, senza attenderne la fine.
+
+        Args:
+            text (str): Testo da convertire in voce.
+
+        Returns:
+            SpeechJob: Handle della riproduzione (wait, cancel), o None se non c'è niente da riprodurre.
+        """
+        if not text:
+            return None
+
+        job = self.open_job()
+        queued = self.enqueue(job, text)
+        self.close_job(job)
+
+        if not queued:
             print_error("Testo vuoto dopo la pulizia, niente da riprodurre.")
-            return False
-            
-        # Crea un file temporaneo per salvare l'audio
-        try:
-            # Crea il file temporaneo
-            fd, self.temp_file = tempfile.mkstemp(suffix='.mp3')
-            os.close(fd)  # Chiudi il file descriptor
-            
-            # Genera il file audio con gTTS
-            tts = gTTS(text=cleaned_text, lang=self.language, slow=False)
-            tts.save(self.temp_file)
-            
-            # Riproduci l'audio
-            self.is_speaking = True
-            print_info("\nRiproduzione risposta vocale...")
-            
-            pygame.mixer.music.load(self.temp_file)
-            pygame.mixer.music.play()
-            
-            # Attendi che l'audio finisca di riprodursi
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-                
-            self.is_speaking = False
-            
-            # Rimuovi il file temporaneo
-            self._cleanup()
-            
-            return True
-            
-        except Exception as e:
-            print_error(f"Errore durante la sintesi vocale: {e}")
-            self.is_speaking = False
-            self._cleanup()
-            return False
-    
-    def _cleanup(self):
+            return None
+
+        return job
+
+    def open_job(self, record_audio=False, trace=NULL_TRACE):
+        """
+        Start a new reply in the pipeline.
+
+        Args:
+            record_audio (bool): Keep the MP3 data of every chunk in job.audio.
+            trace (Trace, optional): Latency trace of the turn, with the synthesis and playback spans.
+
+        Returns:
+            SpeechJob: The handle to pass to enqueue and close_job.
+        """
+        self._ensure_workers()
+        job = SpeechJob(self, trace)
+        if record_audio:
+            job.audio = []
+        with self._playback_lock:
+            self._active_jobs.add(job)
+        return job
+
+    def enqueue(self, job, text):
+        """
+        Split text into chunks and queue them for synthesis.
+
+        Args:
+            job (SpeechJob): The reply the text belongs to.
+            text (str): Text to speak.
+
+        Returns:
+            int: Number of chunks queued.
+        """
+        cleaned_text = self.clean_text(text)
+        chunks = split_sentences(cleaned_text, max_chars=self.max_chunk_chars)
+
+        for chunk in chunks:
+            self._synthesis_queue.put((job, chunk))
+
+        return len(chunks)
+
+    def enqueue_audio(self, job, audio_chunks):
+        """
+        Queue already synthesized chunks, skipping synthesis.
+
+        Args:
+            job (SpeechJob): The reply the audio belongs to.
+            audio_chunks (list): MP3 data of each chunk, e.g. a recorded job.audio.
+
+        Returns:
+            int: Number of chunks queued.
+        """
+        for audio in audio_chunks:
+            self._synthesis_queue.put((job, audio))
+
+        return len(audio_chunks)
+
+    def close_job(self, job):
+        """
+        Mark the end of a reply: the job completes once its last chunk is played.
+
+        Args:
+            job (SpeechJob): The reply to close.
+        """
+        self._synthesis_queue.put((job, None))
+
+    def cancel(self, job):
+        """
+        Cancel a reply: its queued chunks are discarded and playback stops.
+
+        Args:
+            job (SpeechJob): The reply to cancel.
+        """
+        with self._playback_lock:
+            job.cancelled = True
+            job.success = False
+
+            if self._playing_job is job and self._channel is not None:
+                self._channel.stop()
+                self._end_playback_window()
+
+    def interrupt(self):
+        """
+        Cancel every reply being synthesized or played (e.g. when the user starts speaking).
+
+        Returns:
+            int: Number of replies cancelled.
+        """
+        with self._playback_lock:
+            jobs = [job for job in self._active_jobs if not job.cancelled]
+
+        for job in jobs:
+            self.cancel(job)
+        return len(jobs)
+
+    def was_playing(self, start, end, tail=0.0):
+        """
+        Check if a reply was being played during a time interval.
+
+        Args:
+            start (float): Start of the interval (time.monotonic).
+            end (float): End of the interval (time.monotonic).
+            tail (float): Seconds after the end of playback still counted as playback
+                          (output latency and room echo).
+
+        Returns:
+            bool: True if the interval overlaps a playback window.
+        """
+        with self._playback_lock:
+            windows = list(self._playback_windows)
+
+        for window_start, window_end in windows:
+            if window_start <= end and (window_end is None or start <= window_end + tail):
+                return True
+        return False
+
+    def playing_since(self):
+        """
+        Get the time the reply being played started.
+
+        Returns:
+            float: Start of the current playback window (time.monotonic), or None if nothing is playing.
+        """
+        with self._playback_lock:
+            if self._playback_windows and self._playback_windows[-1][1] is None:
+                return self._playback_windows[-1][0]
+        return None
+
+    def _end_playback_window(self):
+        """
+        Close the playback window in progress, if any (the playback lock must be held).
+        """
+        if self._playback_windows and self._playback_windows[-1][1] is None:
+            self._playback_windows[-1] = (self._playback_windows[-1][0], time.monotonic())
+
+    def duck(self, level):
+        """
+        Lower the volume of playback without stopping it.
+
+        Args:
+            level (float): Fraction of the normal volume (0 to 1).
+        """
+        with self._playback_lock:
+            self._duck_level = min(1.0, max(0.0, level))
+            self._apply_volume()
+
+    def unduck(self):
+        """
+        Restore the normal volume after duck().
+        """
+        self.duck(1.0)
+
+    def adjust_volume(self, delta):
+        """
+        Change the playback volume, also for the reply being played.
+
+        Args:
+            delta (float): Amount added to the volume (negative to lower it).
+
+        Returns:
+            float: The new volume, between 0 and 1.
+        """
+        with self._playback_lock:
+            self.volume = min(1.0, max(0.0, self.volume + delta))
+            self._apply_volume()
+            return self.volume
+
+    def _apply_volume(self):
+        """
+        Set the volume of the voice channel (the playback lock must be held).
+        """
+        if self._channel is not None:
+            self._channel.set_volume(self.volume * self._duck_level)
+
+    def _ensure_workers(self):
+        """
+        Start the synthesis and playback worker threads if needed.
+        """
+        with self._workers_lock:
+            if self._workers_started:
+                return
+
+            for target in (self._synthesis_worker, self._playback_worker):
+                worker = threading.Thread(target=target)
+                worker.daemon = True
+                worker.start()
+
+            self._workers_started = True
+
+    def cache_stats(self):
+        """
+        Get the counters of the synthesis cache.
+
+        Returns:
+            dict: Stats of the memory and disk tiers (None if disabled).
+        """
+        return {
+            "memory": self.memory_cache.stats() if self.memory_cache else None,
+            "disk": self.disk_cache.stats() if self.disk_cache else None,
+        }
+
+    def _cache_key(self, text):
+        """
+        Build the content-addressed cache key of a chunk.
+
+        Args:
+            text (str): The cleaned chunk text.
+
+        Returns:
+            str: Hex digest of engine, language and text.
+        """
+        key = f"{self.engine}\0{self.language}\0{text}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key):
+        """
+        Look up synthesized audio in memory first, then on disk.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            bytes: The MP3 data, or None on a miss.
+        """
+        if self.memory_cache is None:
+            return None
+
+        audio = self.memory_cache.get(key)
+        if audio is None and self.disk_cache is not None:
+            audio = self.disk_cache.get(key)
+            if audio is not None:
+                self.memory_cache.put(key, audio)
+
+        return audio
+
+    def _cache_put(self, key, audio):
+        """
+        Store synthesized audio in both cache tiers.
+
+        Args:
+            key (str): The cache key.
+            audio (bytes): The MP3 data.
+        """
+        if self.memory_cache is None or not audio:
+            return
+
+        self.memory_cache.put(key, audio)
+        if self.disk_cache is not None:
+            self.disk_cache.put(key, audio)
+
+    def _synthesize(self, text):
+        """
+        Synthesize a chunk of text into MP3 segments, entirely in memory.
+
+        Cached chunks are returned as a single segment without a network call.
+        Otherwise gTTS splits long text into parts and streams one complete MP3
+        segment per part: each segment is yielded as soon as its bytes arrive,
+        so playback can start before the last part has been downloaded.
+
+        Args:
+            text (str): The chunk to synthesize.
+
+        Yields:
+            bytes: The MP3 data of each segment.
+        """
+        key = self._cache_key(text)
+        audio = self._cache_get(key)
+        if audio is not None:
+            yield audio
+            return
+
+        tts = gtts.gTTS(text=text, lang=self.language, slow=False)
+        segments = []
+        for segment in tts.stream():
+            segments.append(segment)
+            yield segment
+
+        # I segmenti MP3 concatenati formano un unico flusso valido
+        self._cache_put(key, b"".join(segments))
+
+    def _synthesis_worker(self):
         """
-        Pulisce le risorse temporanee.
+        Worker thread that synthesizes queued chunks ahead of playback.
         """
-        # Rimuovi il file temporaneo se esiste
-        if self.temp_file and os.path.exists(self.temp_file):
+        # Decodificare i segmenti richiede il mixer
+        self._init_mixer()
+
+        while True:
+            job, chunk = self._synthesis_queue.get()
+
+            if chunk is None:
+                self._playback_queue.put((job, None))
+                continue
+
+            # Dopo un errore il resto della risposta viene scartato
+            if not job.success:
+                continue
+
             try:
-                os.remove(self.temp_file)
-                self.temp_file = None
+                # I chunk già sintetizzati arrivano come bytes
+                prerecorded = isinstance(chunk, bytes)
+                segments = [chunk] if prerecorded else self._synthesize(chunk)
+                recorded = []
+
+                # Tempo di sintesi e decodifica, senza l'attesa sulla coda di riproduzione
+                start_ns = step_ns = time.perf_counter_ns()
+                busy_ns = 0
+                for segment in segments:
+                    if not job.success:
+                        break
+                    sound = pygame.mixer.Sound(file=io.BytesIO(segment))
+                    recorded.append(segment)
+                    busy_ns += time.perf_counter_ns() - step_ns
+
+                    # La coda di riproduzione è limitata: la sintesi resta pochi segmenti avanti
+                    self._playback_queue.put((job, sound))
+                    step_ns = time.perf_counter_ns()
+
+                busy_ns += time.perf_counter_ns() - step_ns
+                job.trace.add("tts_synthesis", start_ns, start_ns + busy_ns,
+                              chars=0 if prerecorded else len(chunk), prerecorded=prerecorded)
+
+                if job.audio is not None:
+                    job.audio.append(b"".join(recorded))
             except Exception as e:
-                print_error(f"Errore durante la pulizia del file temporaneo: {e}") 
\ No newline at end of file
+                print_error(f"Errore durante la sintesi vocale: {e}")
+                job.success = False
+
+    def _playback_worker(self):
+        """
+        Worker thread that queues synthesized chunks on the voice channel.
+        """
+        self._init_mixer()
+
+        while True:
+            job, sound = self._playback_queue.get()
+
+            if sound is None:
+                # Fine della risposta: attendi che l'ultimo chunk sia stato riprodotto
+                self._wait_for_channel(lambda: self._channel.get_busy())
+                self.is_speaking = False
+                with self._playback_lock:
+                    self._active_jobs.discard(job)
+                    self._end_playback_window()
+                job.done.set()
+                continue
+
+            if self._channel is None:
+                job.success = False
+                continue
+
+            # Le risposte annullate non vengono riprodotte
+            if not job.success:
+                continue
+
+            if not job.started:
+                job.started = True
+                print_info("\nRiproduzione risposta vocale...")
+
+                # Primo audio in uscita: dall'invio del turno e dalla fine dell'ultima frase
+                job.trace.since("sent", "first_audio")
+                job.trace.since("captured", "end_to_end")
+
+            # Il canale accetta un solo suono in coda: attendi che parta quello precedente
+            self._wait_for_channel(lambda: self._channel.get_queue() is not None)
+
+            with self._playback_lock:
+                if not job.success:
+                    continue
+                if not self._playback_windows or self._playback_windows[-1][1] is not None:
+                    self._playback_windows.append((time.monotonic(), None))
+                self.is_speaking = True
+                self._playing_job = job
+                self._apply_volume()
+                self._channel.queue(sound)
+
+    def _wait_for_channel(self, condition):
+        """
+        Poll the voice channel until a condition becomes false.
+
+        Args:
+            condition (callable): Returns True while waiting should continue.
+        """
+        if self._channel is None:
+            return
+
+        while condition():
+            time.sleep(self.poll_interval)
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for frame-level voice activity detection.
+"""
+
+import math
+import threading
+from collections import deque, namedtuple
+import numpy as np
+import speech_recognition as sr
+from voice_recognizer.config.settings import RECOGNITION_SETTINGS
+from voice_recognizer.utils.audio_utils import pcm_to_float, frame_signal
+
+# Frase rilevata: audio PCM e istanti di inizio e fine (in secondi dall'avvio dello stream)
+VADPhrase = namedtuple("VADPhrase", ["data", "start_time", "end_time"])
+
+class VoiceActivityDetector:
+    """
+    Classifies fixed-length audio frames as speech or non-speech.
+
+    Frames are scored in batches with vectorized NumPy operations using
+    energy above an adaptive noise floor, zero-crossing rate and spectral
+    flatness; the raw decisions are then smoothed with an onset delay and
+    a hangover.
+    """
+
+    def __init__(self, sample_rate, settings=None):
+        """
+        Initialize the detector.
+
+        Args:
+            sample_rate (int): Sample rate of the audio.
+            settings (dict, optional): VAD settings (default: RECOGNITION_SETTINGS["vad"]).
+        """
+        settings = settings or RECOGNITION_SETTINGS["vad"]
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * settings["frame_ms"] / 1000)
+        self.frame_duration = self.frame_length / float(sample_rate)
+        self.energy_margin_db = settings["energy_margin_db"]
+        self.flatness_threshold = settings["flatness_threshold"]
+        self.zcr_threshold = settings["zcr_threshold"]
+        self.onset_frames = settings["onset_frames"]
+        self.hangover_frames = max(1, int(round(settings["hangover_ms"] / 1000.0 / self.frame_duration)))
+        self.noise_adaptation = settings["noise_adaptation"]
+
+        self.noise_floor_db = None
+        self.raw_decisions = np.zeros(0, dtype=bool)
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+
+    def reset(self):
+        """
+        Reset the smoothing state (the noise floor is kept).
+        """
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+
+    def frame_features(self, frames):
+        """
+        Compute the features of a batch of frames.
+
+        Args:
+            frames (numpy.ndarray): Float frames, shape (n, frame_length).
+
+        Returns:
+            tuple: Energy in dB, zero-crossing rate and spectral flatness, one value per frame.
+        """
+        energy_db = 10.0 * np.log10(np.mean(frames ** 2, axis=1) + 1e-12)
+
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        # Piattezza spettrale: media geometrica / media aritmetica dello spettro di potenza
+        power = np.abs(np.fft.rfft(frames * np.hanning(frames.shape[1]), axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+        return energy_db, zcr, flatness
+
+    def process(self, frames):
+        """
+        Classify a batch of frames, updating the noise floor and the smoothing state.
+
+        Args:
+            frames (numpy.ndarray): Float frames, shape (n, frame_length).
+
+        The decisions before smoothing are kept in raw_decisions.
+
+        Returns:
+            numpy.ndarray: Boolean speech decision per frame, after smoothing.
+        """
+        if len(frames) == 0:
+            self.raw_decisions = np.zeros(0, dtype=bool)
+            return np.zeros(0, dtype=bool)
+
+        energy_db, zcr, flatness = self.frame_features(frames)
+
+        # Il primo blocco fornisce una stima iniziale del rumore di fondo
+        if self.noise_floor_db is None:
+            self.noise_floor_db = float(np.percentile(energy_db, 20))
+
+        margin = energy_db - self.noise_floor_db
+        voiced = (margin > self.energy_margin_db) & (flatness < self.flatness_threshold)
+        fricative = (margin > self.energy_margin_db / 2.0) & (zcr > self.zcr_threshold)
+        loud = margin > 2.0 * self.energy_margin_db
+        raw = voiced | fricative | loud
+        self.raw_decisions = raw
+
+        decisions = np.empty(len(raw), dtype=bool)
+        for index, is_speech in enumerate(raw):
+            decisions[index] = self._smooth(is_speech)
+
+        # Il rumore di fondo segue i frame senza voce; i frame con voce lo alzano
+        # molto lentamente, così una stima iniziale troppo bassa si corregge da sola
+        self._adapt_noise_floor(energy_db[~raw], self.noise_adaptation)
+        self._adapt_noise_floor(energy_db[raw], self.noise_adaptation / 10.0)
+
+        return decisions
+
+    def _adapt_noise_floor(self, energy_db, rate):
+        """
+        Move the noise floor towards the mean energy of some frames.
+
+        Args:
+            energy_db (numpy.ndarray): Energy of the frames in dB.
+            rate (float): Adaptation rate per frame.
+        """
+        if len(energy_db) == 0:
+            return
+
+        # Tasso equivalente per l'intero blocco, indipendente dalla sua lunghezza
+        alpha = 1.0 - (1.0 - rate) ** len(energy_db)
+        self.noise_floor_db += alpha * (float(np.mean(energy_db)) - self.noise_floor_db)
+
+    def _smooth(self, is_speech):
+        """
+        Apply onset delay and hangover to one raw decision.
+
+        Args:
+            is_speech (bool): Raw decision for the frame.
+
+        Returns:
+            bool: Smoothed decision for the frame.
+        """
+        if is_speech:
+            self._speech_run += 1
+            self._silence_run = 0
+            if not self.in_speech and self._speech_run >= self.onset_frames:
+                self.in_speech = True
+        else:
+            self._speech_run = 0
+            if self.in_speech:
+                self._silence_run += 1
+                if self._silence_run >= self.hangover_frames:
+                    self.in_speech = False
+
+        return self.in_speech
+
+class VADSegmenter:
+    """
+    Splits a PCM stream into phrases using a VoiceActivityDetector.
+
+    The segmenter also follows the recent level of the input with an
+    exponential moving average: at the start of each phrase it reports how
+    much louder the onset is than what the microphone was hearing before,
+    so a caller can tell a voice over a loud background (e.g. the reply
+    being played) from the background itself.
+    """
+
+    def __init__(self, sample_rate, sample_width, settings=None, phrase_time_limit=None,
+                 on_speech_start=None, detector=None):
+        """
+        Initialize the segmenter.
+
+        Args:
+            sample_rate (int): Sample rate of the stream.
+            sample_width (int): Bytes per sample.
+            settings (dict, optional): VAD settings (default: RECOGNITION_SETTINGS["vad"]).
+            phrase_time_limit (float, optional): Maximum phrase length in seconds.
+            on_speech_start (callable, optional): Called as soon as speech starts, with the
+                                                  energy of the onset above the recent input level, in dB.
+            detector (VoiceActivityDetector, optional): Detector to use, e.g. with a known noise floor.
+        """
+        settings = settings or RECOGNITION_SETTINGS["vad"]
+        self.sample_width = sample_width
+        self.detector = detector or VoiceActivityDetector(sample_rate, settings)
+        self.on_speech_start = on_speech_start
+
+        frame_bytes = self.detector.frame_length * sample_width
+        self._frame_bytes = frame_bytes
+        self._preroll_frames = int(settings["preroll_ms"] / 1000.0 / self.detector.frame_duration)
+        self._min_speech_frames = int(settings["min_speech_ms"] / 1000.0 / self.detector.frame_duration)
+        self._max_frames = None
+        if phrase_time_limit:
+            self._max_frames = int(phrase_time_limit / self.detector.frame_duration)
+
+        self._pending = b""
+        self._preroll = []
+        self._phrase = []
+        self._speech_frames = 0
+        self._frame_index = 0
+
+        # Livello recente dell'ingresso (potenza media); per gli ultimi frame si tengono
+        # la potenza e il livello precedente, così l'inizio frase non pesa sul confronto
+        self._level_alpha = 1.0 - math.exp(-self.detector.frame_duration / (settings["level_window_ms"] / 1000.0))
+        self._level = None
+        self._recent_frames = deque(maxlen=self.detector.onset_frames)
+
+    def process(self, data):
+        """
+        Feed PCM bytes and return the phrases they complete.
+
+        Args:
+            data (bytes): Raw mono PCM data.
+
+        Returns:
+            list: The completed phrases, as VADPhrase tuples.
+        """
+        self._pending += data
+        frame_count = len(self._pending) // self._frame_bytes
+        if frame_count == 0:
+            return []
+
+        chunk = self._pending[:frame_count * self._frame_bytes]
+        self._pending = self._pending[frame_count * self._frame_bytes:]
+
+        samples = pcm_to_float(chunk, self.sample_width)
+        frames = frame_signal(samples, self.detector.frame_length, self.detector.frame_length)
+        decisions = self.detector.process(frames)
+        raw_decisions = self.detector.raw_decisions
+        power = np.mean(frames ** 2, axis=1) + 1e-12
+
+        phrases = []
+        for index, in_speech in enumerate(decisions):
+            self._update_level(power[index])
+            frame = chunk[index * self._frame_bytes:(index + 1) * self._frame_bytes]
+            phrase = self._add_frame(frame, in_speech, raw_decisions[index])
+            self._frame_index += 1
+            if phrase is not None:
+                phrases.append(phrase)
+        return phrases
+
+    def flush(self):
+        """
+        Return the phrase in progress, if any, and reset the state.
+
+        Returns:
+            VADPhrase: The pending phrase, or None.
+        """
+        phrase = self._finish_phrase()
+        self.detector.reset()
+        self._pending = b""
+        return phrase
+
+    def _add_frame(self, frame, in_speech, is_speech):
+        """
+        Add one classified frame to the phrase being built.
+
+        Args:
+            frame (bytes): The PCM frame.
+            in_speech (bool): Smoothed decision for the frame.
+            is_speech (bool): Raw decision for the frame.
+
+        Returns:
+            VADPhrase: A completed phrase, or None.
+        """
+        if not self._phrase:
+            if not in_speech:
+                # Conserva qualche frame prima dell'inizio del parlato
+                self._preroll.append(frame)
+                if len(self._preroll) > self._preroll_frames:
+                    self._preroll.pop(0)
+                return None
+
+            self._phrase = self._preroll + [frame]
+            self._preroll = []
+            self._speech_frames = 1
+            if self.on_speech_start is not None:
+                self.on_speech_start(self._onset_contrast())
+            return None
+
+        # Contano solo i frame con voce, non quelli tenuti attivi dall'hangover
+        self._phrase.append(frame)
+        if is_speech:
+            self._speech_frames += 1
+
+        # Fine della frase: hangover scaduto o durata massima raggiunta
+        if not in_speech or (self._max_frames and len(self._phrase) >= self._max_frames):
+            return self._finish_phrase()
+        return None
+
+    def _update_level(self, power):
+        """
+        Fold the power of one frame into the recent input level.
+
+        Args:
+            power (float): Mean power of the frame.
+        """
+        self._recent_frames.append((power, self._level if self._level is not None else power))
+        if self._level is None:
+            self._level = power
+        else:
+            self._level += self._level_alpha * (power - self._level)
+
+    def _onset_contrast(self):
+        """
+        Compare the frames that started the phrase with the recent input level.
+
+        Returns:
+            float: Energy of the onset frames above the level that preceded them, in dB.
+        """
+        onset = sum(power for power, _ in self._recent_frames) / len(self._recent_frames)
+        return 10.0 * math.log10(onset / self._recent_frames[0][1])
+
+    def _finish_phrase(self):
+        """
+        Close the phrase in progress.
+
+        Returns:
+            VADPhrase: The phrase, or None if it is too short to contain speech.
+        """
+        phrase, speech_frames = self._phrase, self._speech_frames
+        self._phrase = []
+        self._speech_frames = 0
+
+        if not phrase or speech_frames < self._min_speech_frames:
+            return None
+
+        end_time = (self._frame_index + 1) * self.detector.frame_duration
+        start_time = end_time - len(phrase) * self.detector.frame_duration
+        return VADPhrase(b"".join(phrase), start_time, end_time)
+
+def listen_in_background_with_vad(recognizer, source, callback, phrase_time_limit=None,
+                                  on_speech_start=None, settings=None, detector=None):
+    """
+    Capture phrases in a background thread using the VAD for phrase boundaries.
+
+    Drop-in replacement for Recognizer.listen_in_background.
+
+    Args:
+        recognizer: The recognizer passed to the callback.
+        source: The audio source (e.g. a Microphone).
+        callback (callable): Called as callback(recognizer, AudioData) for each phrase.
+        phrase_time_limit (float, optional): Maximum phrase length in seconds.
+        on_speech_start (callable, optional): Called as soon as speech starts, with the
+                                              onset energy above the recent input level in dB.
+        settings (dict, optional): VAD settings (default: RECOGNITION_SETTINGS["vad"]).
+        detector (VoiceActivityDetector, optional): Detector to use; its noise floor can be read while listening.
+
+    Returns:
+        function: Function that stops listening, with a wait_for_stop argument.
+    """
+    running = [True]
+
+    def threaded_listen():
+        with source as s:
+            segmenter = VADSegmenter(
+                s.SAMPLE_RATE,
+                s.SAMPLE_WIDTH,
+                settings=settings,
+                phrase_time_limit=phrase_time_limit,
+                on_speech_start=on_speech_start,
+                detector=detector
+            )
+            end_of_stream = False
+            while running[0]:
+                data = s.stream.read(s.CHUNK)
+                if not data:
+                    end_of_stream = True
+                    break
+                for phrase in segmenter.process(data):
+                    callback(recognizer, sr.AudioData(phrase.data, s.SAMPLE_RATE, s.SAMPLE_WIDTH))
+
+            # A fine registrazione l'ultima frase viene consegnata anche se l'ascolto è stato fermato
+            phrase = segmenter.flush()
+            if phrase is not None and (running[0] or end_of_stream):
+                callback(recognizer, sr.AudioData(phrase.data, s.SAMPLE_RATE, s.SAMPLE_WIDTH))
+
+    def stopper(wait_for_stop=True):
+        running[0] = False
+        if wait_for_stop:
+            listener_thread.join()
+
+    listener_thread = threading.Thread(target=threaded_listen)
+    listener_thread.daemon = True
+    listener_thread.start()
+    return stopper
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service for on-device wake word spotting.
+"""
+
+import os
+import numpy as np
+from voice_recognizer.config.settings import KEYWORD_SETTINGS
+from voice_recognizer.utils.audio_utils import mfcc, read_wav, audio_data_to_float
+from voice_recognizer.utils.logging_utils import print_error
+
+class WakeWordService:
+    """
+    Spots the wake word in raw PCM audio, without any network call.
+
+    The wake word is described by a few WAV recordings (templates). Each
+    phrase is compared with the templates by subsequence dynamic time warping
+    over MFCC features: the wake word is detected when the best alignment
+    distance is below the threshold.
+    """
+
+    def __init__(self, templates_dir=None, threshold=None):
+        """
+        Initialize the service and load the templates.
+
+        Args:
+            templates_dir (str, optional): Directory with the WAV templates.
+            threshold (float, optional): Detection threshold on the normalized
+                                         DTW distance. If None, it is derived
+                                         from the distances between templates.
+        """
+        settings = KEYWORD_SETTINGS["local_detection"]
+        self.templates_dir = templates_dir or settings["templates_dir"]
+        self.threshold = threshold if threshold is not None else settings["threshold"]
+        self.threshold_margin = settings["threshold_margin"]
+        self.templates = []
+
+        if self.templates_dir and os.path.isdir(self.templates_dir):
+            self.load_templates(self.templates_dir)
+
+    def load_templates(self, directory):
+        """
+        Load every WAV file of a directory as a template.
+
+        Args:
+            directory (str): Directory with the WAV templates.
+
+        Returns:
+            int: Number of templates loaded.
+        """
+        templates = []
+        for name in sorted(os.listdir(directory)):
+            if not name.lower().endswith(".wav"):
+                continue
+            try:
+                samples, sample_rate = read_wav(os.path.join(directory, name))
+            except Exception as e:
+                print_error(f"Impossibile leggere il modello della parola chiave {name}: {e}")
+                continue
+
+            features = self._features(samples, sample_rate)
+            if len(features) > 0:
+                templates.append(features)
+
+        self.templates = templates
+
+        if self.threshold is None and len(templates) > 1:
+            self.threshold = self._calibrate_threshold()
+
+        return len(self.templates)
+
+    def is_available(self):
+        """
+        Check if local detection can be used.
+
+        Returns:
+            bool: True if templates and a threshold are available.
+        """
+        return bool(self.templates) and self.threshold is not None
+
+    def score(self, samples, sample_rate):
+        """
+        Compute the distance between a signal and the closest template.
+
+        Args:
+            samples (numpy.ndarray): The float signal.
+            sample_rate (int): Sample rate of the signal.
+
+        Returns:
+            float: The normalized DTW distance (inf if the signal is too short).
+        """
+        features = self._features(samples, sample_rate)
+        if len(features) == 0:
+            return float("inf")
+
+        return min(self._subsequence_dtw(template, features) for template in self.templates)
+
+    def detect(self, samples, sample_rate):
+        """
+        Check if a signal contains the wake word.
+
+        Args:
+            samples (numpy.ndarray): The float signal.
+            sample_rate (int): Sample rate of the signal.
+
+        Returns:
+            bool: True if the wake word was spotted.
+        """
+        if not self.is_available():
+            return False
+        return self.score(samples, sample_rate) <= self.threshold
+
+    def detect_audio(self, audio):
+        """
+        Check if a captured phrase contains the wake word.
+
+        Args:
+            audio (AudioData): The captured phrase.
+
+        Returns:
+            bool: True if the wake word was spotted.
+        """
+        samples, sample_rate = audio_data_to_float(audio)
+        return self.detect(samples, sample_rate)
+
+    def detect_file(self, path):
+        """
+        Check if a WAV file contains the wake word.
+
+        Args:
+            path (str): Path of the WAV file.
+
+        Returns:
+            bool: True if the wake word was spotted.
+        """
+        samples, sample_rate = read_wav(path)
+        return self.detect(samples, sample_rate)
+
+    def _features(self, samples, sample_rate):
+        """
+        Compute the features used for matching.
+
+        Args:
+            samples (numpy.ndarray): The float signal.
+            sample_rate (int): Sample rate of the signal.
+
+        Returns:
+            numpy.ndarray: MFCC frames without the energy coefficient.
+        """
+        # Il coefficiente 0 dipende dal volume: viene scartato
+        return mfcc(samples, sample_rate)[:, 1:]
+
+    def _calibrate_threshold(self):
+        """
+        Derive the threshold from the distances between the templates.
+
+        Returns:
+            float: The largest template-to-template distance, times the margin
+                   (None if no two templates can be aligned).
+        """
+        distances = []
+        for i, template in enumerate(self.templates):
+            for j, other in enumerate(self.templates):
+                if i != j:
+                    distances.append(self._subsequence_dtw(template, other))
+
+        # Un modello lungo più del doppio di un altro non vi si può allineare
+        distances = [distance for distance in distances if np.isfinite(distance)]
+        if not distances:
+            return None
+        return max(distances) * self.threshold_margin
+
+    def _subsequence_dtw(self, template, features):
+        """
+        Align a template anywhere inside a feature sequence.
+
+        Each template frame advances the phrase by 1 or 2 frames, or by 0
+        frames if the previous step did advance it: two template frames in a
+        row cannot sit on the same phrase frame, so the template cannot
+        collapse onto a single frame and is matched on at least half its
+        length. Each row depends only on the previous one and is computed
+        with vectorized NumPy operations.
+
+        Args:
+            template (numpy.ndarray): Template frames, shape (m, d).
+            features (numpy.ndarray): Phrase frames, shape (n, d).
+
+        Returns:
+            float: The best alignment cost divided by the template length
+                   (inf if the phrase is too short for the template).
+        """
+        cost = np.sqrt(((template[:, None, :] - features[None, :, :]) ** 2).sum(axis=2))
+
+        # Inizio libero: l'allineamento può partire da qualsiasi frame della frase.
+        # advanced: costo arrivando con un passo che avanza nella frase;
+        # held: arrivando sullo stesso frame del passo precedente
+        advanced = cost[0].copy()
+        held = np.full_like(advanced, np.inf)
+        for row in cost[1:]:
+            best = np.minimum(advanced, held)
+            diagonal = np.full_like(best, np.inf)
+            diagonal[1:] = best[:-1]
+            skip = np.full_like(best, np.inf)
+            skip[2:] = best[:-2]
+            held = row + advanced
+            advanced = row + np.minimum(diagonal, skip)
+
+        # Fine libera: il miglior punto di arrivo nella frase
+        return float(np.minimum(advanced, held).min() / len(template))
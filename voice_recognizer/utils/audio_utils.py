@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for audio signal processing with NumPy.
+"""
+
+import wave
+import numpy as np
+
+def pcm_to_float(frame_data, sample_width):
+    """
+    Convert little-endian PCM bytes to a float32 signal in [-1, 1].
+
+    Args:
+        frame_data (bytes): Raw mono PCM samples.
+        sample_width (int): Bytes per sample (1, 2 or 4).
+
+    Returns:
+        numpy.ndarray: The samples as float32.
+    """
+    if sample_width == 1:
+        # I campioni a 8 bit sono senza segno
+        samples = np.frombuffer(frame_data, dtype=np.uint8).astype(np.float32)
+        return (samples - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(frame_data, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_width == 4:
+        return np.frombuffer(frame_data, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise ValueError(f"Dimensione del campione non supportata: {sample_width}")
+
+def float_to_pcm16(samples):
+    """
+    Convert a float signal in [-1, 1] to little-endian 16-bit PCM.
+
+    Args:
+        samples (numpy.ndarray): The float signal.
+
+    Returns:
+        numpy.ndarray: The samples as int16 (values outside [-1, 1] are clipped).
+    """
+    return np.clip(np.round(samples * 32767.0), -32768, 32767).astype("<i2")
+
+def audio_data_to_float(audio):
+    """
+    Convert a speech_recognition AudioData object to a float32 signal.
+
+    Args:
+        audio (AudioData): The audio to convert.
+
+    Returns:
+        tuple: The samples (numpy.ndarray) and the sample rate.
+    """
+    return pcm_to_float(audio.frame_data, audio.sample_width), audio.sample_rate
+
+def read_wav(path):
+    """
+    Read a mono or stereo WAV file as a float32 mono signal.
+
+    Args:
+        path (str): Path of the WAV file.
+
+    Returns:
+        tuple: The samples (numpy.ndarray) and the sample rate.
+    """
+    with wave.open(path, "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        sample_rate = wav_file.getframerate()
+        frame_data = wav_file.readframes(wav_file.getnframes())
+
+    samples = pcm_to_float(frame_data, sample_width)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+def resample(samples, sample_rate, target_rate):
+    """
+    Resample a signal with band-limited (FFT) interpolation.
+
+    Frequencies above the new Nyquist limit are discarded, so downsampling
+    does not alias.
+
+    Args:
+        samples (numpy.ndarray): The float signal.
+        sample_rate (int): Sample rate of the signal.
+        target_rate (int): Sample rate of the result.
+
+    Returns:
+        numpy.ndarray: The resampled signal as float32.
+    """
+    if sample_rate == target_rate or len(samples) == 0:
+        return samples.astype(np.float32)
+
+    target_length = int(round(len(samples) * target_rate / float(sample_rate)))
+    spectrum = np.fft.rfft(samples)
+    resampled = np.fft.irfft(spectrum[:target_length // 2 + 1], n=target_length)
+    return (resampled * (target_length / float(len(samples)))).astype(np.float32)
+
+def frame_signal(samples, frame_length, hop_length):
+    """
+    Split a signal into overlapping frames without copying.
+
+    Args:
+        samples (numpy.ndarray): The signal.
+        frame_length (int): Samples per frame.
+        hop_length (int): Samples between the starts of consecutive frames.
+
+    Returns:
+        numpy.ndarray: Array of shape (frames, frame_length); empty if the
+                       signal is shorter than one frame.
+    """
+    if len(samples) < frame_length:
+        return np.zeros((0, frame_length), dtype=samples.dtype)
+
+    frame_count = 1 + (len(samples) - frame_length) // hop_length
+    return np.lib.stride_tricks.as_strided(
+        samples,
+        shape=(frame_count, frame_length),
+        strides=(samples.strides[0] * hop_length, samples.strides[0]),
+        writeable=False
+    )
+
+def mel_filterbank(sample_rate, fft_size, mel_bands, low_hz=20.0, high_hz=None):
+    """
+    Build a triangular mel filterbank.
+
+    Args:
+        sample_rate (int): Sample rate of the signal.
+        fft_size (int): FFT size.
+        mel_bands (int): Number of mel bands.
+        low_hz (float): Lowest band edge in Hz.
+        high_hz (float, optional): Highest band edge in Hz (default: Nyquist).
+
+    Returns:
+        numpy.ndarray: Matrix of shape (mel_bands, fft_size // 2 + 1).
+    """
+    high_hz = high_hz or sample_rate / 2.0
+    low_mel = 2595.0 * np.log10(1.0 + low_hz / 700.0)
+    high_mel = 2595.0 * np.log10(1.0 + high_hz / 700.0)
+    mel_points = np.linspace(low_mel, high_mel, mel_bands + 2)
+    hz_points = 700.0 * (10.0 ** (mel_points / 2595.0) - 1.0)
+    bins = np.floor((fft_size + 1) * hz_points / sample_rate).astype(int)
+
+    filterbank = np.zeros((mel_bands, fft_size // 2 + 1), dtype=np.float32)
+    for band in range(mel_bands):
+        left, center, right = bins[band], bins[band + 1], bins[band + 2]
+        if center > left:
+            filterbank[band, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filterbank[band, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filterbank
+
+def mfcc(samples, sample_rate, coefficients=13, mel_bands=26, frame_ms=25, hop_ms=10,
+         mean_normalize=False):
+    """
+    Compute the MFCC features of a signal.
+
+    Args:
+        samples (numpy.ndarray): The float signal.
+        sample_rate (int): Sample rate of the signal.
+        coefficients (int): Number of cepstral coefficients per frame.
+        mel_bands (int): Number of mel bands.
+        frame_ms (int): Frame length in milliseconds.
+        hop_ms (int): Hop length in milliseconds.
+        mean_normalize (bool): Subtract the mean of each coefficient over the
+                               whole signal (cepstral mean normalization).
+
+    Returns:
+        numpy.ndarray: Array of shape (frames, coefficients).
+    """
+    frame_length = int(sample_rate * frame_ms / 1000)
+    hop_length = int(sample_rate * hop_ms / 1000)
+    fft_size = 1 << (frame_length - 1).bit_length()
+
+    # Pre-enfasi per bilanciare lo spettro
+    emphasized = np.append(samples[:1], samples[1:] - 0.97 * samples[:-1]).astype(np.float32)
+    frames = frame_signal(emphasized, frame_length, hop_length)
+    if len(frames) == 0:
+        return np.zeros((0, coefficients), dtype=np.float32)
+
+    window = np.hamming(frame_length).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames * window, n=fft_size)) ** 2 / fft_size
+    # Banda limitata a 8 kHz: feature confrontabili tra frequenze di campionamento diverse
+    filterbank = mel_filterbank(sample_rate, fft_size, mel_bands, high_hz=min(sample_rate / 2.0, 8000.0))
+    mel_energy = power @ filterbank.T
+    log_mel = np.log(np.maximum(mel_energy, 1e-10))
+
+    # DCT-II come prodotto matriciale
+    n = np.arange(mel_bands)
+    dct = np.cos(np.pi / mel_bands * (n + 0.5) * np.arange(coefficients)[:, None])
+    features = (log_mel @ dct.T).astype(np.float32)
+
+    # Normalizzazione della media cepstrale: rende le feature robuste al microfono
+    if mean_normalize:
+        features -= features.mean(axis=0)
+    return features
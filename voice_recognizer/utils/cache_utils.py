@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for in-memory and on-disk caching.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from voice_recognizer.utils.logging_utils import print_error
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache with least-recently-used eviction.
+    """
+
+    def __init__(self, max_entries=128):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get a value and mark it as most recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            The cached value, or None if the key is not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entries if needed.
+
+        Args:
+            key (str): The cache key.
+            value: The value to store.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def remove(self, key):
+        """
+        Remove an entry if present.
+
+        Args:
+            key (str): The cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Entries, hits, misses and evictions.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+class DiskCache:
+    """
+    Thread-safe on-disk byte store with a total size cap.
+
+    Entries are evicted least recently used first; file modification times
+    record the last access so the order survives restarts.
+    """
+
+    def __init__(self, directory, max_bytes, suffix=".bin"):
+        """
+        Initialize the cache, indexing the files already on disk.
+
+        Args:
+            directory (str): Directory where the entries are stored.
+            max_bytes (int): Maximum total size of the stored entries.
+            suffix (str): File name suffix of the entries.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # Indice chiave -> dimensione, ordinato dal meno al più recente
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        self._load_index()
+
+    def _load_index(self):
+        """
+        Build the index from the entries already in the cache directory.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(self.suffix):
+                    continue
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, name[:-len(self.suffix)], stat.st_size))
+        except OSError as e:
+            print_error(f"Impossibile leggere la cache su disco {self.directory}: {e}")
+            return
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        """
+        Get the file path of an entry.
+
+        Args:
+            key (str): The cache key (must be a valid file name).
+
+        Returns:
+            str: The path of the entry.
+        """
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """
+        Read an entry and mark it as most recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            bytes: The cached data, or None if the key is not cached.
+        """
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                # Il file è stato rimosso dall'esterno
+                self._total_bytes -= self._index.pop(key)
+                self.misses += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """
+        Store an entry, evicting the least recently used ones to stay under the cap.
+
+        Args:
+            key (str): The cache key.
+            data (bytes): The data to store.
+        """
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            path = self._path(key)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                # Scrittura atomica: un crash non lascia voci troncate
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print_error(f"Impossibile scrivere nella cache su disco: {e}")
+                return
+
+            self._total_bytes += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+
+            while self._total_bytes > self.max_bytes and self._index:
+                old_key, size = self._index.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Entries, size, hits, misses and evictions.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for in-process FLAC encoding with NumPy.
+"""
+
+import numpy as np
+import speech_recognition as sr
+from voice_recognizer.utils.audio_utils import pcm_to_float, float_to_pcm16, resample
+
+# Polinomi CRC definiti dalla specifica FLAC
+CRC8_POLYNOMIAL = 0x07
+CRC16_POLYNOMIAL = 0x8005
+
+# Parametro di Rice massimo con la codifica a 4 bit (15 è riservato all'escape)
+MAX_RICE_PARAMETER = 14
+
+# Byte per riga nel calcolo vettoriale del CRC-16
+CRC16_ROW_BYTES = 256
+
+def _crc8_table():
+    """
+    Build the byte-wise CRC-8 lookup table.
+
+    Returns:
+        list: CRC-8 of each single-byte message.
+    """
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ CRC8_POLYNOMIAL) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return table
+
+def _crc16_tables():
+    """
+    Build the CRC-16 contribution of every byte value at every position in a row.
+
+    Returns:
+        numpy.ndarray: Table [d, b]: CRC-16 of byte b followed by d zero bytes.
+    """
+    single = np.zeros(256, dtype=np.int64)
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ CRC16_POLYNOMIAL) & 0xFFFF if crc & 0x8000 else (crc << 1) & 0xFFFF
+        single[byte] = crc
+
+    # Ogni byte nullo in coda moltiplica il contributo per x^8 modulo il polinomio
+    table = np.zeros((CRC16_ROW_BYTES, 256), dtype=np.uint16)
+    table[0] = single
+    for distance in range(1, CRC16_ROW_BYTES):
+        previous = table[distance - 1]
+        table[distance] = ((previous << 8) & 0xFFFF) ^ single[previous >> 8]
+    return table
+
+CRC8_TABLE = _crc8_table()
+CRC16_TABLE = _crc16_tables()
+
+class FlacEncoder:
+    """
+    Encodes mono 16-bit PCM into a FLAC stream without external processes.
+
+    Each block is coded with the fixed linear predictor (order 0-4) of
+    smallest residuals and a single Rice partition. All blocks are handled
+    at once as rows of a 2-D array: every frame becomes a row of (value,
+    width) fields, the rows are packed into bytes in one vectorized pass
+    and the CRC-16 of each frame is computed a row of bytes at a time from
+    a lookup table.
+    """
+
+    def __init__(self, block_size=4096):
+        """
+        Initialize the encoder.
+
+        Args:
+            block_size (int): Samples per FLAC frame (16-65535).
+        """
+        self.block_size = block_size
+
+    def encode(self, samples, sample_rate):
+        """
+        Encode 16-bit samples into a complete FLAC stream.
+
+        Args:
+            samples (numpy.ndarray): Mono int16 samples.
+            sample_rate (int): Sample rate of the samples.
+
+        Returns:
+            bytes: The FLAC stream.
+        """
+        samples = np.asarray(samples, dtype=np.int32)
+        stream = b"fLaC" + self._streaminfo(len(samples), sample_rate)
+        if len(samples) == 0:
+            return stream
+
+        # Una riga per frame; l'ultima è completata con zeri esclusi da valid
+        block_size = self.block_size
+        frame_count = -(-len(samples) // block_size)
+        lengths = np.minimum(block_size, len(samples) - block_size * np.arange(frame_count))
+        grid = np.zeros(frame_count * block_size, dtype=np.int32)
+        grid[:len(samples)] = samples
+        grid = grid.reshape(frame_count, block_size)
+        valid = np.arange(block_size) < lengths[:, None]
+
+        values, widths = self._encode_subframes(grid, valid, lengths)
+
+        # Header di ogni frame come campi da 8 bit, in testa alla sua riga
+        headers = [self._frame_header(int(length), number) for number, length in enumerate(lengths)]
+        header_values = np.zeros((frame_count, max(len(header) for header in headers)), dtype=np.int32)
+        header_widths = np.zeros_like(header_values)
+        for row, header in enumerate(headers):
+            header_values[row, :len(header)] = list(header)
+            header_widths[row, :len(header)] = 8
+
+        # Allineamento al byte e segnaposto del CRC-16 in coda
+        frame_bits = header_widths.sum(axis=1, dtype=np.int64) + widths.sum(axis=1, dtype=np.int64)
+        footer_widths = np.stack(((-frame_bits) % 8, np.full(frame_count, 16)), axis=1).astype(np.int32)
+
+        frames = self._pack(
+            np.concatenate((header_values, values, np.zeros_like(footer_widths)), axis=1).ravel(),
+            np.concatenate((header_widths, widths, footer_widths), axis=1).ravel()
+        )
+
+        frame_ends = np.cumsum((frame_bits + footer_widths[:, 0] + 16) // 8).tolist()
+        frame_starts = [0] + frame_ends[:-1]
+        crcs = self._crc16([frames[start:end - 2] for start, end in zip(frame_starts, frame_ends)])
+
+        output = bytearray(stream)
+        for start, end, crc in zip(frame_starts, frame_ends, crcs):
+            output += frames[start:end - 2]
+            output += crc.to_bytes(2, "big")
+        return bytes(output)
+
+    def _streaminfo(self, total_samples, sample_rate):
+        """
+        Build the STREAMINFO metadata block (marked as the last block).
+
+        Args:
+            total_samples (int): Number of samples in the stream.
+            sample_rate (int): Sample rate of the stream.
+
+        Returns:
+            bytes: The metadata block header and body.
+        """
+        block_size = min(self.block_size, max(total_samples, 16))
+        header = bytes([0x80, 0, 0, 34])
+
+        body = block_size.to_bytes(2, "big") * 2  # Dimensione minima e massima del blocco
+        body += bytes(6)  # Dimensione minima e massima del frame: sconosciute
+
+        # 20 bit frequenza, 3 bit canali-1, 5 bit bit per campione-1, 36 bit campioni totali
+        packed = (sample_rate << 44) | (0 << 41) | (15 << 36) | (total_samples & 0xFFFFFFFFF)
+        body += packed.to_bytes(8, "big")
+        body += bytes(16)  # MD5 non calcolato
+
+        return header + body
+
+    def _frame_header(self, length, frame_number):
+        """
+        Build the header of a frame.
+
+        Args:
+            length (int): Number of samples in the frame.
+            frame_number (int): Index of the frame in the stream.
+
+        Returns:
+            bytearray: The header, including its CRC-8.
+        """
+        header = bytearray([0xFF, 0xF8])
+        header.append(0x70)  # Dimensione del blocco a 16 bit in coda, frequenza da STREAMINFO
+        header.append(0x08)  # Mono, 16 bit per campione
+        header += self._utf8_number(frame_number)
+        header += (length - 1).to_bytes(2, "big")
+        header.append(self._crc8(header))
+        return header
+
+    def _encode_subframes(self, grid, valid, lengths):
+        """
+        Encode every block with the fixed predictor of smallest residuals.
+
+        Args:
+            grid (numpy.ndarray): Samples, one block per row (int32).
+            valid (numpy.ndarray): Mask of the samples that belong to each block.
+            lengths (numpy.ndarray): Number of samples of each block.
+
+        Returns:
+            tuple: Arrays of field values and of field widths in bits, one
+                   row per block (fields of width zero are padding).
+        """
+        frame_count, block_size = grid.shape
+        last_length = int(lengths[-1])
+
+        # Come libFLAC, l'ordine si sceglie dalla somma dei residui in valore assoluto,
+        # sugli stessi campioni per tutti gli ordini (l'ultimo blocco può essere incompleto)
+        residuals = [grid]
+        for _ in range(4):
+            residuals.append(np.diff(residuals[-1], axis=1))
+        magnitudes = np.empty((5, frame_count), dtype=np.int64)
+        for order, residual in enumerate(residuals):
+            magnitudes[order] = np.abs(residual[:, 4 - order:]).sum(axis=1, dtype=np.int64)
+            magnitudes[order, -1] = np.abs(residual[-1, 4 - order:last_length - order]).sum(dtype=np.int64)
+        orders = magnitudes.argmin(axis=0)
+
+        # Residuo dell'ordine scelto, allineato al campione che predice
+        residual = grid.copy()
+        for order in range(1, 5):
+            chosen = orders == order
+            residual[chosen, order:] = residuals[order][chosen]
+        folded = (residual << 1) ^ (residual >> 31)  # Zigzag: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ...
+        coded = valid & (np.arange(block_size, dtype=np.int32) >= orders[:, None])
+
+        parameters, rice_bits = self._rice_parameters(folded, coded)
+        fixed_bits = 8 + 16 * orders + 10 + rice_bits
+
+        # Blocchi costanti (silenzio digitale) e blocchi che la predizione non accorcia
+        constant = np.all((grid == grid[:, :1]) | ~valid, axis=1)
+        verbatim = ~constant & (fixed_bits >= 8 + 16 * lengths)
+        fixed = ~constant & ~verbatim
+
+        # Campi dei campioni: warm-up e blocchi verbatim a 16 bit, residui in codice di Rice
+        # (q zeri, un uno e i bit meno significativi: solo gli ultimi p+1 bit sono non nulli).
+        # La scelta per elemento usa maschere moltiplicative: np.where è lento su maschere irregolari
+        rice = coded & fixed[:, None]
+        row_parameters = parameters[:, None]
+        low_mask = (1 << row_parameters) - 1
+        verbatim_values = grid & 0xFFFF
+        sample_values = verbatim_values + (((low_mask + 1) | (folded & low_mask)) - verbatim_values) * rice
+        verbatim_widths = valid * np.int32(16)
+        sample_widths = verbatim_widths + ((folded >> row_parameters) + 1 + row_parameters - verbatim_widths) * rice
+        sample_widths[constant, 1:] = 0
+
+        # Header del subframe in testa; l'header di Rice (metodo a 4 bit, partizione
+        # unica, parametro) va dopo il warm-up, quindi solo le prime colonne dipendono dall'ordine
+        values = np.empty((frame_count, block_size + 2), dtype=np.int32)
+        widths = np.empty_like(values)
+        values[:, 0] = np.select([constant, verbatim], [0b00000000, 0b00000010], 0b00010000 | (orders << 1))
+        widths[:, 0] = 8
+        values[:, 6:] = sample_values[:, 4:]
+        widths[:, 6:] = sample_widths[:, 4:]
+
+        # Nei blocchi non predetti la colonna dell'header segue i primi quattro campioni ed è larga zero
+        columns = np.arange(5)
+        insert_at = np.where(fixed, orders, 4)[:, None]
+        source = np.minimum(columns - (columns > insert_at), 3)
+        head_values = np.take_along_axis(sample_values, source, axis=1)
+        head_widths = np.take_along_axis(sample_widths, source, axis=1)
+        is_header = columns == insert_at
+        values[:, 1:6] = np.where(is_header, (parameters * fixed)[:, None], head_values)
+        widths[:, 1:6] = np.where(is_header, (10 * fixed)[:, None], head_widths)
+        return values, widths
+
+    def _rice_parameters(self, folded, coded):
+        """
+        Choose the Rice parameter of each block from the mean of its residuals.
+
+        As in libFLAC the parameter is estimated rather than searched: the
+        integer part of log2 of the mean is the optimum, or within one of
+        it, for the residuals of audio. Only its cost is measured exactly.
+
+        Args:
+            folded (numpy.ndarray): Zigzag-folded residuals, one block per row.
+            coded (numpy.ndarray): Mask of the residuals that are Rice-coded.
+
+        Returns:
+            tuple: Arrays of the parameters and of the bits they produce.
+        """
+        counts = coded.sum(axis=1)
+        folded = folded * coded
+        means = folded.sum(axis=1, dtype=np.int64) / np.maximum(counts, 1)
+        parameters = np.clip(np.floor(np.log2(np.maximum(means, 1))), 0, MAX_RICE_PARAMETER).astype(np.int32)
+        bits = (folded >> parameters[:, None]).sum(axis=1, dtype=np.int64) + counts * (parameters + 1)
+        return parameters, bits
+
+    def _pack(self, values, widths):
+        """
+        Pack fields into bytes, most significant bit first.
+
+        Every value is right-aligned in its field and fits in 32 bits, so
+        it spans at most two 32-bit words. The fields never overlap, so the
+        parts falling in each word can be summed instead of OR-ed, which
+        bincount does in one pass per word lane (exactly, in float64).
+
+        Args:
+            values (numpy.ndarray): Field values.
+            widths (numpy.ndarray): Field widths in bits.
+
+        Returns:
+            bytes: The packed fields, zero-padded to a whole byte.
+        """
+        ends = np.cumsum(widths, dtype=np.int64)
+        size = (int(ends[-1]) + 7) // 8 if len(ends) else 0
+        words = (size + 3) // 4
+
+        # Il bit meno significativo di ogni valore cade nel bit ends-1
+        last_words = (ends - 1) >> 5
+        shifted = values.astype(np.int64) << ((-ends) & 31)
+
+        # Una parola di margine davanti per i valori che iniziano nella prima
+        packed = np.bincount(last_words + 1, weights=(shifted & 0xFFFFFFFF).astype(np.float64), minlength=words + 1)
+        packed += np.bincount(last_words, weights=(shifted >> 32).astype(np.float64), minlength=words + 1)
+        return packed[1:].astype(">u4").tobytes()[:size]
+
+    def _utf8_number(self, number):
+        """
+        Encode a frame number with the UTF-8-like scheme used by FLAC.
+
+        Args:
+            number (int): The frame number.
+
+        Returns:
+            bytes: The coded number.
+        """
+        if number < 0x80:
+            return bytes([number])
+
+        # Numero di byte di continuazione necessari
+        continuation = 1
+        while number >= 1 << (6 * continuation + 6 - continuation):
+            continuation += 1
+
+        coded = []
+        for _ in range(continuation):
+            coded.append(0x80 | (number & 0x3F))
+            number >>= 6
+        lead_mask = (0xFF << (7 - continuation)) & 0xFF
+        coded.append(lead_mask | number)
+        return bytes(reversed(coded))
+
+    def _crc8(self, data):
+        """
+        Compute the CRC-8 of the frame header.
+
+        Args:
+            data (bytes): The header bytes.
+
+        Returns:
+            int: The CRC value.
+        """
+        crc = 0
+        for byte in data:
+            crc = CRC8_TABLE[crc ^ byte]
+        return crc
+
+    def _crc16(self, frames):
+        """
+        Compute the CRC-16 of several frames.
+
+        The CRC is linear, so the CRC of a row of bytes is the XOR of the
+        contributions of its bytes, each depending only on the byte and its
+        distance from the end of the row; the rows of a frame are then
+        chained by shifting the running CRC past a whole row.
+
+        Args:
+            frames (list): The bytes of each frame.
+
+        Returns:
+            list: The CRC of each frame.
+        """
+        # Byte nulli in testa non cambiano il CRC (valore iniziale zero)
+        padded = [bytes(-len(frame) % CRC16_ROW_BYTES) + frame for frame in frames]
+        rows = np.frombuffer(b"".join(padded), dtype=np.uint8).reshape(-1, CRC16_ROW_BYTES)
+
+        # Indice nella tabella appiattita: distanza dalla fine della riga * 256 + byte
+        offsets = np.arange(CRC16_ROW_BYTES - 1, -1, -1) * 256
+        row_crcs = np.bitwise_xor.reduce(CRC16_TABLE.ravel()[offsets + rows], axis=1).tolist()
+
+        # Spostare il CRC di una riga: il byte alto finisce a distanza n-1, quello basso a n-2
+        high, low = CRC16_TABLE[CRC16_ROW_BYTES - 1].tolist(), CRC16_TABLE[CRC16_ROW_BYTES - 2].tolist()
+        crcs, row = [], 0
+        for frame in padded:
+            crc = 0
+            for row_crc in row_crcs[row:row + len(frame) // CRC16_ROW_BYTES]:
+                crc = high[crc >> 8] ^ low[crc & 0xFF] ^ row_crc
+            crcs.append(crc)
+            row += len(frame) // CRC16_ROW_BYTES
+        return crcs
+
+class FlacAudioData(sr.AudioData):
+    """
+    AudioData whose FLAC conversion is done in-process by a FlacEncoder.
+
+    The audio is downsampled to the target rate when created, so the
+    recognizer sends smaller requests and never spawns the flac binary.
+    """
+
+    def __init__(self, audio, encoder, target_rate=16000):
+        """
+        Convert captured audio to mono 16-bit PCM at the target rate.
+
+        Args:
+            audio (AudioData): The captured audio.
+            encoder (FlacEncoder): The encoder to use (reused between utterances).
+            target_rate (int): Sample rate sent to the recognizer.
+        """
+        samples = pcm_to_float(audio.frame_data, audio.sample_width)
+        sample_rate = audio.sample_rate
+        if sample_rate > target_rate:
+            samples = resample(samples, sample_rate, target_rate)
+            sample_rate = target_rate
+
+        pcm = float_to_pcm16(samples)
+        super().__init__(pcm.tobytes(), sample_rate, 2)
+        self._samples = pcm
+        self._encoder = encoder
+
+    def get_flac_data(self, convert_rate=None, convert_width=None):
+        """
+        Get the audio as FLAC, encoded in-process.
+
+        Args:
+            convert_rate (int, optional): Sample rate to convert to, if any.
+            convert_width (int, optional): Sample width; only 16-bit output is produced.
+
+        Returns:
+            bytes: The FLAC stream.
+        """
+        samples, sample_rate = self._samples, self.sample_rate
+        if convert_rate is not None and convert_rate != sample_rate:
+            converted = resample(samples.astype(np.float32) / 32768.0, sample_rate, convert_rate)
+            samples = float_to_pcm16(converted)
+            sample_rate = convert_rate
+        return self._encoder.encode(samples, sample_rate)
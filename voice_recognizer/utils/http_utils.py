@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for HTTP requests with pooled connections, retries and a circuit breaker.
+"""
+
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from voice_recognizer.utils.logging_utils import print_info
+
+# Stati HTTP per cui la richiesta viene ripetuta
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Connessioni aperte da ogni thread: una richiesta conta solo le proprie, non quelle concorrenti
+_opened = threading.local()
+
+def _connections_opened():
+    """
+    Count the connections opened so far by the calling thread.
+
+    Returns:
+        int: Number of connect() calls made by this thread.
+    """
+    return getattr(_opened, "count", 0)
+
+def _counting_connection(connection_cls):
+    """
+    Subclass a urllib3 connection class to count its handshakes per thread.
+
+    urllib3 opens the socket in the thread that sends the request, so the
+    count tells each request whether it had to open a connection, even when
+    other requests of the same pool open theirs at the same time.
+
+    Args:
+        connection_cls (type): The connection class of a urllib3 pool.
+
+    Returns:
+        type: The counting subclass.
+    """
+    class CountingConnection(connection_cls):
+        def connect(self):
+            _opened.count = _connections_opened() + 1
+            return super().connect()
+
+    CountingConnection.__name__ = connection_cls.__name__
+    return CountingConnection
+
+class _CountingAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose pools count the connections opened by each thread.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool_cls.__name__, (pool_cls,), {"ConnectionCls": _counting_connection(pool_cls.ConnectionCls)})
+            for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised without contacting the server while the circuit breaker is open.
+    """
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated failures, instead of waiting for every timeout.
+
+    After failure_threshold consecutive failures the circuit opens and
+    requests are refused; after reset_timeout seconds one trial request
+    is let through (half-open): its success closes the circuit, its
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds before a trial request is allowed.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """
+        Check if a request may be sent.
+
+        Returns:
+            bool: False while the circuit is open.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Una sola richiesta di prova alla volta
+                self.state = "half-open"
+                return True
+            return False
+
+    def record_success(self):
+        """
+        Record a successful request: the circuit closes.
+        """
+        with self._lock:
+            self._failures = 0
+            self.state = "closed"
+
+    def record_failure(self):
+        """
+        Record a failed request, opening the circuit if needed.
+        """
+        with self._lock:
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+class HTTPClient:
+    """
+    Keep-alive HTTP client shared by the requests of a service.
+
+    Connections are pooled and reused between requests; transient failures
+    (connection errors, timeouts, 429 and 5xx) are retried a bounded number
+    of times with jittered exponential backoff, and a circuit breaker stops
+    sending requests while the server keeps failing.
+    """
+
+    def __init__(self, settings, name="HTTP"):
+        """
+        Initialize the client.
+
+        Args:
+            settings (dict): Timeouts, retry, pool and breaker settings (see GEMINI_API_SETTINGS).
+            name (str): Name used in the log messages.
+        """
+        self.name = name
+        self.connect_timeout = settings["connect_timeout"]
+        self.read_timeout = settings["timeout"]
+        self.max_retries = settings["max_retries"]
+        self.backoff_base = settings["backoff_base"]
+        self.backoff_max = settings["backoff_max"]
+        self.log_connections = settings["log_connections"]
+        self.breaker = CircuitBreaker(settings["circuit_failure_threshold"], settings["circuit_reset_timeout"])
+
+        # Nessun retry di urllib3: i tentativi sono gestiti qui, con il backoff
+        self._adapter = _CountingAdapter(pool_connections=2, pool_maxsize=settings["pool_size"], max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "new_connections": 0, "reused_connections": 0, "failures": 0}
+
+    def warm_up(self, url):
+        """
+        Open a connection to the server in the background, so the first request skips the handshake.
+
+        Args:
+            url (str): Any URL of the server; the response is discarded.
+        """
+        def _warm_up():
+            try:
+                # La risposta viene letta per intero, così la connessione torna nel pool
+                self.session.head(url, timeout=(self.connect_timeout, self.read_timeout)).close()
+            except requests.exceptions.RequestException:
+                pass  # Il primo turno aprirà la connessione
+
+        warm_up_thread = threading.Thread(target=_warm_up)
+        warm_up_thread.daemon = True
+        warm_up_thread.start()
+
+    def post(self, url, should_abort=None, **kwargs):
+        """
+        Send a POST request, retrying transient failures.
+
+        Args:
+            url (str): The URL.
+            should_abort (callable, optional): Checked before each retry; if it
+                                               returns True, the last outcome is returned.
+            **kwargs: Other arguments for requests (data, headers, stream...).
+
+        Returns:
+            requests.Response: The final response (possibly an error status).
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            requests.exceptions.RequestException: If the last attempt failed.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"{self.name}: servizio non raggiungibile, nuovo tentativo fra poco")
+
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        attempt = 0
+        while True:
+            new_connections = _connections_opened()
+            try:
+                response = self.session.post(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries or (should_abort and should_abort()):
+                    self._finish(False)
+                    raise
+                self._backoff(attempt, None)
+                attempt += 1
+                continue
+            except requests.exceptions.RequestException:
+                # Errori non transitori (SSL, redirect...): niente retry, ma il
+                # fallimento va registrato, o la prova half-open resterebbe occupata
+                self._finish(False)
+                raise
+
+            self._log_connection(_connections_opened() > new_connections)
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries \
+                    and not (should_abort and should_abort()):
+                delay = self._retry_after(response)
+                if delay is None or delay <= self.backoff_max:
+                    response.close()
+                    self._backoff(attempt, delay)
+                    attempt += 1
+                    continue
+
+            self._finish(response.status_code not in RETRY_STATUSES)
+            return response
+
+    def stats(self):
+        """
+        Get the request and connection counters.
+
+        Returns:
+            dict: Requests, retries, new and reused connections, failures and breaker state.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["circuit"] = self.breaker.state
+        return stats
+
+    def close(self):
+        """
+        Close the pooled connections.
+        """
+        self.session.close()
+
+    def _log_connection(self, new_connection):
+        """
+        Count a request and log whether its connection was reused.
+
+        Args:
+            new_connection (bool): True if a new connection was opened.
+        """
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["new_connections" if new_connection else "reused_connections"] += 1
+            requests_count = self._stats["requests"]
+            reused = self._stats["reused_connections"]
+
+        if self.log_connections:
+            state = "nuova connessione" if new_connection else "connessione riusata"
+            print_info(f"\n{self.name}: {state} ({reused}/{requests_count} richieste su connessioni riusate)")
+
+    def _backoff(self, attempt, delay):
+        """
+        Wait before a retry.
+
+        Args:
+            attempt (int): Number of the failed attempt (0 for the first).
+            delay (float): Delay requested by the server, if any.
+        """
+        with self._stats_lock:
+            self._stats["retries"] += 1
+
+        if delay is None:
+            # Backoff esponenziale con jitter pieno
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        time.sleep(delay)
+
+    def _retry_after(self, response):
+        """
+        Read the Retry-After header of a response.
+
+        Args:
+            response (requests.Response): The response.
+
+        Returns:
+            float: The delay in seconds, or None if absent or not numeric.
+        """
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return None
+
+    def _finish(self, success):
+        """
+        Record the final outcome of a request in the circuit breaker.
+
+        Args:
+            success (bool): True if the server answered without a transient error.
+        """
+        if success:
+            self.breaker.record_success()
+            return
+
+        with self._stats_lock:
+            self._stats["failures"] += 1
+        self.breaker.record_failure()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for importing heavy modules lazily and measuring the startup time.
+"""
+
+import importlib
+import subprocess
+import sys
+import threading
+from voice_recognizer.utils.logging_utils import print_error
+
+class LazyModule:
+    """
+    Placeholder for a module that is imported on first attribute access.
+
+    Assigned at module level in place of a regular import, it keeps heavy
+    dependencies (pygame, gTTS...) off the startup path: the import happens
+    the first time an attribute is used, or earlier in the background with
+    preload().
+    """
+
+    def __init__(self, name):
+        """
+        Initialize the placeholder.
+
+        Args:
+            name (str): Full name of the module, e.g. "pygame".
+        """
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        Import the module, if not imported yet.
+
+        Returns:
+            module: The imported module.
+        """
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+                module = self._module
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+def preload(*modules):
+    """
+    Import lazy modules in a background thread, while startup goes on.
+
+    Args:
+        *modules (LazyModule): The modules to import.
+
+    Returns:
+        threading.Thread: The daemon thread importing the modules.
+    """
+    def _preload():
+        for module in modules:
+            try:
+                module.load()
+            except Exception as e:
+                print_error(f"Impossibile importare {module._name}: {e}")
+
+    preload_thread = threading.Thread(target=_preload)
+    preload_thread.daemon = True
+    preload_thread.start()
+    return preload_thread
+
+def parse_import_times(output):
+    """
+    Parse the report printed by "python -X importtime".
+
+    Args:
+        output (str): The standard error of the interpreter.
+
+    Returns:
+        list: (module, self microseconds, cumulative microseconds, depth) tuples, in import order.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Riga di intestazione
+
+        # Il nome è indentato di due spazi per ogni livello di annidamento
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return imports
+
+def measure_import_times(module="voice_recognizer.main"):
+    """
+    Import a module in a fresh interpreter and collect the time of every import.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        list: As parse_import_times(), or None if the interpreter failed.
+    """
+    try:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, timeout=120
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print_error(f"Impossibile misurare i tempi di import: {e}")
+        return None
+
+    if result.returncode != 0:
+        errors = result.stderr.strip().splitlines()
+        print_error(f"Import di {module} fallito: {errors[-1] if errors else result.returncode}")
+        return None
+    return parse_import_times(result.stderr)
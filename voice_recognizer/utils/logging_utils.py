@@ -77,6 +77,18 @@ def print_api_response(text):
     if text:
         print(f"\nRisposta API: {text}")
 
+def print_api_response_fragment(text, first=False):
+    """
+    Print a fragment of a streamed API response on the same line.
+
+    Args:
+        text (str): The response fragment.
+        first (bool): True for the first fragment of the response.
+    """
+    if first:
+        print("\nRisposta API: ", end="")
+    print(text, end="", flush=True)
+
 def print_welcome():
     """
     Print the welcome message at application startup.
@@ -97,6 +109,15 @@ def print_calibration_complete():
     """
     print("Calibration complete. Start speaking!")
     
+def print_calibration_loaded(device_name):
+    """
+    Print the message shown when a saved calibration profile replaces calibration.
+    
+    Args:
+        device_name (str): Name of the microphone.
+    """
+    print(f"\nCalibration profile loaded for '{device_name}'. Start speaking!")
+    
 def print_exit():
     """
     Print the exit message.
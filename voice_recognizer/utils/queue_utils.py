@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for queues shared between worker threads.
+"""
+
+import threading
+from collections import deque
+from voice_recognizer.utils.logging_utils import print_error
+
+class ReorderBuffer:
+    """
+    Restores the original order of results produced out of order by a worker pool.
+
+    Every item carries the sequence number it was given at submission time;
+    items are delivered strictly in sequence order, one at a time, as soon as
+    all the previous ones have arrived. With a gap timeout, an item that never
+    arrives (e.g. a recognition request that hangs) stops holding back the
+    later ones after gap_timeout seconds; if it turns up afterwards it is
+    discarded.
+    """
+
+    def __init__(self, deliver, first_sequence=0, gap_timeout=None, scheduler=None):
+        """
+        Initialize the buffer.
+
+        Args:
+            deliver (callable): Called with each item, in sequence order.
+            first_sequence (int): Sequence number of the first expected item.
+            gap_timeout (float, optional): Seconds a missing item may hold back the
+                                           later ones before it is skipped (None: wait forever).
+            scheduler (TimerScheduler, optional): Scheduler of the gap timeout, required with gap_timeout.
+        """
+        if gap_timeout is not None and scheduler is None:
+            raise ValueError("Il timeout dei buchi di sequenza richiede uno scheduler.")
+
+        self.deliver = deliver
+        self.gap_timeout = gap_timeout
+        self.scheduler = scheduler
+        self.skipped_gaps = 0
+        self.late = 0
+        self._next_sequence = first_sequence
+        self._pending = {}
+        self._delivering = False
+        self._gap_task = None
+        self._gap_sequence = None
+        self._lock = threading.Lock()
+
+    def submit(self, sequence, item):
+        """
+        Submit the result for a sequence number.
+
+        Args:
+            sequence (int): The sequence number of the item.
+            item: The result. None only advances the sequence without delivering.
+        """
+        with self._lock:
+            if sequence < self._next_sequence:
+                # Il suo posto è già stato saltato: consegnarlo ora romperebbe l'ordine
+                self.late += 1
+                return
+
+            self._pending[sequence] = item
+
+            # Un solo thread alla volta consegna, così l'ordine è garantito
+            if self._delivering:
+                return
+            self._delivering = True
+
+        self._deliver_ready()
+
+    def skip(self, sequence):
+        """
+        Mark a sequence number as having no result.
+
+        Args:
+            sequence (int): The sequence number to skip.
+        """
+        self.submit(sequence, None)
+
+    def pending_count(self):
+        """
+        Get the number of results waiting for an earlier one.
+
+        Returns:
+            int: Number of results held back.
+        """
+        with self._lock:
+            return len(self._pending)
+
+    def _deliver_ready(self):
+        """
+        Deliver the items whose turn has come; the caller must own the delivery.
+        """
+        while True:
+            with self._lock:
+                if self._next_sequence not in self._pending:
+                    self._delivering = False
+                    self._watch_gap()
+                    return
+
+                item = self._pending.pop(self._next_sequence)
+                self._next_sequence += 1
+
+            if item is None:
+                continue
+
+            try:
+                self.deliver(item)
+            except Exception as e:
+                print_error(f"Errore durante la consegna di un risultato: {e}")
+
+    def _watch_gap(self):
+        """
+        Start the gap timeout if later items wait for a missing one. Must be called with the lock held.
+        """
+        if self.gap_timeout is None or not self._pending or self._gap_sequence == self._next_sequence:
+            return
+
+        self.scheduler.cancel(self._gap_task)
+        self._gap_sequence = self._next_sequence
+        self._gap_task = self.scheduler.schedule(self.gap_timeout, self._skip_gap, self._next_sequence)
+
+    def _skip_gap(self, sequence):
+        """
+        Give up on a missing item and deliver the ones after it (runs on the scheduler thread).
+
+        Args:
+            sequence (int): The sequence number that was missing when the timeout started.
+        """
+        with self._lock:
+            if self._gap_sequence == sequence:
+                self._gap_sequence = None
+            if self._delivering or self._next_sequence != sequence or not self._pending:
+                return
+
+            self._next_sequence = min(self._pending)
+            self.skipped_gaps += 1
+            self._delivering = True
+
+        print_error(f"Risultato {sequence} non arrivato in tempo: consegno i successivi")
+        self._deliver_ready()
+
+class BoundedQueue:
+    """
+    FIFO queue with a size limit and a selectable overflow policy.
+
+    Policies:
+        block: put() waits until a slot is free (backpressure on the producer).
+        drop_oldest: the oldest queued item is discarded to make room.
+        merge: the two oldest queued items are combined into one.
+    """
+
+    POLICIES = ("block", "drop_oldest", "merge")
+
+    def __init__(self, maxsize, policy="block", merge=None, on_discard=None):
+        """
+        Initialize the queue.
+
+        Args:
+            maxsize (int): Maximum number of queued items.
+            policy (str): Overflow policy, one of POLICIES.
+            merge (callable, optional): merge(first, second) returns the combined
+                                        item. Required by the "merge" policy.
+            on_discard (callable, optional): Called, without the lock held, with
+                                             each item dropped or absorbed by a merge.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Politica di coda non valida: {policy}")
+        if policy == "merge" and merge is None:
+            raise ValueError("La politica 'merge' richiede una funzione di unione.")
+
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.merge = merge
+        self.on_discard = on_discard
+
+        self.high_water = 0
+        self.dropped = 0
+        self.merged = 0
+
+        self._items = deque()
+        self._unfinished = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+
+    def put(self, item, force=False):
+        """
+        Add an item, applying the overflow policy if the queue is full.
+
+        Args:
+            item: The item to add.
+            force (bool): If True the item is added even when the queue is
+                          full (used for control messages such as exit signals).
+        """
+        discarded = []
+
+        with self._lock:
+            if not force and len(self._items) >= self.maxsize:
+                if self.policy == "block":
+                    while len(self._items) >= self.maxsize:
+                        self._not_full.wait()
+                elif self.policy == "merge" and len(self._items) >= 2:
+                    first = self._items.popleft()
+                    second = self._items.popleft()
+                    self._items.appendleft(self.merge(first, second))
+                    self._finish(1)
+                    self.merged += 1
+                    discarded.append(second)
+                else:
+                    # drop_oldest, o merge con un solo elemento in coda
+                    discarded.append(self._items.popleft())
+                    self._finish(1)
+                    self.dropped += 1
+
+            self._items.append(item)
+            self._unfinished += 1
+            self.high_water = max(self.high_water, len(self._items))
+            self._not_empty.notify()
+
+        if self.on_discard is not None:
+            for old_item in discarded:
+                self.on_discard(old_item)
+
+    def get(self):
+        """
+        Remove and return the oldest item, waiting until one is available.
+
+        Returns:
+            The oldest item.
+        """
+        with self._lock:
+            while not self._items:
+                self._not_empty.wait()
+
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def task_done(self):
+        """
+        Mark an item returned by get() as processed.
+        """
+        with self._lock:
+            self._finish(1)
+
+    def join(self, timeout=None):
+        """
+        Wait until every queued item has been processed or discarded.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds.
+
+        Returns:
+            bool: True if every item is done, False if the timeout expired.
+        """
+        with self._lock:
+            return self._all_done.wait_for(lambda: not self._unfinished, timeout)
+
+    def qsize(self):
+        """
+        Get the current depth of the queue.
+
+        Returns:
+            int: Number of queued items.
+        """
+        with self._lock:
+            return len(self._items)
+
+    def stats(self):
+        """
+        Get the queue counters.
+
+        Returns:
+            dict: Current depth, high-water mark, dropped and merged items.
+        """
+        with self._lock:
+            return {
+                "depth": len(self._items),
+                "high_water": self.high_water,
+                "dropped": self.dropped,
+                "merged": self.merged,
+            }
+
+    def _finish(self, count):
+        """
+        Decrease the unfinished counter. Must be called with the lock held.
+
+        Args:
+            count (int): Number of items finished.
+        """
+        self._unfinished -= count
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._all_done.notify_all()
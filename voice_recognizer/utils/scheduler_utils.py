@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for scheduling deadlines on a single timer thread.
+"""
+
+import threading
+import time
+from voice_recognizer.utils.logging_utils import print_error
+
+class ScheduledTask:
+    """
+    Handle for a callback scheduled on a TimerScheduler.
+    """
+
+    __slots__ = ("deadline", "sequence", "callback", "args", "index")
+
+    def __init__(self, deadline, sequence, callback, args):
+        """
+        Initialize the task.
+
+        Args:
+            deadline (float): Monotonic time at which the callback runs.
+            sequence (int): Insertion order, used to break ties between deadlines.
+            callback (callable): The function to call.
+            args (tuple): Positional arguments for the callback.
+        """
+        self.deadline = deadline
+        self.sequence = sequence
+        self.callback = callback
+        self.args = args
+
+        # Posizione nello heap, -1 se il task è stato eseguito o annullato
+        self.index = -1
+
+    def is_pending(self):
+        """
+        Check if the task is still waiting to run.
+
+        Returns:
+            bool: True if the task has neither run nor been cancelled.
+        """
+        return self.index >= 0
+
+    def _key(self):
+        return (self.deadline, self.sequence)
+
+class TimerScheduler:
+    """
+    Runs all scheduled callbacks on one daemon thread.
+
+    Tasks are kept in an indexed binary heap, so both schedule and cancel are
+    O(log n) and no thread is created per timer. Delays are measured on the
+    scheduler clock, which runs time_scale times faster than the monotonic
+    clock: a recording replayed at double speed gets its deadlines in
+    recording time.
+    """
+
+    def __init__(self, name="TimerScheduler"):
+        """
+        Initialize the scheduler. The thread starts with the first task.
+
+        Args:
+            name (str): Name of the scheduler thread.
+        """
+        self.name = name
+        self._heap = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+        # Orologio dello scheduler: secondi monotoni moltiplicati per time_scale
+        self.time_scale = 1.0
+        self._real_origin = time.monotonic()
+        self._clock_origin = self._real_origin
+
+    def now(self):
+        """
+        Get the current time on the scheduler clock.
+
+        Returns:
+            float: Seconds, comparable with other readings of this clock only.
+        """
+        return self._clock_origin + (time.monotonic() - self._real_origin) * self.time_scale
+
+    def set_time_scale(self, time_scale):
+        """
+        Change how fast the scheduler clock runs relative to the monotonic clock.
+
+        The clock stays continuous; tasks already scheduled keep their deadline.
+
+        Args:
+            time_scale (float): Clock seconds per real second (greater than zero).
+
+        Raises:
+            ValueError: If time_scale is not positive.
+        """
+        if time_scale <= 0:
+            raise ValueError(f"Scala del tempo non valida: {time_scale}")
+
+        with self._condition:
+            real_now = time.monotonic()
+            self._clock_origin += (real_now - self._real_origin) * self.time_scale
+            self._real_origin = real_now
+            self.time_scale = time_scale
+
+    def schedule(self, delay, callback, *args):
+        """
+        Schedule a callback.
+
+        Args:
+            delay (float): Seconds on the scheduler clock after which the callback runs.
+            callback (callable): The function to call on the scheduler thread.
+            *args: Positional arguments for the callback.
+
+        Returns:
+            ScheduledTask: Handle that can be passed to cancel().
+        """
+        with self._condition:
+            self._sequence += 1
+            task = ScheduledTask(time.monotonic() + max(delay, 0) / self.time_scale, self._sequence, callback, args)
+            task.index = len(self._heap)
+            self._heap.append(task)
+            self._sift_up(task.index)
+
+            self._ensure_thread()
+
+            # Sveglia il thread solo se il nuovo task è il primo in scadenza
+            if task.index == 0:
+                self._condition.notify()
+
+            return task
+
+    def cancel(self, task):
+        """
+        Cancel a task. Cancelling a task that already ran is a no-op.
+
+        Args:
+            task (ScheduledTask): The task to cancel (None is ignored).
+        """
+        if task is None:
+            return
+
+        with self._condition:
+            if task.is_pending():
+                self._remove(task.index)
+
+    def pending_count(self):
+        """
+        Get the number of tasks waiting to run.
+
+        Returns:
+            int: Number of pending tasks.
+        """
+        with self._condition:
+            return len(self._heap)
+
+    def stop(self):
+        """
+        Stop the scheduler thread, discarding the pending tasks.
+        """
+        with self._condition:
+            self._stopped = True
+            for task in self._heap:
+                task.index = -1
+            self._heap = []
+            self._condition.notify()
+
+    def _ensure_thread(self):
+        """
+        Start the scheduler thread if needed. Must be called with the lock held.
+        """
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(target=self._run, name=self.name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        """
+        Scheduler loop: wait for the earliest deadline and run the due tasks.
+        """
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+
+                    timeout = self._heap[0].deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+
+                if self._stopped:
+                    return
+
+                task = self._heap[0]
+                self._remove(0)
+
+            # La callback gira senza lock: può programmare o annullare altri task
+            try:
+                task.callback(*task.args)
+            except Exception as e:
+                print_error(f"Errore in un task pianificato: {e}")
+
+    def _remove(self, index):
+        """
+        Remove the task at a heap position. Must be called with the lock held.
+
+        Args:
+            index (int): Position of the task in the heap.
+        """
+        task = self._heap[index]
+        last = self._heap.pop()
+        task.index = -1
+
+        if last is not task:
+            last.index = index
+            self._heap[index] = last
+            self._sift_up(index)
+            self._sift_down(last.index)
+
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        heap[i].index = i
+        heap[j].index = j
+
+    def _sift_up(self, index):
+        heap = self._heap
+        while index > 0:
+            parent = (index - 1) // 2
+            if heap[index]._key() >= heap[parent]._key():
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index):
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and heap[child]._key() < heap[smallest]._key():
+                    smallest = child
+            if smallest == index:
+                break
+            self._swap(index, smallest)
+            index = smallest
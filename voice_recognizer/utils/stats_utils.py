@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for streaming statistics.
+"""
+
+class P2Quantile:
+    """
+    Estimates a quantile of a stream in constant memory (P-square algorithm).
+
+    Five markers track the minimum, the maximum, the target quantile and two
+    intermediate quantiles; their heights are adjusted with a piecewise
+    parabolic interpolation as observations arrive, without storing them.
+    """
+
+    def __init__(self, quantile):
+        """
+        Initialize the estimator.
+
+        Args:
+            quantile (float): The quantile to estimate, between 0 and 1.
+        """
+        self.quantile = quantile
+        self.count = 0
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5]
+        self._increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    def add(self, value):
+        """
+        Add an observation.
+
+        Args:
+            value (float): The observation.
+        """
+        self.count += 1
+        heights = self._heights
+
+        # Le prime cinque osservazioni inizializzano i marcatori
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        # Cella in cui cade l'osservazione, estendendo gli estremi se serve
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        for i in range(cell + 1, 5):
+            self._positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Sposta i marcatori centrali verso le posizioni desiderate
+        positions = self._positions
+        for i in range(1, 4):
+            offset = self._desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or \
+               (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, step)
+                heights[i] = height
+                positions[i] += step
+
+    def value(self):
+        """
+        Get the current estimate.
+
+        Returns:
+            float: The estimated quantile, or None if no observation was added.
+        """
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            # Con poche osservazioni si usa direttamente il campione ordinato
+            index = min(len(self._heights) - 1, int(round(self.quantile * (len(self._heights) - 1))))
+            return self._heights[index]
+        return self._heights[2]
+
+    def _parabolic(self, i, step):
+        """
+        Piecewise-parabolic prediction of a marker height.
+
+        Args:
+            i (int): Index of the marker.
+            step (int): +1 or -1.
+
+        Returns:
+            float: The predicted height.
+        """
+        n, q = self._positions, self._heights
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i, step):
+        """
+        Linear prediction of a marker height, used when the parabola overshoots.
+
+        Args:
+            i (int): Index of the marker.
+            step (int): +1 or -1.
+
+        Returns:
+            float: The predicted height.
+        """
+        n, q = self._positions, self._heights
+        return q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for splitting text into sentences and normalizing utterances.
+"""
+
+import re
+import unicodedata
+from voice_recognizer.config.settings import KEYWORD_SETTINGS
+
+# Fine frase: punteggiatura finale seguita da spazio (o fine testo)
+SENTENCE_END_PATTERN = re.compile(r'([.!?;:…]+["\'\)]*)(\s+)')
+
+def split_sentences(text, max_chars=0):
+    """
+    Split a complete text into sentences.
+
+    Args:
+        text (str): The text to split.
+        max_chars (int): If greater than zero, sentences longer than this
+                         are further split at word boundaries.
+
+    Returns:
+        list: List of non-empty sentences.
+    """
+    splitter = SentenceSplitter(max_chars=max_chars)
+    sentences = splitter.feed(text)
+    sentences.extend(splitter.flush())
+    return sentences
+
+def normalize_utterance(text, keyword=None):
+    """
+    Normalize an utterance so that trivial variations compare equal.
+
+    Case, accents and punctuation are folded and the wake word is removed.
+
+    Args:
+        text (str): The utterance.
+        keyword (str, optional): The wake word to strip (default: from KEYWORD_SETTINGS).
+
+    Returns:
+        str: The normalized text.
+    """
+    keyword = keyword if keyword is not None else KEYWORD_SETTINGS["keyword"]
+
+    # Scompone le lettere accentate e rimuove i segni diacritici
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+
+    words = re.findall(r"\w+", folded)
+    if keyword:
+        keyword_words = normalize_utterance(keyword, keyword="").split()
+        words = [word for word in words if word not in keyword_words]
+    return " ".join(words)
+
+class SentenceSplitter:
+    """
+    Incremental sentence splitter for text that arrives in fragments.
+    """
+
+    def __init__(self, max_chars=0):
+        """
+        Initialize the splitter.
+
+        Args:
+            max_chars (int): If greater than zero, sentences longer than this
+                             are emitted in pieces split at word boundaries.
+        """
+        self.max_chars = max_chars
+        self._pending = ""
+
+    def feed(self, fragment):
+        """
+        Add a text fragment and return the sentences it completes.
+
+        Args:
+            fragment (str): New text, e.g. a chunk of a streamed response.
+
+        Returns:
+            list: Sentences completed by this fragment.
+        """
+        if not fragment:
+            return []
+
+        self._pending += fragment
+        sentences = []
+
+        # Taglia il testo pendente a ogni fine frase completa
+        start = 0
+        for match in SENTENCE_END_PATTERN.finditer(self._pending):
+            sentences.extend(self._limit(self._pending[start:match.end(1)]))
+            start = match.end()
+        self._pending = self._pending[start:]
+
+        # Una frase troppo lunga senza punteggiatura non deve bloccare l'uscita
+        while self.max_chars > 0 and len(self._pending) > self.max_chars:
+            cut = self._pending.rfind(" ", 0, self.max_chars)
+            if cut <= 0:
+                break
+            sentences.extend(self._limit(self._pending[:cut]))
+            self._pending = self._pending[cut + 1:]
+
+        return [s for s in sentences if s]
+
+    def flush(self):
+        """
+        Return whatever text is still pending as the final sentence.
+
+        Returns:
+            list: The remaining sentences (empty if nothing is pending).
+        """
+        remaining = self._pending
+        self._pending = ""
+        return [s for s in self._limit(remaining) if s]
+
+    def _limit(self, sentence):
+        """
+        Split a sentence into pieces no longer than max_chars.
+
+        Args:
+            sentence (str): The sentence to split.
+
+        Returns:
+            list: The stripped pieces of the sentence.
+        """
+        sentence = sentence.strip()
+        if self.max_chars <= 0 or len(sentence) <= self.max_chars:
+            return [sentence]
+
+        pieces = []
+        while len(sentence) > self.max_chars:
+            cut = sentence.rfind(" ", 0, self.max_chars)
+            if cut <= 0:
+                cut = self.max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        pieces.append(sentence)
+        return pieces
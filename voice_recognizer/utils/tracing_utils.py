@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for tracing the latency of each turn, from capture to first audio out.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from voice_recognizer.config.settings import TRACING_SETTINGS
+from voice_recognizer.utils.logging_utils import print_error, print_info
+
+class _SpanContext:
+    """
+    Context manager that records a span of a Trace when it exits.
+    """
+
+    __slots__ = ("trace", "name", "attributes", "start_ns")
+
+    def __init__(self, trace, name, attributes):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = 0
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.trace.add(self.name, self.start_ns, time.perf_counter_ns(), **self.attributes)
+        return False
+
+class _NullSpanContext:
+    """
+    Context manager that records nothing, used while tracing is disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpanContext()
+
+class Trace:
+    """
+    The spans of one turn, sharing a turn ID.
+
+    Times come from time.perf_counter_ns. The spans of the phrases that make
+    up a turn are merged into the turn with adopt(); the whole trace is
+    exported once, by finish(), when the reply has been played.
+    """
+
+    enabled = True
+
+    def __init__(self, tracer, turn_id):
+        """
+        Initialize the trace.
+
+        Args:
+            tracer (Tracer): The tracer that exports the trace.
+            turn_id (str): The ID shared by all the spans.
+        """
+        self.tracer = tracer
+        self.turn_id = turn_id
+        self.wall_time = time.time()
+        self.spans = []  # (nome, inizio ns, fine ns, attributi)
+        self.marks = {}
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def span(self, name, **attributes):
+        """
+        Time a block of code.
+
+        Args:
+            name (str): Name of the span.
+            **attributes: Values stored with the span.
+
+        Returns:
+            A context manager recording the span when the block exits.
+        """
+        return _SpanContext(self, name, attributes)
+
+    def add(self, name, start_ns, end_ns, **attributes):
+        """
+        Record a span with known start and end.
+
+        Args:
+            name (str): Name of the span.
+            start_ns (int): Start time (time.perf_counter_ns).
+            end_ns (int): End time (time.perf_counter_ns).
+            **attributes: Values stored with the span.
+        """
+        with self._lock:
+            self.spans.append((name, start_ns, end_ns, attributes))
+
+    def mark(self, name, time_ns=None):
+        """
+        Remember an instant of the turn, to measure spans from it.
+
+        Args:
+            name (str): Name of the instant.
+            time_ns (int, optional): The instant (default: now).
+        """
+        self.marks[name] = time_ns if time_ns is not None else time.perf_counter_ns()
+
+    def since(self, mark, name, **attributes):
+        """
+        Record a span from a marked instant to now.
+
+        Args:
+            mark (str): Name of the instant where the span starts.
+            name (str): Name of the span.
+            **attributes: Values stored with the span.
+        """
+        start_ns = self.marks.get(mark)
+        if start_ns is not None:
+            self.add(name, start_ns, time.perf_counter_ns(), **attributes)
+
+    def adopt(self, other):
+        """
+        Merge the spans and marks of another trace, e.g. a phrase joining the turn.
+
+        Args:
+            other (Trace): The trace to merge; it is not exported on its own.
+        """
+        if not other.enabled or other is self:
+            return
+
+        with other._lock:
+            spans = list(other.spans)
+            other.spans = []
+            other.finished = True
+        with self._lock:
+            self.spans.extend(spans)
+        for name, time_ns in other.marks.items():
+            self.marks[name] = max(self.marks.get(name, time_ns), time_ns)
+
+    def finish(self):
+        """
+        Export the trace (only the first call has an effect).
+        """
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            spans = list(self.spans)
+
+        self.tracer.export(self, spans)
+
+class NullTrace:
+    """
+    Trace that records nothing: every method returns immediately.
+    """
+
+    enabled = False
+    turn_id = None
+
+    def span(self, name, **attributes):
+        return _NULL_SPAN
+
+    def add(self, name, start_ns, end_ns, **attributes):
+        pass
+
+    def mark(self, name, time_ns=None):
+        pass
+
+    def since(self, mark, name, **attributes):
+        pass
+
+    def adopt(self, other):
+        pass
+
+    def finish(self):
+        pass
+
+NULL_TRACE = NullTrace()
+
+class Tracer:
+    """
+    Creates the traces of the turns and exports their spans.
+
+    Finished traces are appended to a JSON lines file and aggregated into one
+    latency histogram per span name; a local HTTP endpoint serves the
+    histograms in the Prometheus text format (/metrics) and the latest spans
+    as JSON lines (/spans). When tracing is disabled start_trace() returns
+    NULL_TRACE, so the instrumented code only pays for no-op calls.
+    """
+
+    def __init__(self, settings=None):
+        """
+        Initialize the tracer.
+
+        Args:
+            settings (dict, optional): Tracing settings (default: TRACING_SETTINGS).
+        """
+        settings = settings or TRACING_SETTINGS
+        self.enabled = settings["enabled"]
+        self.jsonl_path = settings["jsonl_path"]
+        self.http_host = settings["http_host"]
+        self.http_port = settings["http_port"]
+        self.buckets = sorted(settings["buckets"])
+
+        # ID dei turni: sessione (avvio del processo) e contatore
+        self._session = time.strftime("%Y%m%d%H%M%S")
+        self._turn_counter = itertools.count(1)
+
+        self._lock = threading.Lock()
+        self._histograms = {}  # nome -> [conteggi per bucket, somma, conteggio]
+        self._recent = deque(maxlen=settings["recent_spans"])
+        self._server = None
+
+    def start_trace(self):
+        """
+        Start the trace of a new phrase or turn.
+
+        Returns:
+            Trace: A new trace, or NULL_TRACE if tracing is disabled.
+        """
+        if not self.enabled:
+            return NULL_TRACE
+        return Trace(self, f"{self._session}-{next(self._turn_counter)}")
+
+    def export(self, trace, spans):
+        """
+        Export the spans of a finished trace.
+
+        Args:
+            trace (Trace): The trace.
+            spans (list): Its spans, as (name, start_ns, end_ns, attributes) tuples.
+        """
+        if not spans:
+            return
+
+        origin_ns = min(start_ns for _, start_ns, _, _ in spans)
+        lines = []
+        with self._lock:
+            for name, start_ns, end_ns, attributes in sorted(spans, key=lambda span: span[1]):
+                duration = (end_ns - start_ns) / 1e9
+                self._observe(name, duration)
+
+                record = {
+                    "turn": trace.turn_id,
+                    "time": round(trace.wall_time, 3),
+                    "span": name,
+                    "offset_ms": round((start_ns - origin_ns) / 1e6, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                }
+                record.update(attributes)
+                line = json.dumps(record, ensure_ascii=False)
+                self._recent.append(line)
+                lines.append(line)
+
+        if self.jsonl_path:
+            try:
+                os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+                with open(self.jsonl_path, "a", encoding="utf-8") as trace_file:
+                    trace_file.write("\n".join(lines) + "\n")
+            except OSError as e:
+                print_error(f"Impossibile scrivere le tracce in {self.jsonl_path}: {e}")
+
+    def prometheus_text(self):
+        """
+        Format the latency histograms in the Prometheus text exposition format.
+
+        Returns:
+            str: One histogram per span name, in seconds.
+        """
+        lines = [
+            "# HELP sofi_span_duration_seconds Duration of the spans of each turn.",
+            "# TYPE sofi_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name in sorted(self._histograms):
+                counts, total, count = self._histograms[name]
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'sofi_span_duration_seconds_bucket{{span="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'sofi_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+                lines.append(f'sofi_span_duration_seconds_sum{{span="{name}"}} {total:.6f}')
+                lines.append(f'sofi_span_duration_seconds_count{{span="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def recent_spans(self):
+        """
+        Get the latest exported spans.
+
+        Returns:
+            str: The spans as JSON lines.
+        """
+        with self._lock:
+            return "".join(line + "\n" for line in self._recent)
+
+    def start_server(self):
+        """
+        Serve /metrics and /spans on the local HTTP endpoint, in a daemon thread.
+
+        Returns:
+            bool: True if the endpoint is running, False if disabled or it could not start.
+        """
+        if not self.enabled or not self.http_port or self._server is not None:
+            return self._server is not None
+
+        tracer = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = tracer.prometheus_text(), "text/plain; version=0.0.4"
+                elif self.path == "/spans":
+                    body, content_type = tracer.recent_spans(), "application/x-ndjson"
+                else:
+                    self.send_error(404)
+                    return
+
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # Nessun log per ogni richiesta
+
+        try:
+            self._server = ThreadingHTTPServer((self.http_host, self.http_port), _Handler)
+        except OSError as e:
+            print_error(f"Impossibile avviare l'endpoint delle tracce: {e}")
+            return False
+
+        server_thread = threading.Thread(target=self._server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        print_info(f"Tracce disponibili su http://{self.http_host}:{self._server.server_address[1]}/metrics")
+        return True
+
+    def stop_server(self):
+        """
+        Stop the HTTP endpoint, if running.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _observe(self, name, duration):
+        """
+        Add a duration to the histogram of a span (the lock must be held).
+
+        Args:
+            name (str): Name of the span.
+            duration (float): Duration in seconds.
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = [[0] * len(self.buckets), 0.0, 0]
+
+        for index, bound in enumerate(self.buckets):
+            if duration <= bound:
+                histogram[0][index] += 1
+                break
+        histogram[1] += duration
+        histogram[2] += 1
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer():
+    """
+    Get the tracer shared by the whole application.
+
+    Returns:
+        Tracer: The tracer, created from TRACING_SETTINGS on first use.
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer